@@ -5,6 +5,8 @@ Optimized with enhanced error handling, CORS support, and static file serving
 
 import os
 import sys
+import asyncio
+import time
 from pathlib import Path
 import logging
 from typing import List, Dict, Any, Optional
@@ -14,11 +16,11 @@ import traceback
 from fastapi import FastAPI, Request, HTTPException, Depends, File, UploadFile, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from contextlib import asynccontextmanager
-from pydantic import BaseModel
+from contextlib import asynccontextmanager, contextmanager
+from pydantic import BaseModel, Field
 
 # Add project root to Python path
 current_dir = Path(__file__).parent
@@ -26,7 +28,16 @@ project_root = current_dir.parent
 sys.path.insert(0, str(project_root))
 
 # Import core modules globally
+from core.face_recognizer import RecognitionResult
 from core.user_manager import UserData
+from core.sample_quality import create_sample_selector
+from config.app_config import get_config
+from utils.metrics import get_metrics_registry
+from utils.tracing import get_tracer
+from utils.profiler import get_profiler
+from utils.memory import get_memory_accountant, get_leak_tracker, register_pipeline_components
+from utils.logger import PerformanceLogger
+from utils.database import DatabaseManager, get_database_manager, ROLLUP_RESOLUTIONS
 
 # Configure logging
 logging.basicConfig(
@@ -41,6 +52,45 @@ face_recognizer = None
 user_manager = None
 camera_manager = None
 
+# Prometheus metrics (per-thread shards, no locks on the request path)
+metrics = get_metrics_registry()
+metrics.describe("http_requests_total", "counter", "HTTP requests by method, route and status")
+metrics.describe("http_request_duration_seconds", "histogram", "HTTP request latency by method and route")
+metrics.describe("http_requests_in_flight", "gauge", "HTTP requests currently being served")
+metrics.describe("face_stage_duration_seconds", "histogram", "Face pipeline stage latency (decode/detect/encode/match)")
+
+# Request traces (sampled and slow requests are exported as Chrome trace-event JSON)
+tracer = get_tracer()
+
+# Sampling profiler, toggled at runtime through the admin endpoints (idle until started)
+profiler = get_profiler(get_config().system.profiler_interval_ms, get_config().system.logs_dir)
+
+# Per-component memory accounting and tracemalloc leak tracking (off until started)
+memory_accountant = get_memory_accountant()
+leak_tracker = get_leak_tracker()
+
+# Per-route latency rolled up per minute and flushed to SQLite in bulk (charted via /api/performance/history)
+performance_logger = PerformanceLogger()
+
+
+@contextmanager
+def pipeline_stage(stage: str):
+    """
+    Time a face pipeline stage into the stage histogram and the active request trace
+    """
+    with tracer.span(stage), metrics.timer("face_stage_duration_seconds", stage=stage):
+        yield
+
+
+def gallery_user_ids(storage) -> Optional[Dict[str, int]]:
+    """
+    Gallery labels for the SQLite backend are users.id so recognition results stay stable across restarts
+    """
+    if isinstance(storage, DatabaseManager):
+        return storage.get_user_ids()
+    return None
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -53,16 +103,29 @@ async def lifespan(app: FastAPI):
         
         # Import and initialize core modules
         from core.face_detector import FaceDetector
-        from core.face_recognizer import FaceRecognizer
+        from core.sharded_gallery import create_face_recognizer
         from core.user_manager import UserManager
         from utils.camera import CameraManager
         
         # Initialize components
-        face_detector = FaceDetector()
-        face_recognizer = FaceRecognizer()
-        user_manager = UserManager()
+        system_config = get_config().system
+        tracer.configure(system_config.tracing_enabled, system_config.trace_sample_rate,
+                         system_config.trace_slow_ms, output_dir=system_config.logs_dir)
+        face_detector = FaceDetector(encoding_timeout=system_config.encoding_timeout)
+        face_recognizer = create_face_recognizer(get_config().detection, system_config.gallery_shards)
+        user_manager = get_database_manager() if system_config.user_backend == "sqlite" else UserManager()
         camera_manager = CameraManager()
         
+        # Build the recognition gallery once; endpoints update it incrementally
+        users = user_manager.load_all_users()
+        face_recognizer.load_known_faces(((user.name, user.face_encodings) for user in users),
+                                         user_ids=gallery_user_ids(user_manager))
+        logger.info(f"📚 Gallery loaded: {len(users)} users, {face_recognizer.get_known_faces_count()} encodings")
+        register_pipeline_components(memory_accountant, face_detector, face_recognizer, tracer=tracer)
+        if system_config.performance_rollups_enabled:
+            performance_logger.start_rollup_flush(get_database_manager().save_performance_rollups,
+                                                  interval=system_config.rollup_flush_interval)
+        
         logger.info("✅ All core modules initialized successfully")
         
         yield
@@ -75,6 +138,25 @@ async def lifespan(app: FastAPI):
         logger.info("🔄 Cleaning up resources...")
         if camera_manager:
             camera_manager.release()
+        if face_detector:
+            face_detector.shutdown()
+        if face_recognizer and hasattr(face_recognizer, "close"):
+            face_recognizer.close()
+        trace_path = tracer.export()
+        if trace_path:
+            logger.info(f"🧵 Trace written: {trace_path}")
+        if profiler.is_running:
+            logger.info(f"🔬 Profile written: {profiler.stop()}")
+        leak_tracker.stop()
+        system_config = get_config().system
+        if system_config.performance_rollups_enabled:
+            performance_logger.stop_rollup_flush()
+            if system_config.auto_cleanup:
+                get_database_manager().downsample_performance_rollups(
+                    system_config.rollup_minute_retention_days,
+                    system_config.rollup_hour_retention_days,
+                    system_config.rollup_day_retention_days
+                )
         logger.info("👋 Dashboard shutdown complete")
 
 # Create FastAPI application with lifespan manager
@@ -125,6 +207,7 @@ class UserDeleteRequest(BaseModel):
     
 class RecognitionRequest(BaseModel):
     image_data: str  # Base64 encoded image
+    top_k: Optional[int] = Field(None, ge=1, le=20)  # Return the k closest users per face
 
 # Error handling middleware
 @app.middleware("http")
@@ -154,6 +237,33 @@ async def error_handling_middleware(request: Request, call_next):
                 content={"detail": "Internal server error"}
             )
 
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """
+    Record request count and latency per route template, and trace the request
+    """
+    metrics.inc("http_requests_in_flight")
+    start = time.perf_counter()
+    status = 500
+    try:
+        # Spans opened by the endpoint (decode/detect/encode/match) attach to this trace
+        with tracer.trace("request", trace_id=request.headers.get("x-request-id"),
+                          method=request.method, path=request.url.path) as trace_id:
+            response = await call_next(request)
+        status = response.status_code
+        if trace_id:
+            response.headers["X-Trace-Id"] = trace_id
+        return response
+    finally:
+        # Route templates (not raw paths) keep label cardinality bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        elapsed = time.perf_counter() - start
+        metrics.inc("http_requests_in_flight", -1)
+        metrics.observe("http_request_duration_seconds", elapsed, method=request.method, route=path)
+        performance_logger.log_execution_time(f"{request.method} {path}", elapsed)
+        metrics.inc("http_requests_total", method=request.method, route=path, status=str(status))
+
 # Dependency for checking module availability
 async def get_modules():
     """
@@ -359,6 +469,80 @@ async def get_user_details(username: str, modules: dict = Depends(get_modules)):
             "timestamp": datetime.now().isoformat()
         }
 
+# Uploads are read in chunks so oversize files are rejected without buffering them
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+
+async def read_upload(photo: UploadFile, max_bytes: int) -> Optional[bytes]:
+    """
+    Read an uploaded file in chunks; returns None as soon as it exceeds max_bytes
+    """
+    if photo.size is not None and photo.size > max_bytes:
+        return None
+    
+    chunks = []
+    total = 0
+    while True:
+        chunk = await photo.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            return None
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def await_encoding(future) -> Any:
+    """
+    Wait for a worker-pool encoding result with a timeout, so a hung or crashed
+    worker surfaces as a 504 instead of a request that never completes
+    """
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), get_config().system.encoding_timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Face encoding timed out")
+
+
+async def encode_upload(photo: UploadFile, face_detector) -> Dict[str, Any]:
+    """
+    Read, decode and encode one uploaded photo off the event loop
+    
+    Decoding runs in the default thread pool (cv2 releases the GIL) and
+    detection/encoding in the detector's process pool, so photos of one
+    request are processed concurrently and other clients are not blocked.
+    """
+    if not photo.content_type or not photo.content_type.startswith('image/'):
+        return {"sample": None, "error": "not an image"}
+    
+    limits = get_config().system
+    image_data = await read_upload(photo, limits.upload_max_bytes)
+    if image_data is None:
+        return {"sample": None, "error": f"file exceeds {limits.upload_max_bytes} bytes"}
+    
+    loop = asyncio.get_running_loop()
+    try:
+        with pipeline_stage("decode"):
+            frame = await loop.run_in_executor(
+                None, face_detector.decode_image, image_data,
+                face_detector.ENCODING_MAX_WIDTH, limits.upload_max_pixels
+            )
+    except ValueError as e:
+        return {"sample": None, "error": str(e)}
+    del image_data
+    
+    # submit_encoding may wait for a free shared-memory slot; keep that off the loop too
+    # (detection runs inside the worker, so this stage covers detect + encode)
+    with pipeline_stage("detect_encode"):
+        future = await loop.run_in_executor(None, face_detector.submit_encoding, frame, None, True)
+        samples = await await_encoding(future)
+    if not samples:
+        return {"sample": None, "error": "no face detected"}
+    
+    # An enrolment photo may contain bystanders; the largest face is the subject
+    return {"sample": max(samples, key=lambda sample: sample[1].face_size), "error": None}
+
+
 @app.post("/api/users")
 async def create_user(
     name: str = Form(...),
@@ -371,6 +555,7 @@ async def create_user(
     try:
         user_manager = modules["user_manager"]
         face_detector = modules["face_detector"]
+        face_recognizer = modules["face_recognizer"]
         
         # Validate input
         if not name.strip():
@@ -384,28 +569,31 @@ async def create_user(
         if existing_user is not None:
             raise HTTPException(status_code=409, detail=f"User '{name}' already exists")
         
-        # Process photos
-        face_encodings = []
-        processed_photos = 0
+        # Process photos concurrently
+        results = await asyncio.gather(*(encode_upload(photo, face_detector) for photo in photos))
         
-        for photo in photos:
-            # Validate file type
-            if not photo.content_type.startswith('image/'):
-                continue
-                
-            # Read image data
-            image_data = await photo.read()
-            
-            # Detect and encode faces
-            encodings = face_detector.detect_and_encode(image_data)
-            if len(encodings) > 0:
-                face_encodings.extend(encodings)
-                processed_photos += 1
+        rejected_photos = []
+        candidates = []
+        for photo, result in zip(photos, results):
+            if result["error"]:
+                rejected_photos.append({"filename": photo.filename, "reason": result["error"]})
+            else:
+                candidates.append((photo, result["sample"]))
+        
+        # Keep at most N sharp, frontal and mutually distinct samples
+        selector = create_sample_selector(get_config().detection)
+        accepted, rejected = selector.select([sample for _, sample in candidates])
+        for index, reason in rejected.items():
+            rejected_photos.append({"filename": candidates[index][0].filename, "reason": reason})
+        
+        face_encodings = [candidates[index][1][0] for index in accepted]
+        processed_photos = len(accepted)
         
         if len(face_encodings) == 0:
             raise HTTPException(
                 status_code=400, 
-                detail="No faces detected in the uploaded photos"
+                detail="No faces detected in the uploaded photos" if not candidates
+                else "No uploaded photo passed the sample quality checks"
             )
         
         # Create user with UserData object
@@ -419,11 +607,16 @@ async def create_user(
         success = user_manager.save_user(user_data)
         
         if success:
+            # Incremental gallery update (no full reload)
+            user_ids = gallery_user_ids(user_manager)
+            face_recognizer.add_known_faces(face_encodings, name,
+                                            user_id=user_ids.get(name) if user_ids else None)
             return {
                 "success": True,
                 "message": f"User '{name}' created successfully",
                 "face_count": len(face_encodings),
                 "processed_photos": processed_photos,
+                "rejected_photos": rejected_photos,
                 "timestamp": datetime.now().isoformat()
             }
         else:
@@ -443,6 +636,7 @@ async def delete_user(username: str, modules: dict = Depends(get_modules)):
     """
     try:
         user_manager = modules["user_manager"]
+        face_recognizer = modules["face_recognizer"]
         
         # Check if user exists
         existing_user = user_manager.load_user(username)
@@ -453,6 +647,8 @@ async def delete_user(username: str, modules: dict = Depends(get_modules)):
         success = user_manager.delete_user(username)
         
         if success:
+            # Drop every sample of the user from the gallery
+            face_recognizer.remove_user(username)
             return {
                 "success": True,
                 "message": f"User '{username}' deleted successfully",
@@ -476,7 +672,6 @@ async def recognize_face(request: RecognitionRequest, modules: dict = Depends(ge
     try:
         face_detector = modules["face_detector"]
         face_recognizer = modules["face_recognizer"]
-        user_manager = modules["user_manager"]
         
         import base64
         import numpy as np
@@ -489,12 +684,13 @@ async def recognize_face(request: RecognitionRequest, modules: dict = Depends(ge
             if ',' in image_data:
                 image_data = image_data.split(',')[1]
             
-            # Decode base64
-            image_bytes = base64.b64decode(image_data)
-            
-            # Convert to numpy array
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            with pipeline_stage("decode"):
+                # Decode base64
+                image_bytes = base64.b64decode(image_data)
+                
+                # Convert to numpy array
+                nparr = np.frombuffer(image_bytes, np.uint8)
+                image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
             
             if image is None:
                 raise HTTPException(status_code=400, detail="Invalid image data")
@@ -508,9 +704,16 @@ async def recognize_face(request: RecognitionRequest, modules: dict = Depends(ge
         # Convert BGR to RGB (OpenCV uses BGR, face_recognition uses RGB)
         rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         
-        # Get face locations and encodings
-        face_locations = face_recognition.face_locations(rgb_image)
-        face_encodings = face_recognition.face_encodings(rgb_image, face_locations)
+        # Detection and pool submission (which may wait for a free slot or start the
+        # workers) run in the thread pool; encoding itself runs in the worker processes
+        loop = asyncio.get_running_loop()
+        with pipeline_stage("detect"):
+            face_locations = await loop.run_in_executor(None, face_recognition.face_locations, rgb_image)
+        face_encodings = []
+        if face_locations:
+            with pipeline_stage("encode"):
+                future = await loop.run_in_executor(None, face_detector.submit_encoding, image, face_locations)
+                face_encodings = await await_encoding(future)
         
         if len(face_encodings) == 0:
             return {
@@ -523,17 +726,19 @@ async def recognize_face(request: RecognitionRequest, modules: dict = Depends(ge
                 "timestamp": datetime.now().isoformat()
             }
         
-        # Load all users and prepare face recognizer
-        all_users = user_manager.load_all_users()
-        
-        # Clear and reload known faces in recognizer
-        face_recognizer.clear_known_faces()
-        for user in all_users:
-            for encoding in user.face_encodings:
-                face_recognizer.add_known_face(encoding, user.name)
-        
-        # Recognize faces
-        recognition_results = face_recognizer.recognize_faces(face_encodings)
+        # Recognize against the current gallery snapshot (lock-free read)
+        # With top_k the best match is the first candidate, so the gallery is searched once
+        with pipeline_stage("match"):
+            if request.top_k:
+                topk_results = face_recognizer.recognize_topk(face_encodings, request.top_k)
+                recognition_results = [
+                    RecognitionResult(topk.best.user_name, max(0.0, 1.0 - topk.best.distance), True, topk.best.user_id)
+                    if topk.is_match else RecognitionResult("Unknown", 0.0, False)
+                    for topk in topk_results
+                ]
+            else:
+                topk_results = None
+                recognition_results = face_recognizer.recognize_faces(face_encodings)
         
         results = []
         for i, result in enumerate(recognition_results):
@@ -544,6 +749,7 @@ async def recognize_face(request: RecognitionRequest, modules: dict = Depends(ge
             
             if result.is_match:
                 result_data.update({
+                    "user_id": result.user_id,
                     "name": result.user_name,
                     "confidence": round(result.confidence, 3),
                     "distance": round(1.0 - result.confidence, 3)  # Convert confidence back to distance
@@ -555,6 +761,14 @@ async def recognize_face(request: RecognitionRequest, modules: dict = Depends(ge
                     "distance": 1.0
                 })
             
+            if topk_results is not None:
+                topk = topk_results[i]
+                result_data["margin"] = round(topk.margin, 3) if topk.margin is not None else None
+                result_data["candidates"] = [
+                    {"user_id": match.user_id, "name": match.user_name, "distance": round(match.distance, 3)}
+                    for match in topk.matches
+                ]
+            
             results.append(result_data)
         
         return {
@@ -611,6 +825,141 @@ async def not_found_handler(request: Request, exc: HTTPException):
         # Redirect to dashboard for non-API routes
         return templates.TemplateResponse("dashboard.html", {"request": request})
 
+def _detector_stats() -> Dict[str, Any]:
+    return face_detector.get_performance_stats() if face_detector else {}
+
+
+def _chip_cache_hit_ratio() -> Optional[float]:
+    stats = _detector_stats()
+    lookups = stats.get("chip_cache_hits", 0) + stats.get("chip_cache_misses", 0)
+    return stats["chip_cache_hits"] / lookups if lookups else None
+
+
+def _process_stats() -> Dict[str, float]:
+    import psutil
+    process = psutil.Process()
+    cpu = process.cpu_times()
+    return {"rss": process.memory_info().rss, "cpu": cpu.user + cpu.system, "threads": process.num_threads()}
+
+
+metrics.register_gauge("face_gallery_encodings", "Encodings in the recognition gallery",
+                       lambda: face_recognizer.get_known_faces_count() if face_recognizer else None)
+metrics.register_gauge("face_gallery_users", "Users in the recognition gallery",
+                       lambda: len(face_recognizer.get_user_table()) if face_recognizer else None)
+metrics.register_gauge("face_encoding_queue_depth", "Encoding tasks waiting for a worker result",
+                       lambda: _detector_stats().get("encoding_pool", {}).get("pending", 0) if face_detector else None)
+metrics.register_gauge("face_detection_cache_entries", "Entries in the detection cache",
+                       lambda: _detector_stats().get("cache_size"))
+metrics.register_gauge("face_chip_cache_hits_total", "Aligned face chip cache hits",
+                       lambda: _detector_stats().get("chip_cache_hits"), kind="counter")
+metrics.register_gauge("face_chip_cache_misses_total", "Aligned face chip cache misses",
+                       lambda: _detector_stats().get("chip_cache_misses"), kind="counter")
+metrics.register_gauge("face_chip_cache_hit_ratio", "Aligned face chip cache hit ratio", _chip_cache_hit_ratio)
+# Component sizes walk the detection cache and fan out to gallery shards; scrapes reuse a recent measurement
+MEMORY_GAUGE_MAX_AGE = 30.0
+metrics.register_gauge("face_memory_bytes", "Bytes held by gallery, caches and buffers",
+                       lambda: {(("component", name),): size
+                                for name, size in memory_accountant.components(MEMORY_GAUGE_MAX_AGE).items()})
+metrics.register_gauge("process_resident_memory_bytes", "Resident memory size in bytes",
+                       lambda: _process_stats()["rss"])
+metrics.register_gauge("process_cpu_seconds_total", "Total user and system CPU time in seconds",
+                       lambda: _process_stats()["cpu"], kind="counter")
+metrics.register_gauge("process_threads", "Number of OS threads", lambda: _process_stats()["threads"])
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Prometheus text exposition of request, pipeline and process metrics
+    """
+    # Gauge callbacks may read process stats and gallery shards; keep them off the event loop
+    output = await asyncio.get_running_loop().run_in_executor(None, metrics.render)
+    return PlainTextResponse(output, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/admin/profiler")
+async def profiler_status():
+    """
+    Get sampling profiler status
+    """
+    return {"success": True, "profiler": profiler.get_status()}
+
+@app.post("/api/admin/profiler/start")
+async def start_profiler(duration: Optional[float] = None):
+    """
+    Start the sampling profiler; with a duration it stops and writes the profile by itself
+    """
+    if duration is not None and duration <= 0:
+        raise HTTPException(status_code=400, detail="Duration must be positive")
+    if not profiler.start(duration):
+        raise HTTPException(status_code=409, detail="Profiler is already running")
+    logger.info(f"🔬 Profiler started (duration: {duration or 'until stopped'})")
+    return {"success": True, "profiler": profiler.get_status()}
+
+@app.post("/api/admin/profiler/stop")
+async def stop_profiler():
+    """
+    Stop the sampling profiler and write collapsed stacks (flamegraph.pl / speedscope input)
+    """
+    if not profiler.is_running:
+        raise HTTPException(status_code=409, detail="Profiler is not running")
+    output = await asyncio.get_running_loop().run_in_executor(None, profiler.stop)
+    logger.info(f"🔬 Profile written: {output}")
+    return {"success": True, "output": str(output) if output else None, "profiler": profiler.get_status()}
+
+@app.get("/api/admin/memory")
+async def memory_report(top: int = 10):
+    """
+    Get per-component memory usage; includes the tracemalloc diff while leak tracking is on
+    """
+    loop = asyncio.get_running_loop()
+    report = await loop.run_in_executor(None, memory_accountant.report)
+    if leak_tracker.is_running:
+        report["leak"] = await loop.run_in_executor(None, leak_tracker.diff, top)
+    return {"success": True, "memory": report}
+
+@app.post("/api/admin/memory/leak-tracking/start")
+async def start_leak_tracking():
+    """
+    Start tracemalloc and take the baseline snapshot (slows allocations; diagnostics only)
+    """
+    await asyncio.get_running_loop().run_in_executor(None, leak_tracker.start)
+    logger.info("🧪 Leak tracking started")
+    return {"success": True, "tracking": True}
+
+@app.post("/api/admin/memory/leak-tracking/stop")
+async def stop_leak_tracking(top: int = 10):
+    """
+    Stop leak tracking and return the final diff against the baseline
+    """
+    if not leak_tracker.is_running:
+        raise HTTPException(status_code=409, detail="Leak tracking is not running")
+    leak = await asyncio.get_running_loop().run_in_executor(None, leak_tracker.diff, top)
+    leak_tracker.stop()
+    if leak is None:
+        # A concurrent stop released the baseline first
+        raise HTTPException(status_code=409, detail="Leak tracking is not running")
+    logger.info(f"🧪 Leak tracking stopped: {leak['growth_bytes'] / 1024:+.1f}KB growth")
+    return {"success": True, "tracking": False, "leak": leak}
+
+@app.get("/api/performance/history")
+async def performance_history(function: Optional[str] = None, start: Optional[datetime] = None,
+                              end: Optional[datetime] = None, resolution: Optional[str] = None):
+    """
+    Latency time series (count, mean, p50, p95, max per bucket) from the SQLite rollups.
+    Without a resolution, minute/hour/day is picked from the range length.
+    """
+    if resolution is not None and resolution not in ROLLUP_RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Resolution must be one of {', '.join(ROLLUP_RESOLUTIONS)}")
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="Start must be before end")
+    
+    # Write the minutes recorded so far so the chart includes the current minute
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, performance_logger.flush_rollups, True)
+    series = await loop.run_in_executor(None, get_database_manager().query_performance_rollups,
+                                        function, start, end, resolution)
+    return {"success": True, "series": series}
+
 # Additional utility endpoints
 @app.get("/api/system/info")
 async def system_info():
@@ -28,6 +28,18 @@ class DetectionConfig:
     dlib_model: str = "hog"  # "hog" or "cnn"
     face_encoding_jitters: int = 1
     recognition_tolerance: float = 0.6
+    # Kuantalı galeride bellekte yalnızca kodlar kalır; float32 satırlar yeniden sıralama için
+    # gallery_rerank_dir altındaki adsız bir dosyadan okunur (boş = sistem geçici dizini, tmpfs olmamalı)
+    gallery_quantization: Optional[str] = None  # None, "float16" or "int8"
+    rerank_candidates: int = 32
+    gallery_rerank_dir: str = ""
+    # Kayıt örnek seçimi: kullanıcı başına en fazla bu kadar kaliteli ve farklı encoding
+    enrolment_max_samples: int = 5
+    sample_min_sharpness: float = 30.0
+    sample_min_face_size: int = 60
+    sample_max_yaw: float = 0.35
+    sample_max_roll: float = 25.0
+    sample_duplicate_distance: float = 0.15
     cache_timeout: float = 5.0
     max_cache_size: int = 128
 
@@ -36,9 +48,34 @@ class DetectionConfig:
 class SystemConfig:
     """Sistem konfigürasyonu."""
     data_dir: str = "data/users"
+    # Kullanıcı deposu: "files" (data_dir) veya "sqlite"; sqlite'ta galeri etiketleri users.id olur
+    user_backend: str = "files"
     logs_dir: str = "logs"
     backup_dir: str = "data/backups"
     max_workers: int = 2
+    # 2 ve üzeri: galeri bu sayıda yerel worker sürecine bölünür (çok büyük kayıt sayıları için)
+    gallery_shards: int = 0
+    # API yüklemeleri: fotoğraf başına bayt ve piksel sınırı (çözmeden önce uygulanır)
+    upload_max_bytes: int = 10 * 1024 * 1024
+    upload_max_pixels: int = 40_000_000
+    # API'nin encoding worker sonucunu bekleme süresi (saniye); aşılırsa 504 döner.
+    # Bu sürede hiçbir worker'ın almadığı görev hata ile biter ve havuz yenilenir
+    encoding_timeout: float = 30.0
+    # İzleme: örneklenen ve yavaş frame/isteklerin span'leri logs/trace_<zaman>.json'a yazılır
+    tracing_enabled: bool = False
+    trace_sample_rate: float = 0.01
+    trace_slow_ms: float = 100.0
+    # Örneklemeli profiler aralığı ('p' tuşu veya /api/admin/profiler ile açılır)
+    profiler_interval_ms: float = 5.0
+    # Canlı döngüde tracemalloc sızıntı takibi (teşhis içindir; ayırmaları yavaşlatır)
+    memory_leak_tracking: bool = False
+    # Performans rollup'ları: dakikalık özetler veritabanına toplu yazılır; eskiyenler
+    # saat -> gün çözünürlüğüne indirgenir (auto_cleanup açıkken kapanışta)
+    performance_rollups_enabled: bool = True
+    rollup_flush_interval: float = 60.0
+    rollup_minute_retention_days: int = 2
+    rollup_hour_retention_days: int = 30
+    rollup_day_retention_days: int = 365
     auto_cleanup: bool = True
     log_level: str = "INFO"
 
@@ -4,6 +4,8 @@ Core modülü - Yüz tanıma sistemi için temel bileşenler
 
 from .face_detector import FaceDetector
 from .face_recognizer import FaceRecognizer
+from .face_encoder import BatchFaceEncoder
+from .prepared_frame import PreparedFrame, FrameBufferPool
 from .user_manager import UserManager
 
-__all__ = ['FaceDetector', 'FaceRecognizer', 'UserManager'] 
\ No newline at end of file
+__all__ = ['FaceDetector', 'FaceRecognizer', 'UserManager', 'BatchFaceEncoder', 'PreparedFrame', 'FrameBufferPool'] 
\ No newline at end of file
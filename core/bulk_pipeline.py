@@ -0,0 +1,480 @@
+"""
+Toplu görüntü işleme hattı - Dizinlerden paralel okuma, algılama, encoding ve kayıt
+"""
+
+import cv2
+import csv
+import json
+import os
+import time
+import multiprocessing as mp
+import numpy as np
+import face_recognition
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple, Optional, Dict, Any, Iterable, Iterator, Callable
+
+from .face_encoder import BatchFaceEncoder
+from .sample_quality import SampleQuality, assess_face, create_sample_selector
+from .user_manager import UserData
+
+
+# (top, right, bottom, left) - face_recognition konum formatı
+FaceLocation = Tuple[int, int, int, int]
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+# Hata nedenleri (raporlarda gruplanır)
+ERROR_UNREADABLE = "okunamadı"
+ERROR_NO_FACE = "yüz bulunamadı"
+ERROR_MULTIPLE_FACES = "birden fazla yüz"
+
+
+@dataclass
+class ImageResult:
+    """Tek görüntünün işlenme sonucu."""
+    path: str
+    encodings: List[np.ndarray] = field(default_factory=list)
+    face_locations: List[FaceLocation] = field(default_factory=list)
+    qualities: List[SampleQuality] = field(default_factory=list)
+    error: Optional[str] = None
+    tag: Any = None
+
+
+def iter_image_files(root: Path) -> Iterator[Path]:
+    """Dizin ağacındaki görüntü dosyalarını sıralı olarak döndürür (gizli dosyalar atlanır)."""
+    for directory, subdirs, files in os.walk(root):
+        subdirs[:] = sorted(d for d in subdirs if not d.startswith("."))
+        for file_name in sorted(files):
+            if not file_name.startswith(".") and Path(file_name).suffix.lower() in IMAGE_EXTENSIONS:
+                yield Path(directory) / file_name
+
+
+def collect_person_images(root: Path) -> List[Tuple[str, List[Path]]]:
+    """
+    Kişi başına bir klasör düzenindeki görüntüleri toplar.
+
+    Args:
+        root: Kök dizin (root/<kişi adı>/**/*.jpg)
+
+    Returns:
+        (kişi adı, görüntü yolları) çiftleri
+    """
+    root = Path(root)
+    return [
+        (person_dir.name, list(iter_image_files(person_dir)))
+        for person_dir in sorted(root.iterdir())
+        if person_dir.is_dir() and not person_dir.name.startswith(".")
+    ]
+
+
+# Worker süreci başına bir encoder (dlib modelleri süreç başına bir kez yüklenir)
+_worker_encoder: Optional[BatchFaceEncoder] = None
+
+
+def _init_worker(max_width: int) -> None:
+    """Worker sürecinde encoder'ı oluşturur."""
+    global _worker_encoder
+    _worker_encoder = BatchFaceEncoder(max_width=max_width, chip_cache_size=0)
+
+
+def _process_image(path: str, assume_cropped: bool, encoder: Optional[BatchFaceEncoder] = None
+                   ) -> Tuple[List[np.ndarray], List[FaceLocation], List[SampleQuality], Optional[str]]:
+    """
+    Görüntüyü okur, yüzleri algılar, encode eder ve her yüzün kalitesini ölçer.
+
+    Args:
+        path: Görüntü dosyası
+        assume_cropped: True ise görüntünün tamamı tek yüz kabul edilir (kırpılmış veri setleri)
+        encoder: Kullanılacak encoder (yoksa worker encoder'ı)
+
+    Returns:
+        (encoding'ler, orijinal koordinatlardaki konumlar, kalite ölçüleri, hata nedeni)
+    """
+    encoder = encoder or _worker_encoder
+    try:
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is None:
+            return [], [], [], ERROR_UNREADABLE
+
+        height, width = frame.shape[:2]
+        if assume_cropped:
+            locations = [(0, width, height, 0)]
+            rgb_frame, scaled_locations = encoder.prepare_image(frame, locations)
+        else:
+            rgb_frame, _ = encoder.prepare_image(frame)
+            scaled_locations = face_recognition.face_locations(rgb_frame, model="hog")
+            factor = width / rgb_frame.shape[1]
+            locations = [(int(top * factor), int(right * factor), int(bottom * factor), int(left * factor))
+                         for top, right, bottom, left in scaled_locations]
+
+        if not scaled_locations:
+            return [], [], [], ERROR_NO_FACE
+
+        landmarks: List[np.ndarray] = []
+        encodings = encoder.encode_chips(encoder.align_faces(rgb_frame, scaled_locations, landmarks))
+        # Kalite, descriptor ağının gördüğü çözünürlükte ölçülür (encode_with_quality ile aynı)
+        gray_frame = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2GRAY)
+        qualities = [assess_face(gray_frame, location, points)
+                     for location, points in zip(scaled_locations, landmarks)]
+        return [encoding.astype(np.float32) for encoding in encodings], locations, qualities, None
+
+    except Exception as e:
+        return [], [], [], f"hata: {e}"
+
+
+class ImagePipeline:
+    """
+    Dosya yollarından encoding'e paralel işleme hattı.
+    Performance: Worker'lara yalnızca dosya yolu gönderilir (okuma worker'da yapılır);
+    aynı anda işlenen görüntü sayısı max_inflight ile sınırlıdır, böylece bellek
+    kullanımı dizin boyutundan bağımsız kalır.
+    """
+
+    def __init__(self, num_workers: int = 0, max_inflight: Optional[int] = None,
+                 max_width: int = 640, assume_cropped: bool = False) -> None:
+        """
+        ImagePipeline sınıfını başlatır.
+
+        Args:
+            num_workers: Worker süreç sayısı (0 = süreç içinde sıralı)
+            max_inflight: Aynı anda işlenen maksimum görüntü (varsayılan: 4 x worker)
+            max_width: Algılama/encoding öncesi maksimum genişlik
+            assume_cropped: Görüntülerin tek yüzlük kırpılmış görüntü olduğunu varsayar
+        """
+        if num_workers < 0:
+            raise ValueError("Worker sayısı negatif olamaz")
+
+        self._num_workers = num_workers
+        self._max_inflight = max_inflight or max(1, num_workers * 4)
+        self._max_width = max_width
+        self._assume_cropped = assume_cropped
+
+    def process(self, items: Iterable[Tuple[Any, Path]]) -> Iterator[ImageResult]:
+        """
+        (etiket, yol) çiftlerini işler ve sonuçları girdi sırasıyla döndürür.
+
+        Args:
+            items: (etiket, görüntü yolu) çiftleri; etiket sonuçta aynen geri döner
+
+        Returns:
+            ImageResult üreteci
+        """
+        if self._num_workers == 0:
+            encoder = BatchFaceEncoder(max_width=self._max_width, chip_cache_size=0)
+            for tag, path in items:
+                yield ImageResult(str(path), *_process_image(str(path), self._assume_cropped, encoder), tag)
+            return
+
+        # fork + thread karışımından kaçınmak için spawn
+        executor = ProcessPoolExecutor(
+            max_workers=self._num_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._max_width,)
+        )
+        window: "deque[Tuple[Any, str, Any]]" = deque()
+        try:
+            for tag, path in items:
+                window.append((tag, str(path), executor.submit(_process_image, str(path), self._assume_cropped)))
+                if len(window) >= self._max_inflight:
+                    yield self._collect(window.popleft())
+            while window:
+                yield self._collect(window.popleft())
+        finally:
+            # Bekleyen görevlerin hepsi pencerededir; iptal edip kapat (cancel_futures 3.9+ gerektirir)
+            for _, _, future in window:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    @staticmethod
+    def _collect(entry: Tuple[Any, str, Any]) -> ImageResult:
+        """Bekleyen görevin sonucunu ImageResult'a çevirir."""
+        tag, path, future = entry
+        try:
+            encodings, locations, qualities, error = future.result()
+        except Exception as e:
+            encodings, locations, qualities, error = [], [], [], f"hata: {e}"
+        return ImageResult(path, encodings, locations, qualities, error, tag)
+
+
+class BulkEnroller:
+    """
+    Dizin ağacından toplu kullanıcı kaydı.
+    Kullanıcının örnekleri canlı kayıttaki gibi kalite eşiklerinden geçirilir; en iyi
+    puanlı ve birbirinden farklı en fazla max_samples encoding saklanır.
+    Tamamlanan kullanıcılar batch halinde depolamaya yazılır ve ilerleme dosyasına
+    işlenir; yarıda kalan bir çalışma aynı ilerleme dosyasıyla kaldığı yerden devam eder.
+    """
+
+    def __init__(self, storage: Any, pipeline: ImagePipeline, state_path: Path, detection: Any,
+                 batch_size: int = 32, max_samples: Optional[int] = None) -> None:
+        """
+        BulkEnroller sınıfını başlatır.
+
+        Args:
+            storage: save_users / user_exists sunan depolama (UserManager veya DatabaseManager)
+            pipeline: Görüntü işleme hattı
+            state_path: İlerleme (JSON lines) dosyası
+            detection: Örnek seçim eşiklerini sunan konfigürasyon (DetectionConfig)
+            batch_size: Tek yazımda kaydedilecek kullanıcı sayısı
+            max_samples: Kullanıcı başına saklanacak maksimum encoding (None = enrolment_max_samples)
+        """
+        if batch_size <= 0:
+            raise ValueError("Batch boyutu pozitif olmalıdır")
+
+        self._storage = storage
+        self._pipeline = pipeline
+        self._state_path = Path(state_path)
+        self._batch_size = batch_size
+        self._detection = detection
+        self._max_samples = max_samples
+
+    # Devam ederken atlanan durumlar; "failed" kullanıcılar yeniden denenir
+    DONE_STATUSES = ("saved", "exists")
+
+    def _load_state(self) -> Dict[str, str]:
+        """Önceki çalışmalarda işlenen kullanıcıları (isim -> son durum) okur."""
+        state: Dict[str, str] = {}
+        if not self._state_path.exists():
+            return state
+
+        with open(self._state_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    state[entry['name']] = entry['status']
+                except (ValueError, KeyError):
+                    # Kesinti sırasında yarım yazılmış son satır
+                    continue
+        return state
+
+    def _record(self, entries: List[Dict[str, Any]]) -> None:
+        """Tamamlanan kullanıcıları ilerleme dosyasına ekler."""
+        if not entries:
+            return
+        self._state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._state_path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _flush(self, batch: List[UserData], report: Dict[str, Any]) -> None:
+        """Batch'i depolamaya yazar ve sonucu ilerleme dosyasına işler."""
+        if not batch:
+            return
+
+        saved = set(self._storage.save_users(batch))
+        entries = []
+        for user_data in batch:
+            status = "saved" if user_data.name in saved else "failed"
+            report['users_saved' if status == "saved" else 'users_failed'] += 1
+            entries.append({'name': user_data.name, 'status': status, 'encodings': len(user_data.face_encodings)})
+        self._record(entries)
+        batch.clear()
+
+    def run(self, root: Path, on_image: Optional[Callable[[ImageResult], None]] = None) -> Dict[str, Any]:
+        """
+        Dizin ağacındaki tüm kişileri kaydeder.
+
+        Args:
+            root: Kök dizin (kişi başına bir klasör)
+            on_image: Her görüntü işlendiğinde çağrılacak fonksiyon (ilerleme çubuğu için)
+
+        Returns:
+            Çalışma raporu (sayaçlar, hata nedenleri, görüntü/s)
+        """
+        start_time = time.perf_counter()
+        state = self._load_state()
+        report: Dict[str, Any] = {
+            'users_total': 0, 'users_saved': 0, 'users_failed': 0,
+            'users_resumed': 0, 'users_existing': 0,
+            'images': 0, 'images_ok': 0, 'failures': Counter(), 'samples_rejected': Counter()
+        }
+
+        pending: List[Tuple[str, List[Path]]] = []
+        skipped: List[Dict[str, Any]] = []
+        for name, paths in collect_person_images(root):
+            report['users_total'] += 1
+            if state.get(name) in self.DONE_STATUSES:
+                report['users_resumed'] += 1
+            elif self._storage.user_exists(name):
+                report['users_existing'] += 1
+                skipped.append({'name': name, 'status': "exists", 'encodings': 0})
+            elif not paths:
+                report['users_failed'] += 1
+                skipped.append({'name': name, 'status': "failed", 'encodings': 0})
+            else:
+                pending.append((name, paths))
+        self._record(skipped)
+
+        remaining = {name: len(paths) for name, paths in pending}
+        collected: Dict[str, List[Tuple[np.ndarray, SampleQuality]]] = {}
+        batch: List[UserData] = []
+        items = ((name, path) for name, paths in pending for path in paths)
+
+        for result in self._pipeline.process(items):
+            name = result.tag
+            report['images'] += 1
+            if result.error:
+                report['failures'][result.error] += 1
+            elif len(result.encodings) > 1:
+                # Kayıt görüntüsünde kimin yüzü olduğu belirsiz
+                report['failures'][ERROR_MULTIPLE_FACES] += 1
+            else:
+                report['images_ok'] += 1
+                collected.setdefault(name, []).append((result.encodings[0], result.qualities[0]))
+
+            if on_image:
+                on_image(result)
+
+            remaining[name] -= 1
+            if remaining[name] > 0:
+                continue
+
+            samples = collected.pop(name, [])
+            accepted, rejected = create_sample_selector(self._detection, self._max_samples).select(samples)
+            report['samples_rejected'].update(rejected.values())
+            encodings = [samples[index][0] for index in accepted]
+            if not encodings:
+                report['users_failed'] += 1
+                self._record([{'name': name, 'status': "failed", 'encodings': 0}])
+                continue
+
+            now = datetime.now().isoformat()
+            batch.append(UserData(name=name, face_encodings=encodings, created_at=now, updated_at=now))
+            if len(batch) >= self._batch_size:
+                self._flush(batch, report)
+
+        self._flush(batch, report)
+
+        elapsed = time.perf_counter() - start_time
+        report['elapsed'] = elapsed
+        report['images_per_second'] = report['images'] / elapsed if elapsed > 0 else 0.0
+        report['failures'] = dict(report['failures'])
+        report['samples_rejected'] = dict(report['samples_rejected'])
+        return report
+
+
+class BulkRecognizer:
+    """
+    Dizindeki görüntüleri galeriyle toplu eşleştirir ve sonuçları dosyaya yazar.
+    Performance: Birden fazla görüntünün yüzleri tek recognize_topk çağrısında
+    (tek matris çarpımı) eşleştirilir.
+    """
+
+    FIELDS = ["path", "face_index", "top", "right", "bottom", "left", "user_name", "user_id",
+              "distance", "confidence", "is_match", "margin", "error"]
+
+    def __init__(self, recognizer: Any, pipeline: ImagePipeline, batch_size: int = 64, top_k: int = 2) -> None:
+        """
+        BulkRecognizer sınıfını başlatır.
+
+        Args:
+            recognizer: recognize_topk sunan tanıyıcı (FaceRecognizer veya ShardedFaceRecognizer)
+            pipeline: Görüntü işleme hattı
+            batch_size: Tek eşleştirmede toplanacak görüntü sayısı
+            top_k: Yüz başına aday sayısı (2 ve üzeri margin hesaplar)
+        """
+        if batch_size <= 0:
+            raise ValueError("Batch boyutu pozitif olmalıdır")
+
+        self._recognizer = recognizer
+        self._pipeline = pipeline
+        self._batch_size = batch_size
+        self._top_k = top_k
+
+    def _match(self, batch: List[ImageResult]) -> List[Dict[str, Any]]:
+        """Batch'teki tüm yüzleri tek seferde eşleştirir ve çıktı satırlarını üretir."""
+        encodings = [encoding for result in batch for encoding in result.encodings]
+        matches = iter(self._recognizer.recognize_topk(encodings, k=self._top_k) if encodings else [])
+
+        rows = []
+        for result in batch:
+            if result.error:
+                rows.append({'path': result.path, 'error': result.error})
+                continue
+
+            for face_index, location in enumerate(result.face_locations):
+                topk = next(matches)
+                best = topk.best
+                top, right, bottom, left = location
+                rows.append({
+                    'path': result.path, 'face_index': face_index,
+                    'top': top, 'right': right, 'bottom': bottom, 'left': left,
+                    'user_name': best.user_name if topk.is_match else "Bilinmeyen",
+                    'user_id': best.user_id if topk.is_match else None,
+                    'distance': round(best.distance, 6) if best else None,
+                    'confidence': round(max(0.0, 1.0 - best.distance), 6) if best else 0.0,
+                    'is_match': topk.is_match,
+                    'margin': round(topk.margin, 6) if topk.margin is not None else None
+                })
+        return rows
+
+    def run(self, root: Path, output_path: Path, output_format: Optional[str] = None,
+            on_image: Optional[Callable[[ImageResult], None]] = None) -> Dict[str, Any]:
+        """
+        Dizin ağacındaki tüm görüntüleri tanır.
+
+        Args:
+            root: Kök dizin
+            output_path: Sonuç dosyası
+            output_format: "csv" veya "jsonl" (varsayılan: dosya uzantısından)
+            on_image: Her görüntü işlendiğinde çağrılacak fonksiyon
+
+        Returns:
+            Çalışma raporu (sayaçlar, hata nedenleri, görüntü/s)
+        """
+        output_path = Path(output_path)
+        output_format = output_format or ("csv" if output_path.suffix.lower() == ".csv" else "jsonl")
+        if output_format not in ("csv", "jsonl"):
+            raise ValueError(f"Geçersiz çıktı formatı: {output_format}")
+
+        start_time = time.perf_counter()
+        report: Dict[str, Any] = {'images': 0, 'faces': 0, 'matched': 0, 'failures': Counter()}
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+            csv_writer = None
+            if output_format == "csv":
+                csv_writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+                csv_writer.writeheader()
+
+            def write(rows: List[Dict[str, Any]]) -> None:
+                for row in rows:
+                    if row.get('error'):
+                        report['failures'][row['error']] += 1
+                    else:
+                        report['faces'] += 1
+                        report['matched'] += int(row['is_match'])
+
+                    if csv_writer:
+                        csv_writer.writerow(row)
+                    else:
+                        f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+            batch: List[ImageResult] = []
+            items = ((None, path) for path in iter_image_files(root))
+            for result in self._pipeline.process(items):
+                report['images'] += 1
+                if not result.error and not result.encodings:
+                    result.error = ERROR_NO_FACE
+                batch.append(result)
+                if on_image:
+                    on_image(result)
+
+                if len(batch) >= self._batch_size:
+                    write(self._match(batch))
+                    batch.clear()
+
+            write(self._match(batch))
+
+        elapsed = time.perf_counter() - start_time
+        report['elapsed'] = elapsed
+        report['images_per_second'] = report['images'] / elapsed if elapsed > 0 else 0.0
+        report['failures'] = dict(report['failures'])
+        return report
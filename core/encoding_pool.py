@@ -0,0 +1,313 @@
+"""
+Encoding worker havuzu - Paylaşımlı bellek üzerinden çok çekirdekli yüz encoding
+"""
+
+import os
+import time
+import cv2
+import numpy as np
+import multiprocessing as mp
+import queue
+import threading
+from concurrent.futures import Future, InvalidStateError
+from multiprocessing import shared_memory
+from typing import List, Tuple, Optional, Dict
+
+
+# Worker'a gönderilen görevler: (ticket, slot_id, frame_shape, face_locations, with_quality)
+_STOP = None
+
+
+def _worker_main(shm_name: str, slot_bytes: int, tasks: "mp.Queue", results: "mp.Queue", owners) -> None:
+    """
+    Encoding worker süreci giriş noktası.
+    dlib modelleri süreç başına bir kez yüklenir; frame'ler paylaşımlı bellekten okunur.
+    Alınan slot'un sahibi paylaşımlı owners dizisine senkron yazılır; worker çökerse
+    (segfault, OOM) ana süreç hangi görevin yarım kaldığını buradan bulur.
+    """
+    from core.face_encoder import BatchFaceEncoder
+
+    # spawn ile resource tracker ana süreçle paylaşılır; unlink ana sürecin işidir
+    shm = shared_memory.SharedMemory(name=shm_name)
+    encoder = BatchFaceEncoder(chip_cache_size=0)
+    pid = os.getpid()
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is _STOP:
+                break
+
+            ticket, slot_id, shape, face_locations, with_quality = task
+            owners[slot_id] = pid
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot_id * slot_bytes)
+            try:
+                if with_quality:
+                    encodings = encoder.encode_with_quality(frame, face_locations)
+                else:
+                    encodings = encoder.encode_batch([(frame, face_locations)])[0]
+                results.put((ticket, encodings, None))
+            except Exception as e:
+                results.put((ticket, None, str(e)))
+            finally:
+                # Buffer referansı bırakılmazsa shm kapatılamaz
+                del frame
+    finally:
+        shm.close()
+
+
+class EncodingWorkerPool:
+    """
+    Süreç tabanlı encoding havuzu.
+    Performance: Frame'ler pickle edilmeden paylaşımlı bellek ring slot'larına kopyalanır,
+    sonuçlar görev numarası (ticket) ile geri döner.
+    Ölen worker'ın yarım kalan görevi hata ile sonuçlanır, slot'u geri alınır ve
+    yerine yeni worker başlatılır; çağıranlar sonsuza kadar beklemez.
+    Süre sınırı içinde hiçbir worker'ın almadığı görev (alırken ölen ya da görev kuyruğunun
+    kilidini tutarken ölen worker) kuyruğu kilitlemiş sayılır: bekleyen görevler hata ile
+    biter, görev kuyruğu ve worker'lar yenilenir.
+    """
+
+    # Worker sağlık kontrolü aralığı (saniye)
+    WATCHDOG_INTERVAL = 0.5
+
+    def __init__(self, num_workers: int = 2, num_slots: Optional[int] = None,
+                 slot_shape: Tuple[int, int, int] = (1080, 1920, 3), task_deadline: float = 30.0) -> None:
+        """
+        EncodingWorkerPool sınıfını başlatır.
+
+        Args:
+            num_workers: Worker süreç sayısı
+            num_slots: Ring slot sayısı (varsayılan: 2 x worker)
+            slot_shape: Slot başına maksimum frame boyutu (yükseklik, genişlik, kanal)
+            task_deadline: Kuyruktaki görevin bir worker tarafından alınması için süre sınırı (saniye)
+        """
+        if num_workers <= 0:
+            raise ValueError("Worker sayısı pozitif olmalıdır")
+        if task_deadline <= 0:
+            raise ValueError("Görev süre sınırı pozitif olmalıdır")
+
+        self._num_workers = num_workers
+        self._num_slots = num_slots or num_workers * 2
+        self._slot_shape = slot_shape
+        self._slot_bytes = int(np.prod(slot_shape))
+        self._task_deadline = task_deadline
+
+        self._shm = shared_memory.SharedMemory(create=True, size=self._num_slots * self._slot_bytes)
+
+        # Boş slot'lar; dolu olduğunda submit bekler (backpressure)
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        for slot_id in range(self._num_slots):
+            self._free_slots.put(slot_id)
+
+        # ticket -> (Future, slot_id, gönderim zamanı); ticket'lar yeniden kullanılmaz, geç gelen sonuçlar yok sayılır
+        self._pending: Dict[int, Tuple[Future, int, float]] = {}
+        self._pending_lock = threading.Lock()
+        self._next_ticket = 0
+        self._closed = False
+        self._restarts = 0
+
+        # fork + thread karışımından kaçınmak için spawn
+        self._ctx = mp.get_context("spawn")
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        # Slot başına görevi işleyen worker PID'i (0 = kuyrukta, henüz alınmadı)
+        self._owners = self._ctx.RawArray('i', self._num_slots)
+        self._workers = [self._start_worker() for _ in range(num_workers)]
+
+        self._collector = threading.Thread(target=self._collect_results, daemon=True)
+        self._collector.start()
+
+    def _slot_view(self, slot_id: int, shape: Tuple[int, ...]) -> np.ndarray:
+        """Slot için paylaşımlı bellek üzerinde numpy görünümü döndürür."""
+        return np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf, offset=slot_id * self._slot_bytes)
+
+    def _start_worker(self) -> mp.Process:
+        worker = self._ctx.Process(
+            target=_worker_main,
+            args=(self._shm.name, self._slot_bytes, self._tasks, self._results, self._owners),
+            daemon=True
+        )
+        worker.start()
+        return worker
+
+    def _finish(self, ticket: int, encodings, error: Optional[str]) -> None:
+        """Görevin Future'ını tamamlar ve slot'unu serbest bırakır (bilinmeyen ticket yok sayılır)."""
+        with self._pending_lock:
+            entry = self._pending.pop(ticket, None)
+        if entry is None:
+            return
+        future, slot_id, _ = entry
+        self._free_slots.put(slot_id)
+        try:
+            if error is not None:
+                future.set_exception(RuntimeError(f"Encoding worker hatası: {error}"))
+            else:
+                future.set_result(encodings)
+        except InvalidStateError:
+            # Çağıran beklemeyi bırakıp Future'ı iptal etmiş (ör. API zaman aşımı)
+            pass
+
+    def _reap_dead_workers(self) -> None:
+        """Ölen worker'ların yarım görevlerini hata ile bitirir ve worker'ı yeniden başlatır."""
+        for index, worker in enumerate(self._workers):
+            if self._closed or worker.is_alive():
+                continue
+            with self._pending_lock:
+                orphaned = [ticket for ticket, (_, slot_id, _) in self._pending.items()
+                            if self._owners[slot_id] == worker.pid]
+            self._workers[index] = self._start_worker()
+            self._restarts += 1
+            for ticket in orphaned:
+                self._finish(ticket, None, f"worker süreci sonlandı (exitcode={worker.exitcode})")
+
+    def _expire_unclaimed_tasks(self) -> None:
+        """
+        Süre sınırını aşan ve hiçbir worker'ın almadığı (sahibi 0) görevleri hata ile bitirir.
+        Worker görevi alıp sahipliği yazamadan ya da görev kuyruğunun kilidini tutarken ölmüş
+        olabilir; ikinci durumda kuyruk bir daha okunamayacağı için kuyruk ve worker'lar yenilenir.
+        """
+        now = time.monotonic()
+        with self._pending_lock:
+            if self._closed or not any(
+                    self._owners[slot_id] == 0 and now - submitted >= self._task_deadline
+                    for _, slot_id, submitted in self._pending.values()):
+                return
+            # Yeni görevler eski kuyruğa düşmesin diye kuyruk kilit altında değiştirilir
+            stale_tasks, self._tasks = self._tasks, self._ctx.Queue()
+            stale_workers, self._workers = self._workers, [self._start_worker() for _ in self._workers]
+            expired = list(self._pending)
+        self._restarts += len(stale_workers)
+
+        # Eski worker'lar kilitli kuyrukta ya da eski görevlerde takılı olabilir
+        for worker in stale_workers:
+            worker.terminate()
+        for worker in stale_workers:
+            worker.join(timeout=5)
+        stale_tasks.cancel_join_thread()
+        stale_tasks.close()
+        for ticket in expired:
+            self._finish(ticket, None, f"görev {self._task_deadline:.1f}s içinde bir worker tarafından alınmadı")
+
+    def _collect_results(self) -> None:
+        """Sonuç kuyruğunu okuyup Future'ları tamamlar; periyodik olarak worker'ları denetler."""
+        last_check = time.monotonic()
+        while True:
+            try:
+                item = self._results.get(timeout=self.WATCHDOG_INTERVAL)
+            except queue.Empty:
+                item = None
+            else:
+                if item is _STOP:
+                    break
+                self._finish(*item)
+
+            # Yük altında da (kuyruk hiç boşalmasa bile) denetim aralığı korunur
+            if item is None or time.monotonic() - last_check >= self.WATCHDOG_INTERVAL:
+                self._reap_dead_workers()
+                self._expire_unclaimed_tasks()
+                last_check = time.monotonic()
+
+    def submit(self, frame: np.ndarray, face_locations: Optional[List] = None,
+               with_quality: bool = False) -> Future:
+        """
+        Frame'i bir slot'a kopyalar ve encoding görevini kuyruğa ekler.
+
+        Args:
+            frame: Kaynak görüntü (BGR, uint8)
+            face_locations: Yüz konumları (top, right, bottom, left); None ise worker algılar
+            with_quality: True ise (encoding, SampleQuality) çiftleri döner
+
+        Returns:
+            Encoding listesini döndürecek Future
+        """
+        if self._closed:
+            raise RuntimeError("Encoding havuzu kapatılmış")
+        if frame is None or frame.size == 0:
+            future: Future = Future()
+            future.set_result([])
+            return future
+
+        if frame.ndim != 3 or frame.shape[2] != 3:
+            raise ValueError(f"Encoding havuzu 3 kanallı BGR frame bekler: {frame.shape}")
+
+        slot_id = self._free_slots.get()
+        try:
+            height, width = frame.shape[:2]
+            max_height, max_width = self._slot_shape[:2]
+            if height > max_height or width > max_width:
+                # Slot'a sığmayan frame'i doğrudan slot belleğine küçült
+                scale = min(max_height / height, max_width / width)
+                shape = (int(height * scale), int(width * scale), 3)
+                cv2.resize(frame, (shape[1], shape[0]), dst=self._slot_view(slot_id, shape))
+                if face_locations:
+                    face_locations = [
+                        (int(top * scale), int(right * scale), int(bottom * scale), int(left * scale))
+                        for top, right, bottom, left in face_locations
+                    ]
+            else:
+                shape = frame.shape
+                np.copyto(self._slot_view(slot_id, shape), frame)
+        except BaseException:
+            # Kopyalama başarısızsa slot havuza geri döner (sızmaz)
+            self._free_slots.put(slot_id)
+            raise
+
+        future = Future()
+        with self._pending_lock:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._pending[ticket] = (future, slot_id, time.monotonic())
+            self._owners[slot_id] = 0
+            # put engellemez (besleyici thread); kilit, kuyruk yenilenirken görevin eski kuyruğa düşmesini önler
+            self._tasks.put((ticket, slot_id, shape, face_locations, with_quality))
+        return future
+
+    def encode(self, frame: np.ndarray, face_locations: Optional[List] = None,
+               timeout: Optional[float] = 30.0) -> List[np.ndarray]:
+        """Frame'i havuzda encode eder ve sonucu bekler."""
+        return self.submit(frame, face_locations).result(timeout=timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Havuz istatistiklerini döndürür."""
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            'workers': self._num_workers,
+            'slots': self._num_slots,
+            'slot_bytes': self._slot_bytes,
+            'pending': pending,
+            'worker_restarts': self._restarts
+        }
+
+    def close(self) -> None:
+        """Worker'ları durdurur ve paylaşımlı belleği serbest bırakır."""
+        if self._closed:
+            return
+        self._closed = True
+
+        for _ in self._workers:
+            self._tasks.put(_STOP)
+        for worker in self._workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+        self._results.put(_STOP)
+        self._collector.join(timeout=5)
+
+        with self._pending_lock:
+            for future, _, _ in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        """Context manager desteği."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager desteği."""
+        self.close()
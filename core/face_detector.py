@@ -4,12 +4,22 @@ Yüz algılama servisi - Görüntülerde yüz tespiti yapar
 
 import cv2
 import numpy as np
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Union
 import face_recognition
 import threading
 import time
+import hashlib
+import io
+from PIL import Image
+from concurrent.futures import Future
 from functools import lru_cache
 import gc
+import sys
+
+from .face_encoder import BatchFaceEncoder
+from .encoding_pool import EncodingWorkerPool
+from .prepared_frame import PreparedFrame, FrameBufferPool
+from .sample_quality import SampleQuality
 
 
 class OptimizedFaceDetector:
@@ -18,8 +28,21 @@ class OptimizedFaceDetector:
     Performance: Threading, caching, memory management
     """
     
-    def __init__(self, max_workers: int = 2) -> None:
-        """FaceDetector sınıfını başlatır."""
+    # Aşama başına maksimum işlem genişliği
+    OPENCV_MAX_WIDTH = 640
+    DLIB_MAX_WIDTH = 480
+    ENCODING_MAX_WIDTH = 640
+    # Çözülmeden önce reddedilecek görüntü boyutu (decompression bomb koruması)
+    MAX_DECODE_PIXELS = 40_000_000
+    # Decode sırasında küçültme: (faktör, OpenCV bayrağı)
+    REDUCED_DECODE_FLAGS = (
+        (8, cv2.IMREAD_REDUCED_COLOR_8),
+        (4, cv2.IMREAD_REDUCED_COLOR_4),
+        (2, cv2.IMREAD_REDUCED_COLOR_2)
+    )
+    
+    def __init__(self, max_workers: int = 2, encoding_timeout: float = 30.0) -> None:
+        """FaceDetector sınıfını başlatır (encoding_timeout: havuz görevlerinin alınma süre sınırı)."""
         self._cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
         self._face_cascade = cv2.CascadeClassifier(self._cascade_path)
         
@@ -28,6 +51,7 @@ class OptimizedFaceDetector:
         
         # Performance settings
         self._max_workers = max_workers
+        self._encoding_timeout = encoding_timeout
         self._detection_cache: Dict[str, Any] = {}
         self._cache_timeout = 5.0  # seconds
         self._last_cleanup = time.time()
@@ -35,6 +59,12 @@ class OptimizedFaceDetector:
         # Threading lock
         self._lock = threading.Lock()
         
+        # Toplu encoding (enrolment ve API yükü için)
+        self._batch_encoder = BatchFaceEncoder()
+        
+        # Süreç tabanlı encoding havuzu (ilk kullanımda max_workers ile başlatılır)
+        self._encoding_pool: Optional[EncodingWorkerPool] = None
+        
         # Optimization parameters
         self._opencv_params = {
             'scaleFactor': 1.1,
@@ -54,10 +84,12 @@ class OptimizedFaceDetector:
     
     def _get_frame_hash(self, frame: np.ndarray) -> str:
         """Frame için hash oluşturur (caching için)."""
-        # Küçük bir sample alıp hash oluştur (performans için)
-        h, w = frame.shape[:2]
-        sample = frame[h//4:3*h//4, w//4:3*w//4]
-        return str(hash(sample.tobytes()))
+        # Orta satır bandı bitişik bellekte; tobytes() kopyası olmadan hash'lenir
+        h = frame.shape[0]
+        sample = frame[h//4:3*h//4]
+        if not sample.flags['C_CONTIGUOUS']:
+            sample = np.ascontiguousarray(sample)
+        return hashlib.blake2b(sample.data, digest_size=16).hexdigest()
     
     @lru_cache(maxsize=128)
     def _get_gray_frame(self, frame_hash: str, frame_data: bytes) -> np.ndarray:
@@ -66,12 +98,26 @@ class OptimizedFaceDetector:
         frame = frame.reshape((-1, frame.shape[-1]//3, 3))
         return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     
-    def detect_faces_opencv_optimized(self, frame: np.ndarray, use_cache: bool = True) -> List[Tuple[int, int, int, int]]:
+    def prepare_frame(self, frame: Union[np.ndarray, PreparedFrame],
+                      buffers: Optional[FrameBufferPool] = None) -> PreparedFrame:
+        """
+        Frame'i algılama ve encoding aşamalarında paylaşılacak şekilde hazırlar.
+        
+        Args:
+            frame: Ham BGR frame veya zaten hazırlanmış frame
+            buffers: Görünümler için önceden ayrılmış buffer havuzu (hot loop)
+            
+        Returns:
+            PreparedFrame nesnesi
+        """
+        return PreparedFrame.wrap(frame, buffers)
+    
+    def detect_faces_opencv_optimized(self, frame: Union[np.ndarray, PreparedFrame], use_cache: bool = True) -> List[Tuple[int, int, int, int]]:
         """
         Optimize edilmiş OpenCV yüz algılama.
         
         Args:
-            frame: Algılanacak görüntü frame'i
+            frame: Algılanacak görüntü frame'i (ham veya PreparedFrame)
             use_cache: Cache kullanımı
             
         Returns:
@@ -80,8 +126,10 @@ class OptimizedFaceDetector:
         if frame is None or frame.size == 0:
             return []
         
+        prepared = PreparedFrame.wrap(frame)
+        
         # Cache kontrolü
-        frame_hash = self._get_frame_hash(frame) if use_cache else None
+        frame_hash = self._get_frame_hash(prepared.frame) if use_cache else None
         if use_cache and frame_hash in self._detection_cache:
             cache_data = self._detection_cache[frame_hash]
             if time.time() - cache_data['timestamp'] < self._cache_timeout:
@@ -90,32 +138,14 @@ class OptimizedFaceDetector:
         # Cleanup check
         self._cleanup_cache()
         
-        # Frame'i optimize et
-        height, width = frame.shape[:2]
-        if width > 640:  # Resize for performance
-            scale = 640 / width
-            new_width, new_height = int(width * scale), int(height * scale)
-            frame = cv2.resize(frame, (new_width, new_height))
-            scale_factor = 1 / scale
-        else:
-            scale_factor = 1.0
-        
-        # Gri frame
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Histogram equalization for better detection
-        gray = cv2.equalizeHist(gray)
+        # Küçültülmüş + histogram eşitlenmiş gri görünüm (frame başına bir kez)
+        gray = prepared.equalized(self.OPENCV_MAX_WIDTH)
         
         # Yüz algılama
         faces = self._face_cascade.detectMultiScale(gray, **self._opencv_params)
         
-        # Scale back if resized
-        if scale_factor != 1.0:
-            faces = [(int(x * scale_factor), int(y * scale_factor), 
-                     int(w * scale_factor), int(h * scale_factor)) 
-                    for x, y, w, h in faces]
-        else:
-            faces = [(int(x), int(y), int(w), int(h)) for x, y, w, h in faces]
+        # Orijinal koordinatlara geri dönüştür
+        faces = prepared.rects_to_original(faces, self.OPENCV_MAX_WIDTH)
         
         # Cache'e kaydet
         if use_cache and frame_hash:
@@ -127,12 +157,12 @@ class OptimizedFaceDetector:
         
         return faces
     
-    def detect_faces_dlib_optimized(self, frame: np.ndarray, model: str = "hog") -> List[Tuple[int, int, int, int]]:
+    def detect_faces_dlib_optimized(self, frame: Union[np.ndarray, PreparedFrame], model: str = "hog") -> List[Tuple[int, int, int, int]]:
         """
         Optimize edilmiş dlib yüz algılama.
         
         Args:
-            frame: Algılanacak görüntü frame'i
+            frame: Algılanacak görüntü frame'i (ham veya PreparedFrame)
             model: "hog" (fast) or "cnn" (accurate)
             
         Returns:
@@ -141,43 +171,28 @@ class OptimizedFaceDetector:
         if frame is None or frame.size == 0:
             return []
         
-        # Frame boyutunu optimize et
-        height, width = frame.shape[:2]
-        if width > 480:  # dlib için daha küçük
-            scale = 480 / width
-            new_width, new_height = int(width * scale), int(height * scale)
-            frame = cv2.resize(frame, (new_width, new_height))
-            scale_factor = 1 / scale
-        else:
-            scale_factor = 1.0
-            
-        # RGB formatına çevir (face_recognition RGB bekler)
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        prepared = PreparedFrame.wrap(frame)
+        
+        # RGB görünüm (face_recognition RGB bekler, dlib için daha küçük)
+        rgb_frame = prepared.rgb(self.DLIB_MAX_WIDTH)
         
         # Yüz lokasyonlarını bul
         face_locations = face_recognition.face_locations(rgb_frame, model=model)
         
         # (top, right, bottom, left) formatından (x, y, w, h) formatına çevir
-        faces = []
-        for top, right, bottom, left in face_locations:
-            x, y = left, top
-            w, h = right - left, bottom - top
-            
-            # Scale back if resized
-            if scale_factor != 1.0:
-                x, y, w, h = int(x * scale_factor), int(y * scale_factor), int(w * scale_factor), int(h * scale_factor)
-            
-            faces.append((x, y, w, h))
-            
-        return faces
+        faces = [(left, top, right - left, bottom - top) for top, right, bottom, left in face_locations]
+        
+        return prepared.rects_to_original(faces, self.DLIB_MAX_WIDTH)
     
-    def get_face_encodings_optimized(self, frame: np.ndarray, known_face_locations: Optional[List] = None) -> List[np.ndarray]:
+    def get_face_encodings_optimized(self, frame: Union[np.ndarray, PreparedFrame], known_face_locations: Optional[List] = None,
+                                     track_ids: Optional[List] = None) -> List[np.ndarray]:
         """
         Optimize edilmiş yüz encoding çıkarma.
         
         Args:
-            frame: Encoding çıkarılacak görüntü frame'i
+            frame: Encoding çıkarılacak görüntü frame'i (ham veya PreparedFrame)
             known_face_locations: Bilinen yüz konumları (performans için)
+            track_ids: Yüz başına track kimliği; verilirse hizalanmış chip cache'i kullanılır
             
         Returns:
             Yüz encoding'lerinin listesi
@@ -185,34 +200,131 @@ class OptimizedFaceDetector:
         if frame is None or frame.size == 0:
             return []
         
-        # Frame boyutunu optimize et
-        height, width = frame.shape[:2]
-        if width > 640:
-            scale = 640 / width
-            new_width, new_height = int(width * scale), int(height * scale)
-            frame = cv2.resize(frame, (new_width, new_height))
-            
-            # Known locations'ı da scale et
-            if known_face_locations:
-                known_face_locations = [
-                    (int(top * scale), int(right * scale), int(bottom * scale), int(left * scale))
-                    for top, right, bottom, left in known_face_locations
-                ]
-            
-        # RGB formatına çevir
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        prepared = PreparedFrame.wrap(frame)
+        
+        # Track'li yüzlerde hizalamayı cache'ten al
+        if track_ids is not None and known_face_locations:
+            chips = self._batch_encoder.extract_chips(prepared, known_face_locations, track_ids)
+            return self._batch_encoder.encode_chips(chips)
+        
+        # Küçültülmüş RGB görünüm (algılama ile paylaşılır)
+        rgb_frame = prepared.rgb(self.ENCODING_MAX_WIDTH)
         
         # Eğer locations verilmemişse, önce algıla
         if known_face_locations is None:
             face_locations = face_recognition.face_locations(rgb_frame, model="hog")  # Fast model
         else:
-            face_locations = known_face_locations
+            face_locations = prepared.locations_to_scaled(known_face_locations, self.ENCODING_MAX_WIDTH)
         
         # Encoding'leri çıkar (num_jitters=1 for speed)
         face_encodings = face_recognition.face_encodings(rgb_frame, face_locations, num_jitters=1)
         
         return face_encodings
     
+    def get_face_encodings_batch(self, items: List[Tuple[np.ndarray, Optional[List]]],
+                                 use_pool: bool = False) -> List[List[np.ndarray]]:
+        """
+        Birden fazla frame için toplu encoding çıkarma.
+        
+        Args:
+            items: (frame, known_face_locations) çiftleri; locations None ise algılanır
+            use_pool: True ise frame'ler encoding worker havuzuna dağıtılır
+            
+        Returns:
+            Her frame için encoding listesi (girdi sırasıyla)
+        """
+        if not items:
+            return []
+        
+        if use_pool:
+            futures = [self.submit_encoding(frame, locations) for frame, locations in items]
+            return [future.result() for future in futures]
+        
+        return self._batch_encoder.encode_batch(items)
+    
+    def get_face_encodings_with_quality(self, frame: Union[np.ndarray, PreparedFrame],
+                                        known_face_locations: Optional[List] = None) -> List[Tuple[np.ndarray, SampleQuality]]:
+        """
+        Yüz encoding'lerini kalite ölçüleriyle birlikte çıkarır (kayıt için).
+        
+        Args:
+            frame: Kaynak görüntü (ham veya PreparedFrame)
+            known_face_locations: Orijinal koordinatlardaki yüz konumları; None ise algılanır
+            
+        Returns:
+            Yüz sırasıyla (encoding, kalite) çiftleri
+        """
+        if frame is None or frame.size == 0:
+            return []
+        return self._batch_encoder.encode_with_quality(frame, known_face_locations)
+    
+    def get_encoding_pool(self) -> EncodingWorkerPool:
+        """Encoding worker havuzunu döndürür (gerekirse max_workers ile başlatır)."""
+        with self._lock:
+            if self._encoding_pool is None:
+                self._encoding_pool = EncodingWorkerPool(num_workers=max(1, self._max_workers),
+                                                         task_deadline=self._encoding_timeout)
+            return self._encoding_pool
+    
+    def submit_encoding(self, frame: Union[np.ndarray, PreparedFrame], known_face_locations: Optional[List] = None,
+                        with_quality: bool = False) -> Future:
+        """
+        Frame'i encoding worker havuzuna gönderir.
+        
+        Args:
+            frame: Kaynak görüntü (BGR veya PreparedFrame)
+            known_face_locations: Yüz konumları; None ise worker algılar
+            with_quality: True ise (encoding, SampleQuality) çiftleri döner
+            
+        Returns:
+            Encoding listesini döndürecek Future
+        """
+        # Paylaşımlı belleğe tam frame yerine encoding boyutundaki görünüm kopyalanır
+        prepared = PreparedFrame.wrap(frame)
+        if known_face_locations is not None:
+            known_face_locations = prepared.locations_to_scaled(known_face_locations, self.ENCODING_MAX_WIDTH)
+        return self.get_encoding_pool().submit(prepared.scaled(self.ENCODING_MAX_WIDTH), known_face_locations, with_quality)
+    
+    def shutdown(self) -> None:
+        """Encoding worker havuzunu kapatır."""
+        with self._lock:
+            pool, self._encoding_pool = self._encoding_pool, None
+        if pool is not None:
+            pool.close()
+    
+    def get_aligned_chips(self, frame: np.ndarray, known_face_locations: List,
+                          track_ids: Optional[List] = None) -> List[np.ndarray]:
+        """
+        Yüzler için hizalanmış 150x150 chip'leri döndürür.
+        
+        Args:
+            frame: Kaynak görüntü (BGR)
+            known_face_locations: Yüz konumları (top, right, bottom, left)
+            track_ids: Yüz başına track kimliği (cache anahtarı)
+            
+        Returns:
+            Hizalanmış chip listesi
+        """
+        if frame is None or frame.size == 0 or not known_face_locations:
+            return []
+        
+        return self._batch_encoder.extract_chips(frame, known_face_locations, track_ids)
+    
+    def get_face_encodings_from_chips(self, chips: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        Hizalanmış chip'lerden encoding çıkarır (frame gerektirmez).
+        
+        Args:
+            chips: 150x150 RGB yüz chip'leri
+            
+        Returns:
+            Yüz encoding'lerinin listesi
+        """
+        if not chips:
+            return []
+        
+        return self._batch_encoder.encode_chips(chips)
+    
     def extract_face_region(self, frame: np.ndarray, face_coords: Tuple[int, int, int, int], padding: int = 10) -> Optional[np.ndarray]:
         """
         Optimize edilmiş yüz bölgesi çıkarma.
@@ -253,17 +365,41 @@ class OptimizedFaceDetector:
     def get_performance_stats(self) -> Dict[str, Any]:
         """Performance istatistiklerini döndürür."""
         with self._lock:
-            return {
+            stats = {
                 'cache_size': len(self._detection_cache),
                 'cache_timeout': self._cache_timeout,
                 'max_workers': self._max_workers,
                 'last_cleanup': self._last_cleanup
             }
+        stats.update(self._batch_encoder.chip_cache.get_stats())
+        if self._encoding_pool is not None:
+            stats['encoding_pool'] = self._encoding_pool.get_stats()
+        return stats
+    
+    def get_memory_stats(self) -> Dict[str, int]:
+        """Algılama cache'i, chip cache'i ve encoding havuzunun tuttuğu baytlar."""
+        with self._lock:
+            entries = list(self._detection_cache.items())
+        # Yaklaşık: anahtar + kayıt sözlüğü + yüz listesi ve kutuları
+        detection_bytes = sum(
+            sys.getsizeof(key) + sys.getsizeof(entry) + sys.getsizeof(entry['faces'])
+            + sum(sys.getsizeof(face) for face in entry['faces'])
+            for key, entry in entries
+        )
+        stats = {
+            'detection_cache': detection_bytes,
+            'chip_cache': self._batch_encoder.chip_cache.nbytes
+        }
+        if self._encoding_pool is not None:
+            pool_stats = self._encoding_pool.get_stats()
+            stats['encoding_pool_shm'] = pool_stats['slots'] * pool_stats['slot_bytes']
+        return stats
     
     def clear_cache(self) -> None:
         """Cache'i temizler."""
         with self._lock:
             self._detection_cache.clear()
+            self._batch_encoder.chip_cache.clear()
             gc.collect()
 
 
@@ -280,6 +416,53 @@ class FaceDetector(OptimizedFaceDetector):
     def get_face_encodings(self, frame: np.ndarray) -> List[np.ndarray]:
         return self.get_face_encodings_optimized(frame)
     
+    @classmethod
+    def decode_image(cls, image_data: bytes, target_width: Optional[int] = None,
+                     max_pixels: Optional[int] = None) -> np.ndarray:
+        """
+        Byte veriyi BGR görüntüye çözer; boyut sınırı çözmeden önce başlıktan kontrol edilir.
+        Performance: Hedef genişliğin katları kadar büyük görüntüler IMREAD_REDUCED_* ile
+        çözülürken küçültülür; tam çözünürlüklü ara görüntü hiç oluşturulmaz.
+        
+        Args:
+            image_data: Görüntü byte verisi
+            target_width: İşleme genişliği; çözülen genişlik bunun altına inmez (varsayılan: ENCODING_MAX_WIDTH)
+            max_pixels: Kabul edilen maksimum piksel sayısı (varsayılan: MAX_DECODE_PIXELS)
+            
+        Returns:
+            BGR görüntü
+            
+        Raises:
+            ValueError: Görüntü okunamazsa veya sınırı aşarsa
+        """
+        target_width = target_width or cls.ENCODING_MAX_WIDTH
+        max_pixels = max_pixels or cls.MAX_DECODE_PIXELS
+        width = height = None
+        try:
+            # PIL yalnızca başlığı okur (lazy); pikseller çözülmez
+            with Image.open(io.BytesIO(image_data)) as header:
+                width, height = header.size
+        except Image.DecompressionBombError:
+            raise ValueError("image dimensions exceed limit")
+        except Exception:
+            pass
+        
+        flag = cv2.IMREAD_COLOR
+        if width is not None:
+            if width * height > max_pixels:
+                raise ValueError(f"image dimensions exceed limit ({width}x{height})")
+            for factor, reduced_flag in cls.REDUCED_DECODE_FLAGS:
+                if width // factor >= target_width:
+                    flag = reduced_flag
+                    break
+        
+        frame = cv2.imdecode(np.frombuffer(image_data, np.uint8), flag)
+        if frame is None:
+            raise ValueError("unsupported or corrupt image")
+        if width is None and frame.shape[0] * frame.shape[1] > max_pixels:
+            raise ValueError("image dimensions exceed limit")
+        return frame
+    
     def detect_and_encode(self, image_data: bytes) -> List[np.ndarray]:
         """
         Byte veriden yüz algılama ve encoding çıkarma.
@@ -291,14 +474,10 @@ class FaceDetector(OptimizedFaceDetector):
             Yüz encoding'lerinin listesi
         """
         try:
-            # Byte veriden numpy array oluştur
-            nparr = np.frombuffer(image_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if frame is None:
-                return []
-            
+            frame = self.decode_image(image_data)
             return self.detect_and_encode_cv2(frame)
+        except ValueError:
+            return []
         except Exception as e:
             print(f"Error in detect_and_encode: {e}")
             return []
@@ -314,11 +493,8 @@ class FaceDetector(OptimizedFaceDetector):
             Yüz encoding'lerinin listesi
         """
         try:
-            # RGB formatına çevir (face_recognition RGB bekler)
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Yüz encoding'lerini çıkar
-            return self.get_face_encodings_optimized(rgb_frame)
+            # RGB dönüşümü get_face_encodings_optimized içinde bir kez yapılır
+            return self.get_face_encodings_optimized(frame)
         except Exception as e:
             print(f"Error in detect_and_encode_cv2: {e}")
             return [] 
\ No newline at end of file
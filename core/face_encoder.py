@@ -0,0 +1,290 @@
+"""
+Toplu yüz encoding servisi - Birden fazla frame ve yüz için batch encoding
+"""
+
+import dlib
+import numpy as np
+import face_recognition
+from face_recognition import api as fr_api
+from typing import List, Tuple, Optional, Sequence, Hashable, Dict, Any, Union
+from collections import OrderedDict
+import threading
+
+from .prepared_frame import PreparedFrame
+from .sample_quality import SampleQuality, assess_face
+
+
+# (top, right, bottom, left) - face_recognition konum formatı
+FaceLocation = Tuple[int, int, int, int]
+
+
+class AlignedChipCache:
+    """
+    Hizalanmış yüz chip'leri için küçük LRU cache.
+    Aynı track ve kutu için landmark + hizalama tekrar hesaplanmaz.
+    """
+
+    def __init__(self, max_size: int = 64) -> None:
+        """
+        AlignedChipCache sınıfını başlatır.
+
+        Args:
+            max_size: Cache'te tutulacak maksimum chip sayısı (0 = kapalı)
+        """
+        self._max_size = max_size
+        self._chips: "OrderedDict[Tuple[Hashable, FaceLocation], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def make_key(track_id: Hashable, face_location: FaceLocation) -> Tuple[Hashable, FaceLocation]:
+        """Track ID ve orijinal koordinatlardaki kutudan cache anahtarı üretir."""
+        return track_id, tuple(int(v) for v in face_location)
+
+    def get(self, key: Tuple[Hashable, FaceLocation]) -> Optional[np.ndarray]:
+        """Cache'teki chip'i döndürür, yoksa None."""
+        with self._lock:
+            chip = self._chips.get(key)
+            if chip is None:
+                self._misses += 1
+                return None
+            self._chips.move_to_end(key)
+            self._hits += 1
+            return chip
+
+    def put(self, key: Tuple[Hashable, FaceLocation], chip: np.ndarray) -> None:
+        """Chip'i cache'e ekler (salt okunur olarak saklanır)."""
+        if self._max_size <= 0:
+            return
+
+        chip.setflags(write=False)
+        with self._lock:
+            self._chips[key] = chip
+            self._chips.move_to_end(key)
+            while len(self._chips) > self._max_size:
+                self._chips.popitem(last=False)
+
+    def clear(self) -> None:
+        """Cache'i temizler."""
+        with self._lock:
+            self._chips.clear()
+
+    @property
+    def nbytes(self) -> int:
+        """Cache'teki chip'lerin toplam baytı."""
+        with self._lock:
+            return sum(chip.nbytes for chip in self._chips.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache istatistiklerini döndürür."""
+        with self._lock:
+            return {
+                'chip_cache_size': len(self._chips),
+                'chip_cache_hits': self._hits,
+                'chip_cache_misses': self._misses
+            }
+
+
+class BatchFaceEncoder:
+    """
+    Çoklu görüntü ve yüz için toplu encoding sınıfı.
+    Performance: Görüntü başına tek ön işleme, hizalanmış chip'ler üzerinde batch descriptor
+    """
+
+    # dlib face_recognition_model_v1 150x150 hizalanmış chip bekler
+    CHIP_SIZE = 150
+    CHIP_PADDING = 0.25
+
+    def __init__(self, batch_size: int = 32, num_jitters: int = 1, max_width: int = 640,
+                 chip_cache_size: int = 64) -> None:
+        """
+        BatchFaceEncoder sınıfını başlatır.
+
+        Args:
+            batch_size: Descriptor ağına tek seferde verilecek chip sayısı
+            num_jitters: Encoding jitter sayısı (1 = jitter yok, hızlı)
+            max_width: Ön işleme sırasında uygulanacak maksimum genişlik
+            chip_cache_size: Hizalanmış chip cache kapasitesi
+        """
+        if batch_size <= 0:
+            raise ValueError("Batch boyutu pozitif olmalıdır")
+
+        self._batch_size = batch_size
+        self._num_jitters = num_jitters
+        self._max_width = max_width
+
+        # face_recognition modül seviyesinde yüklediği dlib modellerini paylaş
+        self._pose_predictor = fr_api.pose_predictor_5_point
+        self._face_encoder = fr_api.face_encoder
+
+        # Track + kutu anahtarlı hizalama cache'i
+        self._chip_cache = AlignedChipCache(chip_cache_size)
+
+    @property
+    def chip_cache(self) -> AlignedChipCache:
+        """Hizalanmış chip cache'ini döndürür."""
+        return self._chip_cache
+
+    def prepare_image(self, frame: Union[np.ndarray, PreparedFrame],
+                      face_locations: Optional[List[FaceLocation]] = None) -> Tuple[np.ndarray, Optional[List[FaceLocation]]]:
+        """
+        BGR frame'in küçültülmüş RGB görünümünü döndürür (PreparedFrame ile paylaşılır).
+
+        Args:
+            frame: Kaynak görüntü (BGR veya PreparedFrame)
+            face_locations: Orijinal koordinatlardaki yüz konumları
+
+        Returns:
+            (RGB görüntü, ölçeklenmiş yüz konumları)
+        """
+        prepared = PreparedFrame.wrap(frame)
+        if face_locations is not None:
+            face_locations = prepared.locations_to_scaled(face_locations, self._max_width)
+
+        return prepared.rgb(self._max_width), face_locations
+
+    def align_faces(self, rgb_frame: np.ndarray, face_locations: List[FaceLocation],
+                    landmarks_out: Optional[List[np.ndarray]] = None) -> List[np.ndarray]:
+        """
+        Yüzleri 5 nokta landmark ile hizalar ve 150x150 chip'ler üretir.
+
+        Args:
+            rgb_frame: RGB görüntü
+            face_locations: Yüz konumları (top, right, bottom, left)
+            landmarks_out: Verilirse yüz başına (5, 2) landmark dizisi eklenir (kalite ölçümü için)
+
+        Returns:
+            Hizalanmış yüz chip'lerinin listesi
+        """
+        chips = []
+        for location in face_locations:
+            shape = self._pose_predictor(rgb_frame, fr_api._css_to_rect(location))
+            chips.append(dlib.get_face_chip(rgb_frame, shape, size=self.CHIP_SIZE, padding=self.CHIP_PADDING))
+            if landmarks_out is not None:
+                landmarks_out.append(np.array([(point.x, point.y) for point in shape.parts()], dtype=np.float32))
+        return chips
+
+    def extract_chips(self, frame: Union[np.ndarray, PreparedFrame], face_locations: List[FaceLocation],
+                      track_ids: Optional[Sequence[Hashable]] = None) -> List[np.ndarray]:
+        """
+        Frame'deki yüzler için hizalanmış chip'leri (cache'li) döndürür.
+
+        Tüm yüzler cache'te ise frame hiç ön işlenmez. Chip'ler 150x150x3 uint8
+        olduğundan süreçler arası tam frame yerine gönderilebilir.
+
+        Args:
+            frame: Kaynak görüntü (BGR veya PreparedFrame)
+            face_locations: Orijinal koordinatlardaki yüz konumları
+            track_ids: Yüz başına track kimliği (None ise cache kullanılmaz)
+
+        Returns:
+            Yüz sırasıyla hizalanmış chip listesi
+        """
+        if track_ids is not None and len(track_ids) != len(face_locations):
+            raise ValueError("track_ids ve face_locations uzunlukları eşleşmiyor")
+
+        chips: List[Optional[np.ndarray]] = [None] * len(face_locations)
+        keys = []
+        if track_ids is not None:
+            keys = [AlignedChipCache.make_key(track_id, location)
+                    for track_id, location in zip(track_ids, face_locations)]
+            chips = [self._chip_cache.get(key) for key in keys]
+
+        missing = [i for i, chip in enumerate(chips) if chip is None]
+        if missing:
+            rgb_frame, scaled_locations = self.prepare_image(frame, list(face_locations))
+            new_chips = self.align_faces(rgb_frame, [scaled_locations[i] for i in missing])
+            for i, chip in zip(missing, new_chips):
+                chips[i] = chip
+                if keys:
+                    self._chip_cache.put(keys[i], chip)
+
+        return chips
+
+    def encode_chips(self, chips: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        Hizalanmış chip'leri batch halinde descriptor ağından geçirir.
+
+        Args:
+            chips: 150x150 RGB yüz chip'leri
+
+        Returns:
+            128 boyutlu encoding'lerin listesi (girdi sırasıyla)
+        """
+        encodings: List[np.ndarray] = []
+        for start in range(0, len(chips), self._batch_size):
+            batch = list(chips[start:start + self._batch_size])
+            descriptors = self._face_encoder.compute_face_descriptor(batch, self._num_jitters)
+            encodings.extend(np.array(descriptor) for descriptor in descriptors)
+        return encodings
+
+    def encode_batch(self, items: Sequence[Tuple[Union[np.ndarray, PreparedFrame], Optional[List[FaceLocation]]]]) -> List[List[np.ndarray]]:
+        """
+        Birden fazla (görüntü, yüz konumları) çifti için encoding çıkarır.
+
+        Args:
+            items: (BGR frame, yüz konumları) çiftleri; konum None ise HOG ile algılanır
+
+        Returns:
+            Her girdi için, yüz sırasıyla encoding listesi
+        """
+        all_chips: List[np.ndarray] = []
+        counts: List[int] = []
+
+        for frame, face_locations in items:
+            if frame is None or frame.size == 0:
+                counts.append(0)
+                continue
+
+            rgb_frame, face_locations = self.prepare_image(frame, face_locations)
+            if face_locations is None:
+                face_locations = face_recognition.face_locations(rgb_frame, model="hog")
+
+            chips = self.align_faces(rgb_frame, face_locations)
+            all_chips.extend(chips)
+            counts.append(len(chips))
+
+        encodings = self.encode_chips(all_chips)
+
+        # Düz listeyi girdi sırasına göre tekrar böl
+        results: List[List[np.ndarray]] = []
+        offset = 0
+        for count in counts:
+            results.append(encodings[offset:offset + count])
+            offset += count
+        return results
+
+    def encode_with_quality(self, frame: Union[np.ndarray, PreparedFrame],
+                            face_locations: Optional[List[FaceLocation]] = None) -> List[Tuple[np.ndarray, SampleQuality]]:
+        """
+        Yüzleri encode eder ve her biri için kalite ölçülerini döndürür (kayıt akışı için).
+        Landmark'lar hizalama sırasında bir kez hesaplanır ve poz ölçümünde tekrar kullanılır.
+
+        Args:
+            frame: Kaynak görüntü (BGR veya PreparedFrame)
+            face_locations: Orijinal koordinatlardaki yüz konumları; None ise HOG ile algılanır
+
+        Returns:
+            Yüz sırasıyla (encoding, kalite) çiftleri
+        """
+        prepared = PreparedFrame.wrap(frame)
+        if prepared.size == 0:
+            return []
+
+        rgb_frame, scaled_locations = self.prepare_image(prepared, face_locations)
+        if scaled_locations is None:
+            scaled_locations = face_recognition.face_locations(rgb_frame, model="hog")
+        if not scaled_locations:
+            return []
+
+        landmarks: List[np.ndarray] = []
+        encodings = self.encode_chips(self.align_faces(rgb_frame, scaled_locations, landmarks))
+
+        # Kalite, descriptor ağının gördüğü çözünürlükte ölçülür
+        gray_frame = prepared.gray(self._max_width)
+        return [
+            (encoding, assess_face(gray_frame, location, points))
+            for encoding, location, points in zip(encodings, scaled_locations, landmarks)
+        ]
+
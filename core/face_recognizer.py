@@ -3,10 +3,14 @@ Yüz tanıma servisi - Kayıtlı yüzlerle karşılaştırma yapar
 """
 
 import numpy as np
-import face_recognition
-from typing import List, Tuple, Optional, Dict
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import List, Tuple, Optional, Dict, Sequence, Iterable, Iterator, Mapping
 from dataclasses import dataclass
 
+from .gallery_quantizer import ScalarQuantizer
+
 
 @dataclass
 class RecognitionResult:
@@ -14,46 +18,480 @@ class RecognitionResult:
     user_name: str
     confidence: float
     is_match: bool
+    user_id: Optional[int] = None
+
+
+@dataclass
+class RecognitionMatch:
+    """Top-k sonucundaki tek bir kullanıcı adayı."""
+    user_id: int
+    user_name: str
+    distance: float
+
+
+@dataclass
+class TopKResult:
+    """Bir yüz için en yakın k farklı kullanıcı ve en iyi/ikinci farkı."""
+    matches: List[RecognitionMatch]
+    margin: Optional[float]  # İkinci adayın mesafesi - en iyi mesafe (tek aday varsa None)
+    is_match: bool
+
+    @property
+    def best(self) -> Optional[RecognitionMatch]:
+        """En yakın aday (galeri boşsa None)."""
+        return self.matches[0] if self.matches else None
+
+
+@dataclass(frozen=True)
+class GallerySnapshot:
+    """
+    Galerinin belirli bir versiyondaki tutarlı görünümü.
+    Okuyucular bir snapshot üzerinde kilitsiz çalışır; yazmalar yeni versiyon yayınlar.
+    Diziler salt okunurdur ve snapshot pickle edilerek süreçlere gönderilebilir.
+    """
+    version: int
+    encodings: np.ndarray  # (count, 128) float32 satırlar; silinenler dahil (kuantalı galeride diskte, memmap)
+    labels: np.ndarray  # (count,) int32 kullanıcı ID'leri
+    alive: np.ndarray  # (count,) bool - False olan satırlar tombstone
+    users: Mapping[int, str]  # Kullanıcı tablosu: ID -> isim
+    active_count: int
+    codes: Optional[np.ndarray] = None  # (count, 128) kaba arama kodları (float16/int8)
+    code_norms: Optional[np.ndarray] = None  # (count,) kodların kare normları
+    quantizer: Optional[ScalarQuantizer] = None
+    max_rows_per_user: int = 0  # Kullanıcı başına satır sayısı üst sınırı
+
+    @property
+    def count(self) -> int:
+        """Tombstone'lar dahil satır sayısı."""
+        return len(self.alive)
+
+    def user_name(self, user_id: int) -> str:
+        """Kullanıcı ID'sinin adını döndürür."""
+        return self.users[int(user_id)]
 
 
 class FaceRecognizer:
     """
     Yüz tanıma işlemlerinden sorumlu sınıf.
     Single Responsibility Principle: Sadece yüz tanıma işlemlerini yapar.
+    Performance: Encoding'ler tek bir float32 matriste, sahipleri int32 etiket dizisinde
+    tutulur (encoding başına 128x4 + 4 bayt); silme tombstone ile yapılır ve matris
+    belirli bir ölü satır oranında sıkıştırılır. Opsiyonel kuantalı galeride bellekteki tek
+    indeks float16/int8 kodlardır (encoding başına 256/128 bayt); float32 satırlar diskteki
+    adsız bir dosyada (memmap) tutulur ve yalnızca kaba aramanın seçtiği adaylar için
+    okunarak kesin sıralama yapılır.
     """
     
-    def __init__(self, tolerance: float = 0.6) -> None:
+    ENCODING_SIZE = 128
+    INITIAL_CAPACITY = 64
+    
+    def __init__(self, tolerance: float = 0.6, compaction_ratio: float = 0.25,
+                 quantization: Optional[str] = None, rerank_candidates: int = 32,
+                 rerank_dir: Optional[str] = None) -> None:
         """
         FaceRecognizer sınıfını başlatır.
         
         Args:
             tolerance: Yüz eşleştirme toleransı (düşük = katı, yüksek = esnek)
+            compaction_ratio: Ölü satır oranı bu değeri aşınca matris sıkıştırılır
+            quantization: Kaba arama kodları: None (kapalı), "float16" veya "int8"
+            rerank_candidates: Kaba aramadan kesin sıralamaya geçen aday sayısı
+            rerank_dir: Kuantalı galeride float32 satırların dosyası için dizin (None = sistem geçici dizini)
         """
+        if quantization is not None and quantization not in ScalarQuantizer.MODES:
+            raise ValueError(f"Geçersiz kuantalama modu: {quantization}")
+        if rerank_candidates <= 0:
+            raise ValueError("Aday sayısı pozitif olmalıdır")
+        
         self._tolerance = tolerance
-        self._known_face_encodings: List[np.ndarray] = []
-        self._known_face_names: List[str] = []
+        self._compaction_ratio = compaction_ratio
+        self._quantization = quantization
+        self._rerank_candidates = rerank_candidates
+        self._rerank_dir = rerank_dir
+        # Yalnızca yazarlar kilitlenir; okuyucular yayınlanmış snapshot'ı kullanır
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._version = 0
+        self._quantizer: Optional[ScalarQuantizer] = None
+        self._codes: Optional[np.ndarray] = None
+        self._code_norms: Optional[np.ndarray] = None
+        self._max_rows = 0
+        self.load_known_faces([])
+    
+    def _publish(self) -> None:
+        """
+        Mevcut durumdan yeni snapshot yayınlar (kilit altında çağrılmalı).
+        
+        Eklemeler yalnızca snapshot'ın görmediği satırlara yazar; silme, sıkıştırma ve
+        kullanıcı tablosu değişiklikleri yeni nesneler oluşturur. Böylece eski snapshot'lar
+        hiçbir zaman değişmez. Referans ataması atomik olduğundan okuyucular eski ya da
+        yeni versiyonu görür.
+        """
+        if self._batch_depth:
+            return
+        
+        views = []
+        for array in (self._encodings, self._labels, self._alive, self._codes, self._code_norms):
+            view = None
+            if array is not None:
+                view = array[:self._count]
+                view.flags.writeable = False
+            views.append(view)
+        encodings, labels, alive, codes, code_norms = views
+        
+        self._version += 1
+        self._snapshot = GallerySnapshot(
+            version=self._version,
+            encodings=encodings,
+            labels=labels,
+            alive=alive,
+            users=self._users,
+            active_count=self._count - self._dead_count,
+            codes=codes,
+            code_norms=code_norms,
+            quantizer=self._quantizer,
+            max_rows_per_user=self._max_rows
+        )
+    
+    @contextmanager
+    def batch_update(self) -> Iterator["FaceRecognizer"]:
+        """
+        Birden fazla yazmayı tek galeri versiyonu olarak yayınlar.
+        Blok süresince okuyucular önceki versiyonu görmeye devam eder.
+        """
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                self._publish()
+    
+    def _to_rows(self, face_encodings: Sequence[np.ndarray]) -> np.ndarray:
+        """Encoding'leri doğrulayıp (n, 128) float32 matrise çevirir."""
+        for face_encoding in face_encodings:
+            self._validate_encoding(face_encoding)
+        return np.asarray(face_encodings, dtype=np.float32).reshape(len(face_encodings), self.ENCODING_SIZE)
+    
+    def _allocate(self, capacity: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Verilen kapasitede boş encoding, etiket ve alive dizileri ayırır."""
+        return (self._allocate_rows(capacity),
+                np.zeros(capacity, dtype=np.int32),
+                np.zeros(capacity, dtype=bool))
+    
+    def _allocate_rows(self, capacity: int) -> np.ndarray:
+        """
+        float32 encoding matrisini ayırır.
+        Kuantalı galeride matris diskteki adsız bir dosyaya eşlenir; sayfalar yalnızca
+        yeniden sıralanan aday satırlar okunurken belleğe gelir ve çekirdek tarafından geri alınabilir.
+        """
+        shape = (capacity, self.ENCODING_SIZE)
+        if self._quantization is None:
+            return np.empty(shape, dtype=np.float32)
+        
+        # POSIX'te dosya oluşturulur oluşturulmaz silinir; alan son eşleme kapanınca serbest kalır
+        with tempfile.TemporaryFile(dir=self._rerank_dir) as handle:
+            return np.memmap(handle, dtype=np.float32, mode="w+", shape=shape)
+    
+    def _quantize(self, encodings: np.ndarray, count: int) -> Tuple[Optional[ScalarQuantizer], Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        İlk count satır için kuantalayıcıyı kalibre eder ve kodları üretir.
+        
+        Args:
+            encodings: Kapasite boyutlu float32 encoding matrisi
+            count: Dolu satır sayısı
+        
+        Returns:
+            (kuantalayıcı, kod matrisi, kod normları); kuantalama kapalıysa None'lar
+        """
+        if self._quantization is None:
+            return None, None, None
+        
+        quantizer = ScalarQuantizer.fit(self._quantization, encodings[:count])
+        codes = np.zeros((len(encodings), self.ENCODING_SIZE), dtype=quantizer.dtype)
+        code_norms = np.zeros(len(encodings), dtype=np.float32)
+        # Diskteki matris bloklar halinde kodlanır; float32 satırların tamamı belleğe alınmaz
+        for start in range(0, count, ScalarQuantizer.CHUNK_ROWS):
+            end = min(start + ScalarQuantizer.CHUNK_ROWS, count)
+            codes[start:end] = quantizer.encode(encodings[start:end])
+        if count:
+            code_norms[:count] = quantizer.code_norms(codes[:count])
+        return quantizer, codes, code_norms
     
-    def add_known_face(self, face_encoding: np.ndarray, name: str) -> None:
+    def load_known_faces(self, entries: Iterable[Tuple[str, Sequence[np.ndarray]]],
+                         user_ids: Optional[Mapping[str, int]] = None) -> int:
+        """
+        Galeriyi verilen kullanıcılarla baştan kurar ve tek seferde yayınlar.
+        Yeni versiyon kilit dışında hazırlanır; okuyucular hiçbir zaman boş galeri görmez.
+        
+        Args:
+            entries: (isim, encoding listesi) çiftleri
+            user_ids: İsim -> kullanıcı ID eşlemesi (ör. veritabanı users.id); yoksa sıralı atanır
+        
+        Returns:
+            Yüklenen encoding sayısı
+        """
+        users: Dict[int, str] = {}
+        user_index: Dict[str, int] = {}
+        blocks: List[np.ndarray] = []
+        block_labels: List[int] = []
+        reserved = set(user_ids.values()) if user_ids else set()
+        next_id = 1
+        
+        for name, face_encodings in entries:
+            if not name or not name.strip():
+                raise ValueError("Geçersiz isim")
+            name = name.strip()
+            if len(face_encodings) == 0:
+                continue
+            
+            user_id = user_index.get(name)
+            if user_id is None:
+                if user_ids and name in user_ids:
+                    user_id = int(user_ids[name])
+                else:
+                    while next_id in reserved or next_id in users:
+                        next_id += 1
+                    user_id = next_id
+                users[user_id] = name
+                user_index[name] = user_id
+            
+            blocks.append(self._to_rows(face_encodings))
+            block_labels.append(user_id)
+        
+        count = sum(len(block) for block in blocks)
+        capacity = self.INITIAL_CAPACITY
+        while capacity < count:
+            capacity *= 2
+        
+        encodings, labels, alive = self._allocate(capacity)
+        if blocks:
+            np.concatenate(blocks, out=encodings[:count])
+            labels[:count] = np.repeat(block_labels, [len(block) for block in blocks])
+        alive[:count] = True
+        
+        rows_by_user: Dict[int, List[int]] = {}
+        for index, user_id in enumerate(labels[:count].tolist()):
+            rows_by_user.setdefault(user_id, []).append(index)
+        
+        quantizer, codes, code_norms = self._quantize(encodings, count)
+        
+        with self._lock:
+            self._encodings = encodings
+            self._labels = labels
+            self._alive = alive
+            self._quantizer = quantizer
+            self._codes = codes
+            self._code_norms = code_norms
+            self._users = users
+            self._user_index = user_index
+            self._rows_by_user = rows_by_user
+            self._max_rows = max(map(len, rows_by_user.values()), default=0)
+            self._count = count
+            self._dead_count = 0
+            self._publish()
+        
+        return count
+    
+    def _ensure_capacity(self, required: int) -> None:
+        """Dizi kapasitesini gerekirse ikiye katlayarak büyütür (kilit altında)."""
+        capacity = len(self._alive)
+        if required <= capacity:
+            return
+        
+        while capacity < required:
+            capacity *= 2
+        
+        encodings, labels, alive = self._allocate(capacity)
+        encodings[:self._count] = self._encodings[:self._count]
+        labels[:self._count] = self._labels[:self._count]
+        alive[:self._count] = self._alive[:self._count]
+        self._encodings = encodings
+        self._labels = labels
+        self._alive = alive
+        
+        if self._codes is not None:
+            codes = np.zeros((capacity, self.ENCODING_SIZE), dtype=self._codes.dtype)
+            codes[:self._count] = self._codes[:self._count]
+            code_norms = np.zeros(capacity, dtype=np.float32)
+            code_norms[:self._count] = self._code_norms[:self._count]
+            self._codes = codes
+            self._code_norms = code_norms
+    
+    def _register_user(self, name: str, user_id: Optional[int]) -> int:
+        """İsmi kullanıcı tablosuna ekler ve ID'sini döndürür (kilit altında)."""
+        existing = self._user_index.get(name)
+        if existing is not None:
+            if user_id is not None and user_id != existing:
+                raise ValueError(f"'{name}' zaten {existing} ID'si ile kayıtlı")
+            return existing
+        
+        if user_id is None:
+            user_id = max(self._users, default=0) + 1
+        elif user_id in self._users:
+            raise ValueError(f"Kullanıcı ID'si zaten kullanımda: {user_id}")
+        
+        # Copy-on-write: yayınlanmış snapshot'ların kullanıcı tablosu değişmez
+        users = dict(self._users)
+        users[user_id] = name
+        self._users = users
+        self._user_index[name] = user_id
+        return user_id
+    
+    @staticmethod
+    def _validate_encoding(face_encoding: np.ndarray) -> None:
+        """Encoding geçerliliğini kontrol eder."""
+        if face_encoding is None or len(face_encoding) == 0:
+            raise ValueError("Geçersiz face encoding")
+    
+    def add_known_face(self, face_encoding: np.ndarray, name: str, user_id: Optional[int] = None) -> None:
         """
         Bilinen yüzler listesine yeni bir yüz ekler.
         
         Args:
             face_encoding: Yüzün encoding verisi
             name: Yüzün sahibinin adı
+            user_id: Kullanıcı ID'si (opsiyonel)
+        """
+        self.add_known_faces([face_encoding], name, user_id)
+    
+    def add_known_faces(self, face_encodings: Sequence[np.ndarray], name: str,
+                        user_id: Optional[int] = None) -> int:
+        """
+        Bir kullanıcının birden fazla encoding'ini tek versiyonda ekler.
+        
+        Args:
+            face_encodings: Yüz encoding'leri
+            name: Yüzlerin sahibinin adı
+            user_id: Kullanıcı ID'si (ör. veritabanı users.id); yoksa otomatik atanır
+        
+        Returns:
+            Eklenen encoding sayısı
         """
-        if face_encoding is None or len(face_encoding) == 0:
-            raise ValueError("Geçersiz face encoding")
-            
         if not name or not name.strip():
             raise ValueError("Geçersiz isim")
+        if len(face_encodings) == 0:
+            return 0
+        
+        name = name.strip()
+        rows = self._to_rows(face_encodings)
+        
+        with self._lock:
+            user_id = self._register_user(name, user_id)
             
-        self._known_face_encodings.append(face_encoding)
-        self._known_face_names.append(name.strip())
+            start = self._count
+            end = start + len(rows)
+            self._ensure_capacity(end)
+            
+            # Yayınlanmış snapshot'ların görmediği satırlara yaz
+            self._encodings[start:end] = rows
+            self._labels[start:end] = user_id
+            self._alive[start:end] = True
+            if self._codes is not None:
+                # Mevcut kalibrasyonla kodla; aralık dışı değerler sıkıştırmada yeniden kalibre edilir
+                self._codes[start:end] = self._quantizer.encode(rows)
+                self._code_norms[start:end] = self._quantizer.code_norms(self._codes[start:end])
+            user_rows = self._rows_by_user.setdefault(user_id, [])
+            user_rows.extend(range(start, end))
+            self._max_rows = max(self._max_rows, len(user_rows))
+            self._count = end
+            self._publish()
+        
+        return len(rows)
+    
+    def remove_user(self, name: str) -> int:
+        """
+        Kullanıcının tüm encoding'lerini tombstone ile kaldırır.
+        
+        Args:
+            name: Kaldırılacak kullanıcının adı
+        
+        Returns:
+            Kaldırılan encoding sayısı
+        """
+        if not name:
+            return 0
+        
+        with self._lock:
+            user_id = self._user_index.pop(name.strip(), None)
+            if user_id is None:
+                return 0
+            
+            rows = self._rows_by_user.pop(user_id, [])
+            users = dict(self._users)
+            del users[user_id]
+            self._users = users
+            
+            # Copy-on-write: yayınlanmış snapshot'ların alive maskesi değişmez
+            alive = self._alive.copy()
+            alive[rows] = False
+            self._alive = alive
+            self._dead_count += len(rows)
+            
+            if self._dead_count > self._count * self._compaction_ratio:
+                self._compact_locked()
+            self._publish()
+        
+        return len(rows)
+    
+    def compact(self) -> int:
+        """
+        Tombstone satırlarını matristen atar.
+        
+        Returns:
+            Atılan satır sayısı
+        """
+        with self._lock:
+            removed = self._dead_count
+            if removed:
+                self._compact_locked()
+                self._publish()
+        return removed
+    
+    def _compact_locked(self) -> None:
+        """Canlı satırları yeni dizilere taşır (kilit altında)."""
+        keep = np.flatnonzero(self._alive[:self._count])
+        capacity = max(self.INITIAL_CAPACITY, len(self._alive))
+        
+        encodings, labels, alive = self._allocate(capacity)
+        for start in range(0, len(keep), ScalarQuantizer.CHUNK_ROWS):
+            block = keep[start:start + ScalarQuantizer.CHUNK_ROWS]
+            encodings[start:start + len(block)] = self._encodings[block]
+        labels[:len(keep)] = self._labels[keep]
+        alive[:len(keep)] = True
+        
+        rows_by_user: Dict[int, List[int]] = {}
+        for index, user_id in enumerate(labels[:len(keep)].tolist()):
+            rows_by_user.setdefault(user_id, []).append(index)
+        
+        self._encodings = encodings
+        self._labels = labels
+        self._alive = alive
+        self._rows_by_user = rows_by_user
+        self._max_rows = max(map(len, rows_by_user.values()), default=0)
+        self._count = len(keep)
+        self._dead_count = 0
+        self._quantizer, self._codes, self._code_norms = self._quantize(encodings, len(keep))
     
     def clear_known_faces(self) -> None:
         """Bilinen yüzler listesini temizler."""
-        self._known_face_encodings.clear()
-        self._known_face_names.clear()
+        self.load_known_faces([])
+    
+    def get_snapshot(self) -> GallerySnapshot:
+        """Galerinin güncel tutarlı görünümünü döndürür."""
+        return self._snapshot
+    
+    def get_version(self) -> int:
+        """Galeri versiyonunu döndürür (her güncellemede artar)."""
+        return self._snapshot.version
+    
+    def get_user_id(self, name: str) -> Optional[int]:
+        """Kullanıcının galeri ID'sini döndürür, yoksa None."""
+        return self._user_index.get(name.strip()) if name else None
+    
+    def get_user_table(self) -> Dict[int, str]:
+        """Kullanıcı tablosunun (ID -> isim) kopyasını döndürür."""
+        return dict(self._snapshot.users)
     
     def recognize_faces(self, face_encodings: List[np.ndarray]) -> List[RecognitionResult]:
         """
@@ -61,79 +499,220 @@ class FaceRecognizer:
         
         Args:
             face_encodings: Tanınacak yüzlerin encoding'leri
-            
+        
         Returns:
             Tanıma sonuçlarının listesi
         """
         if not face_encodings:
             return []
-            
-        if not self._known_face_encodings:
+        
+        # Tüm yüzler aynı galeri versiyonuna karşı eşleştirilir
+        snapshot = self._snapshot
+        if snapshot.active_count == 0:
             return [RecognitionResult("Bilinmeyen", 0.0, False) for _ in face_encodings]
         
         results = []
         
         for face_encoding in face_encodings:
-            result = self._recognize_single_face(face_encoding)
+            result = self._recognize_single_face(face_encoding, snapshot)
             results.append(result)
-            
+        
         return results
     
-    def _recognize_single_face(self, face_encoding: np.ndarray) -> RecognitionResult:
+    def _recognize_single_face(self, face_encoding: np.ndarray,
+                               snapshot: Optional[GallerySnapshot] = None) -> RecognitionResult:
         """
         Tek bir yüz encoding'ini tanır.
         
         Args:
             face_encoding: Tanınacak yüzün encoding'i
-            
+            snapshot: Kullanılacak galeri görünümü (None ise güncel)
+        
         Returns:
             Tanıma sonucu
         """
         if face_encoding is None or len(face_encoding) == 0:
             return RecognitionResult("Geçersiz", 0.0, False)
         
-        # Tüm bilinen yüzlerle karşılaştır
-        face_distances = face_recognition.face_distance(self._known_face_encodings, face_encoding)
+        snapshot = snapshot or self._snapshot
+        if snapshot.active_count == 0:
+            return RecognitionResult("Bilinmeyen", 0.0, False)
+        
+        probe = np.asarray(face_encoding, dtype=np.float32)
+        candidates, face_distances = self._candidate_distances(probe, snapshot)
         
         # En yakın eşleşmeyi bul
-        best_match_index = np.argmin(face_distances)
-        best_distance = face_distances[best_match_index]
+        best = np.argmin(face_distances)
+        best_match_index = candidates[best]
+        best_distance = float(face_distances[best])
         
         # Eşleşme kontrolü
         is_match = best_distance <= self._tolerance
         confidence = max(0.0, 1.0 - best_distance)  # Mesafeyi güven skoruna çevir
         
         if is_match:
-            name = self._known_face_names[best_match_index]
-            return RecognitionResult(name, confidence, True)
+            user_id = int(snapshot.labels[best_match_index])
+            return RecognitionResult(snapshot.user_name(user_id), confidence, True, user_id)
         else:
             return RecognitionResult("Bilinmeyen", confidence, False)
     
+    def recognize_topk(self, face_encodings: Sequence[np.ndarray], k: int = 3) -> List[TopKResult]:
+        """
+        Her yüz için en yakın k farklı kullanıcıyı ve en iyi/ikinci mesafe farkını döndürür.
+        
+        Performance: Tüm sorgular tek matris çarpımıyla mesafelenir ve satırlar tam
+        sıralama yerine argpartition ile seçilir. Kullanıcı başına en fazla S satır varsa
+        en iyi k kullanıcının en yakın satırları ilk k*S satır içindedir.
+        
+        Args:
+            face_encodings: Tanınacak yüzlerin encoding'leri
+            k: Yüz başına döndürülecek farklı kullanıcı sayısı
+        
+        Returns:
+            Yüz sırasıyla TopKResult listesi
+        """
+        if k <= 0:
+            raise ValueError("k pozitif olmalıdır")
+        if len(face_encodings) == 0:
+            return []
+        
+        snapshot = self._snapshot
+        if snapshot.active_count == 0:
+            return [TopKResult([], None, False) for _ in face_encodings]
+        
+        probes = self._to_rows(face_encodings)
+        # Farklı k kullanıcıyı garanti eden satır sayısı
+        row_budget = min(snapshot.active_count, k * max(1, snapshot.max_rows_per_user))
+        
+        if snapshot.codes is not None and snapshot.active_count > max(self._rerank_candidates, row_budget):
+            # Kuantalı galeri: sorgu başına kaba arama + kesin yeniden sıralama
+            candidate_sets = [self._candidate_distances(probe, snapshot, row_budget) for probe in probes]
+        else:
+            candidate_sets = self._batch_candidate_distances(probes, snapshot, row_budget)
+        
+        return [self._build_topk(rows, distances, snapshot, k) for rows, distances in candidate_sets]
+    
+    def _batch_candidate_distances(self, probes: np.ndarray, snapshot: GallerySnapshot,
+                                   row_budget: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Sorgu matrisi için her sorgunun en yakın row_budget satırını ve kesin mesafelerini bulur.
+        
+        Args:
+            probes: (p, 128) float32 sorgular
+            snapshot: Galeri görünümü
+            row_budget: Sorgu başına seçilecek satır sayısı
+        
+        Returns:
+            Sorgu başına (satır indeksleri, Öklid mesafeleri)
+        """
+        encodings = snapshot.encodings
+        # ||x - y||² = ||x||² - 2 x·y + ||y||² (p x n tek matris çarpımı)
+        squared = probes @ encodings.T
+        squared *= -2.0
+        squared += np.einsum("ij,ij->i", encodings, encodings)
+        squared += np.einsum("ij,ij->i", probes, probes)[:, None]
+        if snapshot.active_count < snapshot.count:
+            squared[:, ~snapshot.alive] = np.inf
+        
+        if row_budget < snapshot.count:
+            rows = np.argpartition(squared, row_budget - 1, axis=1)[:, :row_budget]
+        else:
+            rows = np.broadcast_to(np.arange(snapshot.count), (len(probes), snapshot.count))
+        
+        results = []
+        for probe, probe_rows in zip(probes, rows):
+            probe_rows = probe_rows[snapshot.alive[probe_rows]]
+            # Seçilen satırlar için kesin mesafe (face_distance ile aynı)
+            results.append((probe_rows, np.linalg.norm(encodings[probe_rows] - probe, axis=1)))
+        return results
+    
+    def _build_topk(self, rows: np.ndarray, distances: np.ndarray,
+                    snapshot: GallerySnapshot, k: int) -> TopKResult:
+        """Aday satırlardan en yakın k farklı kullanıcıyı seçer."""
+        matches: List[RecognitionMatch] = []
+        seen = set()
+        for position in np.argsort(distances, kind="stable"):
+            user_id = int(snapshot.labels[rows[position]])
+            if user_id in seen:
+                continue
+            seen.add(user_id)
+            matches.append(RecognitionMatch(user_id, snapshot.user_name(user_id), float(distances[position])))
+            if len(matches) == k:
+                break
+        
+        margin = matches[1].distance - matches[0].distance if len(matches) > 1 else None
+        is_match = bool(matches) and matches[0].distance <= self._tolerance
+        return TopKResult(matches, margin, is_match)
+    
+    def _candidate_distances(self, probe: np.ndarray, snapshot: GallerySnapshot,
+                             min_candidates: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sorgu için aday satırları ve kesin (float32) mesafelerini döndürür.
+        
+        Kuantalı galeride kaba mesafelerle en iyi adaylar seçilir ve yalnızca onların
+        float32 satırları diskten okunarak yeniden sıralanır; aksi halde tüm canlı satırlar adaydır.
+        
+        Args:
+            probe: (128,) float32 sorgu encoding'i
+            snapshot: Galeri görünümü (en az bir canlı satır içermeli)
+            min_candidates: Kaba aramadan geçecek en az aday sayısı
+        
+        Returns:
+            (satır indeksleri, face_recognition.face_distance ile aynı Öklid mesafeleri)
+        """
+        candidate_count = max(self._rerank_candidates, min_candidates)
+        if snapshot.codes is not None and snapshot.active_count > candidate_count:
+            coarse = snapshot.quantizer.coarse_distances(snapshot.codes, snapshot.code_norms, probe)
+            if snapshot.active_count < snapshot.count:
+                coarse[~snapshot.alive] = np.inf
+            candidates = np.argpartition(coarse, candidate_count - 1)[:candidate_count]
+            return candidates, np.linalg.norm(snapshot.encodings[candidates] - probe, axis=1)
+        
+        # Tüm bilinen yüzlerle karşılaştır
+        if snapshot.active_count < snapshot.count:
+            candidates = np.flatnonzero(snapshot.alive)
+            return candidates, np.linalg.norm(snapshot.encodings[candidates] - probe, axis=1)
+        return np.arange(snapshot.count), np.linalg.norm(snapshot.encodings - probe, axis=1)
+    
     def get_known_faces_count(self) -> int:
         """Kayıtlı yüz sayısını döndürür."""
-        return len(self._known_face_encodings)
+        return self._snapshot.active_count
     
     def get_known_names(self) -> List[str]:
-        """Kayıtlı isimlerin listesini döndürür."""
-        return self._known_face_names.copy()
+        """Kayıtlı isimlerin listesini döndürür (encoding başına bir isim)."""
+        snapshot = self._snapshot
+        return [snapshot.users[user_id] for user_id in snapshot.labels[snapshot.alive].tolist()]
+    
+    def get_gallery_stats(self) -> Dict[str, int]:
+        """
+        Galeri istatistiklerini döndürür.
+        bytes ve coarse_bytes bellekte tutulan, rerank_bytes diskte (memmap) tutulan baytlardır.
+        """
+        with self._lock:
+            on_disk = self._codes is not None
+            in_memory = self._labels.nbytes + self._alive.nbytes
+            return {
+                'version': self._version,
+                'active': self._count - self._dead_count,
+                'tombstones': self._dead_count,
+                'capacity': len(self._alive),
+                'users': len(self._users),
+                'bytes': in_memory if on_disk else in_memory + self._encodings.nbytes,
+                'coarse_bytes': self._codes.nbytes + self._code_norms.nbytes if on_disk else 0,
+                'rerank_bytes': self._encodings.nbytes if on_disk else 0
+            }
     
     def remove_known_face(self, name: str) -> bool:
         """
-        Belirtilen isimli yüzü bilinen yüzler listesinden kaldırır.
+        Belirtilen isimli kullanıcının tüm yüzlerini bilinen yüzlerden kaldırır.
         
         Args:
             name: Kaldırılacak yüzün sahibinin adı
-            
+        
         Returns:
             Başarılı ise True, bulunamadı ise False
         """
-        try:
-            index = self._known_face_names.index(name)
-            self._known_face_encodings.pop(index)
-            self._known_face_names.pop(index)
-            return True
-        except ValueError:
-            return False
+        return self.remove_user(name) > 0
     
     def update_tolerance(self, new_tolerance: float) -> None:
         """
@@ -144,9 +723,9 @@ class FaceRecognizer:
         """
         if not 0.0 <= new_tolerance <= 1.0:
             raise ValueError("Tolerans 0.0 ile 1.0 arasında olmalıdır")
-            
+        
         self._tolerance = new_tolerance
     
     def get_tolerance(self) -> float:
         """Mevcut tolerans değerini döndürür."""
-        return self._tolerance 
\ No newline at end of file
+        return self._tolerance
@@ -0,0 +1,140 @@
+"""
+Galeri kuantalama servisi - Kaba arama için float16 / int8 encoding kodları
+"""
+
+import numpy as np
+from typing import Optional
+
+
+class ScalarQuantizer:
+    """
+    Boyut başına skaler kuantalayıcı.
+    Performance: Kaba arama 128 baytlık (int8) veya 256 baytlık (float16) kodlar üzerinde
+    yapılır; kesin sıralama yalnızca aday satırlar için float32 ile hesaplanır.
+    """
+
+    MODES = ("float16", "int8")
+    # Kaba mesafe hesabında float32'ye çevrilen satır bloğu (geçici bellek sınırı)
+    CHUNK_ROWS = 4096
+    # Kalibrasyon aralığına eklenecek pay (sonradan eklenen encoding'ler için)
+    RANGE_MARGIN = 0.25
+    # Veri yokken varsayılan aralık (dlib encoding değerleri bu aralıkta kalır)
+    DEFAULT_RANGE = (-0.5, 0.5)
+
+    def __init__(self, mode: str, offset: Optional[np.ndarray] = None,
+                 scale: Optional[np.ndarray] = None) -> None:
+        """
+        ScalarQuantizer sınıfını başlatır.
+
+        Args:
+            mode: "float16" veya "int8"
+            offset: Boyut başına kaydırma (int8)
+            scale: Boyut başına ölçek (int8)
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Geçersiz kuantalama modu: {mode}")
+
+        self._mode = mode
+        self._dtype = np.float16 if mode == "float16" else np.int8
+        if mode == "int8":
+            low, high = self.DEFAULT_RANGE
+            self._offset = offset if offset is not None else np.full(128, (low + high) / 2, dtype=np.float32)
+            self._scale = scale if scale is not None else np.full(128, (high - low) / 254, dtype=np.float32)
+        else:
+            self._offset = None
+            self._scale = None
+
+    @classmethod
+    def fit(cls, mode: str, encodings: np.ndarray) -> "ScalarQuantizer":
+        """
+        Kuantalayıcıyı verilen encoding'lerin boyut başına aralığına göre kalibre eder.
+
+        Args:
+            mode: "float16" veya "int8"
+            encodings: (n, 128) float32 encoding matrisi
+
+        Returns:
+            Kalibre edilmiş kuantalayıcı
+        """
+        if mode != "int8" or len(encodings) == 0:
+            return cls(mode)
+
+        low = encodings.min(axis=0)
+        high = encodings.max(axis=0)
+        margin = (high - low) * cls.RANGE_MARGIN + 1e-3
+        low, high = low - margin, high + margin
+
+        offset = ((low + high) / 2).astype(np.float32)
+        scale = ((high - low) / 254).astype(np.float32)
+        return cls(mode, offset, scale)
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Kod dizilerinin veri tipi."""
+        return np.dtype(self._dtype)
+
+    def encode(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Encoding'leri kodlara çevirir.
+
+        Args:
+            rows: (n, 128) float32 encoding'ler
+
+        Returns:
+            (n, 128) kod matrisi
+        """
+        if self._mode == "float16":
+            return rows.astype(np.float16)
+
+        codes = np.rint((rows - self._offset) / self._scale)
+        return np.clip(codes, -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Kodlardan yaklaşık float32 encoding'leri geri üretir."""
+        if self._mode == "float16":
+            return codes.astype(np.float32)
+        return codes.astype(np.float32) * self._scale + self._offset
+
+    def code_norms(self, codes: np.ndarray) -> np.ndarray:
+        """Geri üretilmiş encoding'lerin kare normları (satır başına float32)."""
+        norms = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), self.CHUNK_ROWS):
+            block = self.decode(codes[start:start + self.CHUNK_ROWS])
+            norms[start:start + len(block)] = np.einsum("ij,ij->i", block, block)
+        return norms
+
+    def coarse_distances(self, codes: np.ndarray, norms: np.ndarray, probe: np.ndarray) -> np.ndarray:
+        """
+        Kodlar ile sorgu arasındaki yaklaşık kare mesafeleri hesaplar.
+
+        ||x - y||² = ||x||² - 2 x·y + ||y||² açılımı kullanılır; x·y int8 kodlar için
+        q·(s∘y) + o·y olarak hesaplanır, böylece matris hiç geri üretilmez.
+
+        Args:
+            codes: (n, 128) kod matrisi
+            norms: Satır başına ||x||² değerleri
+            probe: (128,) float32 sorgu encoding'i
+
+        Returns:
+            (n,) float32 yaklaşık kare mesafeler
+        """
+        if self._mode == "float16":
+            weights, bias = probe, 0.0
+        else:
+            weights, bias = probe * self._scale, float(self._offset @ probe)
+
+        distances = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), self.CHUNK_ROWS):
+            block = codes[start:start + self.CHUNK_ROWS].astype(np.float32)
+            distances[start:start + len(block)] = block @ weights
+
+        distances += bias
+        distances *= -2.0
+        distances += norms
+        distances += float(probe @ probe)
+        return distances
+
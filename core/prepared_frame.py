@@ -0,0 +1,186 @@
+"""
+Frame hazırlama servisi - Algılama ve encoding aşamaları arasında paylaşılan görünümler
+"""
+
+import cv2
+import numpy as np
+from typing import Dict, List, Tuple, Optional, Union
+
+
+# (x, y, w, h) - OpenCV dikdörtgen formatı
+Rect = Tuple[int, int, int, int]
+# (top, right, bottom, left) - face_recognition konum formatı
+FaceLocation = Tuple[int, int, int, int]
+
+
+class FrameBufferPool:
+    """
+    Hot loop için önceden ayrılmış hedef buffer havuzu.
+    Buffer'lar isimle tutulur ve yalnızca boyut değiştiğinde (ör. kamera çözünürlüğü)
+    yeniden ayrılır; kararlı durumda frame başına yeni dizi oluşturulmaz.
+    """
+
+    def __init__(self) -> None:
+        """FrameBufferPool sınıfını başlatır."""
+        self._buffers: Dict[str, np.ndarray] = {}
+
+    def get(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        İsimli buffer'ı döndürür; yoksa veya boyutu farklıysa yeniden ayırır.
+
+        Args:
+            name: Buffer adı
+            shape: İstenen boyut
+            dtype: Veri tipi
+
+        Returns:
+            Önceden ayrılmış (içeriği tanımsız) dizi
+        """
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
+
+    def clear(self) -> None:
+        """Tüm buffer'ları serbest bırakır."""
+        self._buffers.clear()
+
+    @property
+    def nbytes(self) -> int:
+        """Havuzda tutulan toplam bayt."""
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+
+class PreparedFrame:
+    """
+    Yakalanan frame başına bir kez oluşturulan hazırlık nesnesi.
+    Performance: Küçültme, gri, histogram eşitleme ve RGB dönüşümleri ilk ihtiyaçta
+    hesaplanır ve frame boyunca tekrar kullanılır (her dönüşüm en fazla bir kez).
+    """
+
+    def __init__(self, frame: np.ndarray, buffers: Optional[FrameBufferPool] = None) -> None:
+        """
+        PreparedFrame sınıfını başlatır.
+
+        Args:
+            frame: Orijinal görüntü (BGR)
+            buffers: Görünümlerin yazılacağı buffer havuzu. Verilirse görünümler bir
+                sonraki frame'de üzerine yazılır; frame dışında saklanmamalıdır.
+        """
+        self._frame = frame
+        self._buffers = buffers
+        self._scaled: Dict[int, np.ndarray] = {}
+        self._gray: Dict[int, np.ndarray] = {}
+        self._equalized: Dict[int, np.ndarray] = {}
+        self._rgb: Dict[int, np.ndarray] = {}
+
+    @classmethod
+    def wrap(cls, frame: Union[np.ndarray, "PreparedFrame"],
+             buffers: Optional[FrameBufferPool] = None) -> "PreparedFrame":
+        """Ham frame'i sarar; zaten hazırlanmışsa aynen döndürür."""
+        return frame if isinstance(frame, PreparedFrame) else cls(frame, buffers)
+
+    def _dst(self, name: str, key: int, shape: Tuple[int, ...]) -> Optional[np.ndarray]:
+        """Havuz varsa görünüm için hedef buffer döndürür."""
+        if self._buffers is None:
+            return None
+        return self._buffers.get(f"{name}_{key}", shape)
+
+    @property
+    def frame(self) -> np.ndarray:
+        """Orijinal BGR frame."""
+        return self._frame
+
+    @property
+    def width(self) -> int:
+        return self._frame.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self._frame.shape[0]
+
+    @property
+    def size(self) -> int:
+        return 0 if self._frame is None else self._frame.size
+
+    def _key(self, max_width: Optional[int]) -> int:
+        """Memo anahtarı: küçültme gerekmiyorsa 0 (orijinal boyut)."""
+        if max_width is None or self.width <= max_width:
+            return 0
+        return max_width
+
+    def scale(self, max_width: Optional[int] = None) -> float:
+        """Orijinalden küçültülmüş görünüme ölçek katsayısı."""
+        key = self._key(max_width)
+        return key / self.width if key else 1.0
+
+    def scaled(self, max_width: Optional[int] = None) -> np.ndarray:
+        """Genişliği max_width'i aşmayan BGR görünüm."""
+        key = self._key(max_width)
+        if key == 0:
+            return self._frame
+
+        view = self._scaled.get(key)
+        if view is None:
+            scale = key / self.width
+            new_width, new_height = int(self.width * scale), int(self.height * scale)
+            dst = self._dst("scaled", key, (new_height, new_width, 3))
+            view = cv2.resize(self._frame, (new_width, new_height), dst=dst)
+            self._scaled[key] = view
+        return view
+
+    def gray(self, max_width: Optional[int] = None) -> np.ndarray:
+        """Gri tonlamalı görünüm."""
+        key = self._key(max_width)
+        view = self._gray.get(key)
+        if view is None:
+            source = self.scaled(max_width)
+            dst = self._dst("gray", key, source.shape[:2])
+            view = cv2.cvtColor(source, cv2.COLOR_BGR2GRAY, dst=dst)
+            self._gray[key] = view
+        return view
+
+    def equalized(self, max_width: Optional[int] = None) -> np.ndarray:
+        """Histogram eşitlenmiş gri görünüm (Haar algılama için)."""
+        key = self._key(max_width)
+        view = self._equalized.get(key)
+        if view is None:
+            source = self.gray(max_width)
+            dst = self._dst("equalized", key, source.shape)
+            view = cv2.equalizeHist(source, dst=dst)
+            self._equalized[key] = view
+        return view
+
+    def rgb(self, max_width: Optional[int] = None) -> np.ndarray:
+        """RGB görünüm (face_recognition / dlib için)."""
+        key = self._key(max_width)
+        view = self._rgb.get(key)
+        if view is None:
+            source = self.scaled(max_width)
+            dst = self._dst("rgb", key, source.shape)
+            view = cv2.cvtColor(source, cv2.COLOR_BGR2RGB, dst=dst)
+            self._rgb[key] = view
+        return view
+
+    def rects_to_original(self, rects: List[Rect], max_width: Optional[int] = None) -> List[Rect]:
+        """Küçültülmüş görünümdeki (x, y, w, h) kutularını orijinal koordinatlara çevirir."""
+        scale = self.scale(max_width)
+        if scale == 1.0:
+            return [(int(x), int(y), int(w), int(h)) for x, y, w, h in rects]
+
+        factor = 1 / scale
+        return [(int(x * factor), int(y * factor), int(w * factor), int(h * factor))
+                for x, y, w, h in rects]
+
+    def locations_to_scaled(self, locations: List[FaceLocation], max_width: Optional[int] = None) -> List[FaceLocation]:
+        """Orijinal (top, right, bottom, left) konumlarını küçültülmüş görünüme çevirir."""
+        scale = self.scale(max_width)
+        if scale == 1.0:
+            return list(locations)
+
+        return [(int(top * scale), int(right * scale), int(bottom * scale), int(left * scale))
+                for top, right, bottom, left in locations]
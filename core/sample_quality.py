@@ -0,0 +1,190 @@
+"""
+Örnek kalite servisi - Kayıt örneklerini puanlama ve benzer örnekleri ayıklama
+"""
+
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, List, Tuple, Optional, Dict, Sequence
+
+
+# (top, right, bottom, left) - face_recognition konum formatı
+FaceLocation = Tuple[int, int, int, int]
+
+# Ret nedenleri (raporlarda gruplanır)
+REJECT_BLURRY = "bulanık"
+REJECT_SMALL = "yüz çok küçük"
+REJECT_POSE = "yüz düz bakmıyor"
+REJECT_DUPLICATE = "önceki örneğe çok benzer"
+REJECT_FULL = "örnek sınırı dolu"
+
+
+@dataclass
+class SampleQuality:
+    """Tek yüz örneğinin kalite ölçüleri."""
+    sharpness: float   # Yüz bölgesinde Laplacian varyansı (yüksek = net)
+    face_size: int     # Encoding çözünürlüğünde (≤ 640 px genişlik) kısa kenar (piksel)
+    yaw: float         # Burun ucunun göz ortasından yatay sapması / göz arası mesafe (0 = karşıdan)
+    roll: float        # Göz hattının yatayla açısı (derece)
+
+    @property
+    def score(self) -> float:
+        """Sıralama puanı: net, büyük ve karşıdan bakan yüzler önce gelir."""
+        return float(np.log1p(self.sharpness) * min(self.face_size / 160.0, 1.0) * max(0.0, 1.0 - self.yaw))
+
+
+def assess_face(gray_frame: np.ndarray, face_location: FaceLocation,
+                landmarks: Optional[np.ndarray] = None) -> SampleQuality:
+    """
+    Yüz örneğinin kalitesini ölçer.
+
+    Args:
+        gray_frame: Gri görüntü (konumlarla aynı ölçekte)
+        face_location: Yüz konumu (top, right, bottom, left)
+        landmarks: dlib 5 nokta landmark'ları (5, 2); [0-1] ve [2-3] göz köşeleri, [4] burun
+
+    Returns:
+        SampleQuality
+    """
+    top, right, bottom, left = face_location
+    height, width = gray_frame.shape[:2]
+    crop = gray_frame[max(0, top):min(height, bottom), max(0, left):min(width, right)]
+    sharpness = float(cv2.Laplacian(crop, cv2.CV_64F).var()) if crop.size else 0.0
+    face_size = int(min(right - left, bottom - top))
+
+    yaw = roll = 0.0
+    if landmarks is not None and len(landmarks) >= 5:
+        first_eye = landmarks[0:2].mean(axis=0)
+        second_eye = landmarks[2:4].mean(axis=0)
+        # Göz hattı soldan sağa yönlendirilir (landmark sırası modele göre değişebilir)
+        eye_vector = second_eye - first_eye
+        if eye_vector[0] < 0:
+            eye_vector = -eye_vector
+        eye_distance = float(np.hypot(*eye_vector))
+        if eye_distance > 0:
+            eye_center = (first_eye + second_eye) / 2
+            # Burun ucunun göz hattına dik olmayan bileşeni yan dönüşü gösterir
+            yaw = abs(float(np.dot(landmarks[4] - eye_center, eye_vector))) / eye_distance ** 2
+            roll = float(np.degrees(np.arctan2(eye_vector[1], eye_vector[0])))
+
+    return SampleQuality(sharpness, face_size, yaw, roll)
+
+
+class SampleSelector:
+    """
+    Kullanıcı başına sınırlı sayıda, kaliteli ve birbirinden farklı encoding seçer.
+    Performance: Galeri boyutu eşleştirme maliyetini doğrudan belirler; bulanık ve
+    ardışık neredeyse aynı kareler galeriye girmez.
+    """
+
+    def __init__(self, max_samples: int = 5, min_sharpness: float = 30.0, min_face_size: int = 60,
+                 max_yaw: float = 0.35, max_roll: float = 25.0, duplicate_distance: float = 0.15) -> None:
+        """
+        SampleSelector sınıfını başlatır.
+
+        Args:
+            max_samples: Tutulacak maksimum encoding sayısı
+            min_sharpness: Minimum Laplacian varyansı
+            min_face_size: Minimum yüz boyutu (piksel)
+            max_yaw: Maksimum yan dönüş oranı
+            max_roll: Maksimum baş eğimi (derece)
+            duplicate_distance: Bu mesafenin altındaki örnekler tekrar sayılır
+        """
+        if max_samples <= 0:
+            raise ValueError("Örnek sayısı pozitif olmalıdır")
+
+        self._max_samples = max_samples
+        self._min_sharpness = min_sharpness
+        self._min_face_size = min_face_size
+        self._max_yaw = max_yaw
+        self._max_roll = max_roll
+        self._duplicate_distance = duplicate_distance
+        self._kept: List[np.ndarray] = []
+
+    @property
+    def encodings(self) -> List[np.ndarray]:
+        """Kabul edilen encoding'ler."""
+        return list(self._kept)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self._kept) >= self._max_samples
+
+    def check_quality(self, quality: SampleQuality) -> Optional[str]:
+        """Kalite eşiklerini kontrol eder; geçemezse ret nedenini döndürür."""
+        if quality.face_size < self._min_face_size:
+            return REJECT_SMALL
+        if quality.sharpness < self._min_sharpness:
+            return REJECT_BLURRY
+        if quality.yaw > self._max_yaw or abs(quality.roll) > self._max_roll:
+            return REJECT_POSE
+        return None
+
+    def offer(self, encoding: np.ndarray, quality: SampleQuality) -> Optional[str]:
+        """
+        Örneği değerlendirir ve uygunsa kabul eder.
+
+        Args:
+            encoding: Yüz encoding'i
+            quality: Örneğin kalite ölçüleri
+
+        Returns:
+            Kabul edildiyse None, aksi halde ret nedeni
+        """
+        reason = self.check_quality(quality)
+        if reason:
+            return reason
+
+        if self._kept:
+            distances = np.linalg.norm(np.asarray(self._kept) - encoding, axis=1)
+            if float(distances.min()) < self._duplicate_distance:
+                return REJECT_DUPLICATE
+
+        if self.is_full:
+            return REJECT_FULL
+
+        self._kept.append(np.asarray(encoding, dtype=np.float32))
+        return None
+
+    def select(self, samples: Sequence[Tuple[np.ndarray, SampleQuality]]) -> Tuple[List[int], Dict[int, str]]:
+        """
+        Örnekleri kalite puanına göre sırayla değerlendirir.
+
+        Args:
+            samples: (encoding, kalite) çiftleri
+
+        Returns:
+            (kabul edilen örnek indeksleri, indeks -> ret nedeni)
+        """
+        accepted: List[int] = []
+        rejected: Dict[int, str] = {}
+        order = sorted(range(len(samples)), key=lambda i: samples[i][1].score, reverse=True)
+        for index in order:
+            encoding, quality = samples[index]
+            reason = self.offer(encoding, quality)
+            if reason:
+                rejected[index] = reason
+            else:
+                accepted.append(index)
+        return sorted(accepted), rejected
+
+
+def create_sample_selector(detection: Any, max_samples: Optional[int] = None) -> SampleSelector:
+    """
+    Kayıt eşiklerini taşıyan konfigürasyondan (DetectionConfig) örnek seçici oluşturur.
+
+    Args:
+        detection: enrolment_max_samples ve sample_* eşiklerini sunan nesne
+        max_samples: Örnek sınırı; None ise konfigürasyondaki değer kullanılır
+
+    Returns:
+        Yeni SampleSelector
+    """
+    return SampleSelector(
+        max_samples=max_samples or detection.enrolment_max_samples,
+        min_sharpness=detection.sample_min_sharpness,
+        min_face_size=detection.sample_min_face_size,
+        max_yaw=detection.sample_max_yaw,
+        max_roll=detection.sample_max_roll,
+        duplicate_distance=detection.sample_duplicate_distance
+    )
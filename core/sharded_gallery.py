@@ -0,0 +1,518 @@
+"""
+Parçalı galeri servisi - Galeriyi yerel worker süreçlerine bölerek eşleştirme
+"""
+
+import itertools
+import multiprocessing as mp
+import threading
+from concurrent.futures import Future
+import numpy as np
+from typing import List, Tuple, Optional, Dict, Sequence, Iterable, Mapping, Any
+
+from .face_recognizer import FaceRecognizer, RecognitionResult, RecognitionMatch, TopKResult
+
+
+_STOP = None
+
+
+def _run_shard_op(recognizer: FaceRecognizer, op: str, args: Tuple) -> Any:
+    """Shard üzerinde tek bir galeri işlemini çalıştırır."""
+    if op == "load":
+        entries, user_ids = args
+        return recognizer.load_known_faces(entries, user_ids)
+    if op == "add":
+        face_encodings, name, user_id = args
+        return recognizer.add_known_faces(face_encodings, name, user_id)
+    if op == "remove":
+        return recognizer.remove_user(args[0])
+    if op == "topk":
+        # Yalnızca (ID, mesafe) döner; isimler koordinatörün kullanıcı tablosundan gelir
+        probes, k = args
+        return [[(match.user_id, match.distance) for match in result.matches]
+                for result in recognizer.recognize_topk(probes, k)]
+    if op == "stats":
+        return recognizer.get_gallery_stats()
+    raise ValueError(f"Bilinmeyen shard işlemi: {op}")
+
+
+def _shard_worker_main(conn, options: Dict[str, Any]) -> None:
+    """
+    Shard worker süreci giriş noktası.
+    Galerinin kendi parçasını tutar ve pipe üzerinden gelen istekleri sırayla işler;
+    yanıtlar istek ID'si ile etiketlenir.
+    """
+    recognizer = FaceRecognizer(**options)
+    try:
+        while True:
+            message = conn.recv()
+            if message is _STOP:
+                break
+
+            request_id, op, args = message
+            try:
+                conn.send((request_id, _run_shard_op(recognizer, op, args), None))
+            except Exception as e:
+                conn.send((request_id, None, str(e)))
+    except EOFError:
+        pass
+    finally:
+        conn.close()
+
+
+class LocalGalleryShard:
+    """
+    Süreç içi shard (testler ve tek makine kurulumları için).
+    ProcessGalleryShard ile aynı send arayüzünü sunar.
+    """
+
+    def __init__(self, options: Dict[str, Any]) -> None:
+        """
+        LocalGalleryShard sınıfını başlatır.
+
+        Args:
+            options: FaceRecognizer parametreleri
+        """
+        self._recognizer = FaceRecognizer(**options)
+
+    def send(self, op: str, *args) -> Future:
+        """İsteği hemen çalıştırır ve tamamlanmış Future döndürür."""
+        future: Future = Future()
+        try:
+            future.set_result(_run_shard_op(self._recognizer, op, args))
+        except Exception as e:
+            future.set_exception(RuntimeError(f"Shard hatası: {e}"))
+        return future
+
+    def close(self) -> None:
+        """Süreç içi shard için yapılacak iş yoktur."""
+        pass
+
+
+class ProcessGalleryShard:
+    """
+    Ayrı bir yerel süreçte çalışan shard.
+    İstekler pipe (yerel soket) üzerinden gönderilir; sorgular yalnızca (p, 128) float32
+    olduğundan mesaj boyutu galeri boyutundan bağımsızdır. Yanıtlar istek ID'si ile
+    eşleştirildiğinden birden fazla thread aynı anda istek gönderebilir.
+    """
+
+    def __init__(self, options: Dict[str, Any]) -> None:
+        """
+        ProcessGalleryShard sınıfını başlatır.
+
+        Args:
+            options: Worker'daki FaceRecognizer parametreleri
+        """
+        # fork + thread karışımından kaçınmak için spawn
+        ctx = mp.get_context("spawn")
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(target=_shard_worker_main, args=(child_conn, options), daemon=True)
+        self._process.start()
+        child_conn.close()
+
+        # Pipe'a yazma tek kilit altında; yanıtlar ayrı thread'de ID ile Future'lara dağıtılır
+        self._send_lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._pending: Dict[int, Future] = {}
+        self._reader = threading.Thread(target=self._read_replies, name="gallery-shard-reader", daemon=True)
+        self._reader.start()
+
+    def send(self, op: str, *args) -> Future:
+        """
+        İsteği worker'a gönderir (yanıt beklemez).
+
+        Returns:
+            Yanıt geldiğinde sonuçlanan Future
+        """
+        future: Future = Future()
+        with self._send_lock:
+            request_id = next(self._request_ids)
+            self._pending[request_id] = future
+            try:
+                self._conn.send((request_id, op, args))
+            except (BrokenPipeError, OSError) as e:
+                self._pending.pop(request_id, None)
+                future.set_exception(RuntimeError(f"Shard worker'a ulaşılamadı: {e}"))
+        return future
+
+    def _read_replies(self) -> None:
+        """Worker yanıtlarını okuyup bekleyen Future'ları sonuçlandırır."""
+        while True:
+            try:
+                request_id, result, error = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(f"Shard worker hatası: {error}"))
+            else:
+                future.set_result(result)
+
+        # Worker kapandı: yanıtı gelmeyecek istekleri başarısız say
+        with self._send_lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError("Shard worker bağlantısı kapandı"))
+
+    def close(self) -> None:
+        """Worker sürecini durdurur."""
+        with self._send_lock:
+            try:
+                self._conn.send(_STOP)
+            except (BrokenPipeError, OSError):
+                pass
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=5)
+        self._reader.join(timeout=5)
+        self._conn.close()
+
+
+class ShardedFaceRecognizer:
+    """
+    Galeriyi kullanıcı ID'sine göre shard'lara bölen tanıyıcı.
+    Performance: Sorgu batch'i tüm shard'lara aynı anda gönderilir, shard'lar paralel
+    eşleştirir ve shard başına top-k sonuçları birleştirilir. Kullanıcılar shard'lar
+    arasında ayrık olduğundan birleştirme sonucu farklı kullanıcılar içerir. Okuyucular
+    kilit almaz; yalnızca yazarlar (yükleme, ekleme, silme) birbirine karşı kilitlenir.
+    """
+
+    def __init__(self, num_shards: int = 2, tolerance: float = 0.6, use_processes: bool = True,
+                 **recognizer_options) -> None:
+        """
+        ShardedFaceRecognizer sınıfını başlatır.
+
+        Args:
+            num_shards: Shard sayısı
+            tolerance: Yüz eşleştirme toleransı
+            use_processes: True ise her shard ayrı süreçte, False ise süreç içinde çalışır
+            recognizer_options: Shard'lardaki FaceRecognizer için ek parametreler
+        """
+        if num_shards <= 0:
+            raise ValueError("Shard sayısı pozitif olmalıdır")
+
+        self._tolerance = tolerance
+        options = dict(recognizer_options, tolerance=tolerance)
+        shard_class = ProcessGalleryShard if use_processes else LocalGalleryShard
+        self._shards = [shard_class(options) for _ in range(num_shards)]
+
+        # Yalnızca yazarlar kilitlenir; yanıtlar istek ID'si ile eşleştiğinden okuyucular paralel çalışır
+        self._lock = threading.Lock()
+        self._users: Dict[int, str] = {}
+        self._user_index: Dict[str, int] = {}
+        self._active_count = 0
+        # Galeri baştan yüklendikçe artar; eski ve yeni galeriye karışan okumalar tekrarlanır
+        self._generation = 0
+        self._closed = False
+
+    def _shard_index(self, user_id: int) -> int:
+        """Kullanıcının shard'ını döndürür."""
+        return user_id % len(self._shards)
+
+    def _fan_out(self, requests: Mapping[int, Tuple]) -> Dict[int, Any]:
+        """
+        İstekleri önce tüm shard'lara gönderir, sonra yanıtları toplar.
+        Bir shard hata verse de tüm yanıtlar beklenir; ilk hata en sonda yükseltilir.
+
+        Args:
+            requests: Shard indeksi -> (işlem, argümanlar...)
+
+        Returns:
+            Shard indeksi -> sonuç
+        """
+        if self._closed:
+            raise RuntimeError("Parçalı galeri kapatılmış")
+
+        futures = {index: self._shards[index].send(op, *args) for index, (op, *args) in requests.items()}
+        results: Dict[int, Any] = {}
+        errors: List[BaseException] = []
+        for index, future in futures.items():
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+        return results
+
+    def _next_user_id(self, reserved: Iterable[int] = ()) -> int:
+        """Kullanılmayan bir sonraki kullanıcı ID'sini döndürür."""
+        return max(list(self._users) + list(reserved), default=0) + 1
+
+    def load_known_faces(self, entries: Iterable[Tuple[str, Sequence[np.ndarray]]],
+                         user_ids: Optional[Mapping[str, int]] = None) -> int:
+        """
+        Galeriyi shard'lara bölerek baştan kurar.
+
+        Args:
+            entries: (isim, encoding listesi) çiftleri
+            user_ids: İsim -> kullanıcı ID eşlemesi; yoksa sıralı atanır
+
+        Returns:
+            Yüklenen encoding sayısı
+        """
+        users: Dict[int, str] = {}
+        user_index: Dict[str, int] = {}
+        reserved = set(user_ids.values()) if user_ids else set()
+        next_id = 1
+        partitions: List[List[Tuple[str, Sequence[np.ndarray]]]] = [[] for _ in self._shards]
+        partition_ids: List[Dict[str, int]] = [{} for _ in self._shards]
+
+        for name, face_encodings in entries:
+            if not name or not name.strip():
+                raise ValueError("Geçersiz isim")
+            name = name.strip()
+            if len(face_encodings) == 0:
+                continue
+
+            user_id = user_index.get(name)
+            if user_id is None:
+                if user_ids and name in user_ids:
+                    user_id = int(user_ids[name])
+                else:
+                    while next_id in reserved or next_id in users:
+                        next_id += 1
+                    user_id = next_id
+                users[user_id] = name
+                user_index[name] = user_id
+
+            shard = self._shard_index(user_id)
+            partitions[shard].append((name, face_encodings))
+            partition_ids[shard][name] = user_id
+
+        with self._lock:
+            counts = self._fan_out({
+                index: ("load", partitions[index], partition_ids[index])
+                for index in range(len(self._shards))
+            })
+            self._users = users
+            self._user_index = user_index
+            self._active_count = sum(counts.values())
+            self._generation += 1
+            return self._active_count
+
+    def add_known_face(self, face_encoding: np.ndarray, name: str, user_id: Optional[int] = None) -> None:
+        """Bilinen yüzlere tek bir yüz ekler."""
+        self.add_known_faces([face_encoding], name, user_id)
+
+    def add_known_faces(self, face_encodings: Sequence[np.ndarray], name: str,
+                        user_id: Optional[int] = None) -> int:
+        """
+        Kullanıcının encoding'lerini sahibi olan shard'a ekler.
+
+        Args:
+            face_encodings: Yüz encoding'leri
+            name: Yüzlerin sahibinin adı
+            user_id: Kullanıcı ID'si; yoksa otomatik atanır
+
+        Returns:
+            Eklenen encoding sayısı
+        """
+        if not name or not name.strip():
+            raise ValueError("Geçersiz isim")
+        if len(face_encodings) == 0:
+            return 0
+        name = name.strip()
+
+        with self._lock:
+            existing = self._user_index.get(name)
+            if existing is not None:
+                if user_id is not None and user_id != existing:
+                    raise ValueError(f"'{name}' zaten {existing} ID'si ile kayıtlı")
+                user_id = existing
+            elif user_id is None:
+                user_id = self._next_user_id()
+            elif user_id in self._users:
+                raise ValueError(f"Kullanıcı ID'si zaten kullanımda: {user_id}")
+
+            shard = self._shard_index(user_id)
+            encodings = np.asarray(face_encodings, dtype=np.float32)
+            added = self._fan_out({shard: ("add", encodings, name, user_id)})[shard]
+
+            self._users[user_id] = name
+            self._user_index[name] = user_id
+            self._active_count += added
+            return added
+
+    def remove_user(self, name: str) -> int:
+        """
+        Kullanıcının tüm encoding'lerini sahibi olan shard'dan kaldırır.
+
+        Args:
+            name: Kaldırılacak kullanıcının adı
+
+        Returns:
+            Kaldırılan encoding sayısı
+        """
+        if not name:
+            return 0
+
+        with self._lock:
+            user_id = self._user_index.get(name.strip())
+            if user_id is None:
+                return 0
+
+            shard = self._shard_index(user_id)
+            removed = self._fan_out({shard: ("remove", name.strip())})[shard]
+            del self._user_index[name.strip()]
+            del self._users[user_id]
+            self._active_count -= removed
+            return removed
+
+    def remove_known_face(self, name: str) -> bool:
+        """Kullanıcının tüm yüzlerini kaldırır."""
+        return self.remove_user(name) > 0
+
+    def clear_known_faces(self) -> None:
+        """Tüm shard'ları temizler."""
+        self.load_known_faces([])
+
+    def recognize_topk(self, face_encodings: Sequence[np.ndarray], k: int = 3) -> List[TopKResult]:
+        """
+        Sorguları tüm shard'lara dağıtır ve shard başına top-k sonuçlarını birleştirir.
+
+        Args:
+            face_encodings: Tanınacak yüzlerin encoding'leri
+            k: Yüz başına döndürülecek farklı kullanıcı sayısı
+
+        Returns:
+            Yüz sırasıyla TopKResult listesi
+        """
+        if k <= 0:
+            raise ValueError("k pozitif olmalıdır")
+        if len(face_encodings) == 0:
+            return []
+
+        probes = np.asarray(face_encodings, dtype=np.float32).reshape(len(face_encodings), FaceRecognizer.ENCODING_SIZE)
+        while True:
+            generation = self._generation
+            if self._active_count == 0:
+                return [TopKResult([], None, False) for _ in face_encodings]
+            shard_results = self._fan_out({
+                index: ("topk", probes, k) for index in range(len(self._shards))
+            })
+            users = self._users
+            if generation == self._generation:
+                break
+
+        results = []
+        for probe_index in range(len(probes)):
+            candidates = [candidate for shard_result in shard_results.values()
+                          for candidate in shard_result[probe_index]]
+            candidates.sort(key=lambda candidate: candidate[1])
+
+            # Eşzamanlı ekleme/silmede tabloya henüz girmemiş veya çıkmış ID'ler atlanır
+            matches = []
+            for user_id, distance in candidates:
+                name = users.get(user_id)
+                if name is not None:
+                    matches.append(RecognitionMatch(user_id, name, distance))
+                    if len(matches) == k:
+                        break
+            margin = matches[1].distance - matches[0].distance if len(matches) > 1 else None
+            is_match = bool(matches) and matches[0].distance <= self._tolerance
+            results.append(TopKResult(matches, margin, is_match))
+        return results
+
+    def recognize_faces(self, face_encodings: List[np.ndarray]) -> List[RecognitionResult]:
+        """
+        FaceRecognizer.recognize_faces ile aynı sonuçları parçalı galeri üzerinden döndürür.
+
+        Args:
+            face_encodings: Tanınacak yüzlerin encoding'leri
+
+        Returns:
+            Tanıma sonuçlarının listesi
+        """
+        if not face_encodings:
+            return []
+
+        results: List[Optional[RecognitionResult]] = [None] * len(face_encodings)
+        valid = []
+        for index, face_encoding in enumerate(face_encodings):
+            if face_encoding is None or len(face_encoding) == 0:
+                results[index] = RecognitionResult("Geçersiz", 0.0, False)
+            else:
+                valid.append(index)
+
+        topk_results = self.recognize_topk([face_encodings[i] for i in valid], k=1) if valid else []
+        for index, topk in zip(valid, topk_results):
+            best = topk.best
+            if best is None:
+                results[index] = RecognitionResult("Bilinmeyen", 0.0, False)
+                continue
+
+            confidence = max(0.0, 1.0 - best.distance)
+            if topk.is_match:
+                results[index] = RecognitionResult(best.user_name, confidence, True, best.user_id)
+            else:
+                results[index] = RecognitionResult("Bilinmeyen", confidence, False)
+        return results
+
+    def get_known_faces_count(self) -> int:
+        """Kayıtlı yüz sayısını döndürür."""
+        return self._active_count
+
+    def get_user_id(self, name: str) -> Optional[int]:
+        """Kullanıcının galeri ID'sini döndürür, yoksa None."""
+        return self._user_index.get(name.strip()) if name else None
+
+    def get_user_table(self) -> Dict[int, str]:
+        """Kullanıcı tablosunun (ID -> isim) kopyasını döndürür."""
+        return dict(self._users)
+
+    def get_gallery_stats(self) -> Dict[str, Any]:
+        """Shard başına galeri istatistiklerini döndürür."""
+        shard_stats = self._fan_out({index: ("stats",) for index in range(len(self._shards))})
+        return {
+            'shards': len(self._shards),
+            'active': self._active_count,
+            'users': len(self._users),
+            'per_shard': [shard_stats[index] for index in range(len(self._shards))]
+        }
+
+    def get_tolerance(self) -> float:
+        """Mevcut tolerans değerini döndürür."""
+        return self._tolerance
+
+    def close(self) -> None:
+        """Shard'ları kapatır."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for shard in self._shards:
+                shard.close()
+
+    def __enter__(self):
+        """Context manager desteği."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager desteği."""
+        self.close()
+
+
+def create_face_recognizer(detection: Any, num_shards: int = 0):
+    """
+    Eşleştirme ayarlarını taşıyan konfigürasyondan (DetectionConfig) tanıyıcı oluşturur.
+
+    Args:
+        detection: recognition_tolerance, gallery_quantization, rerank_candidates ve gallery_rerank_dir sunan nesne
+        num_shards: 2 ve üzeri ise galeri bu sayıda worker sürecine bölünür
+
+    Returns:
+        FaceRecognizer veya ShardedFaceRecognizer
+    """
+    options = dict(
+        tolerance=detection.recognition_tolerance,
+        quantization=detection.gallery_quantization,
+        rerank_candidates=detection.rerank_candidates,
+        rerank_dir=detection.gallery_rerank_dir or None
+    )
+    if num_shards > 1:
+        return ShardedFaceRecognizer(num_shards=num_shards, **options)
+    return FaceRecognizer(**options)
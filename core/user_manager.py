@@ -73,6 +73,18 @@ class UserManager:
             print(f"Kullanıcı kaydedilemedi: {e}")
             return False
     
+    def save_users(self, users: List[UserData]) -> List[str]:
+        """
+        Birden fazla kullanıcıyı kaydeder (dosya başına bir kullanıcı).
+        
+        Args:
+            users: Kaydedilecek kullanıcı verileri
+            
+        Returns:
+            Başarıyla kaydedilen kullanıcı adları
+        """
+        return [user_data.name for user_data in users if self.save_user(user_data)]
+    
     def load_user(self, name: str) -> Optional[UserData]:
         """
         Kullanıcı verilerini dosyadan yükler.
@@ -95,8 +107,8 @@ class UserManager:
             with open(file_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             
-            # Face encodings'leri numpy array'e çevir
-            face_encodings = [np.array(encoding) for encoding in data['face_encodings']]
+            # Face encodings'leri numpy array'e çevir (galeri float32 tutar; float64 iki kat bellek)
+            face_encodings = [np.array(encoding, dtype=np.float32) for encoding in data['face_encodings']]
             
             return UserData(
                 name=data['name'],
@@ -13,10 +13,15 @@ import os
 from pathlib import Path
 import time
 from tqdm import tqdm
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import threading
+from collections import deque
+from contextlib import contextmanager
+from itertools import islice
+import atexit
 import termios
 import tty
+import psutil
 
 # Proje root dizinini Python path'ine ekle (scripts dışından çalıştırılırsa)
 PROJECT_ROOT = Path(__file__).parent
@@ -24,10 +29,19 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 # Core modüllerini import et
-from core import FaceDetector, FaceRecognizer, UserManager
+from core import FaceDetector, UserManager, FrameBufferPool
 from core.user_manager import UserData
 from core.face_recognizer import RecognitionResult
+from core.sharded_gallery import create_face_recognizer
+from core.bulk_pipeline import ImagePipeline, BulkEnroller, BulkRecognizer
+from core.sample_quality import create_sample_selector
 from utils import CameraManager, FileManager
+from utils.database import DatabaseManager, get_database_manager
+from utils.metrics import StageMetrics, RECOGNITION_STAGES
+from utils.tracing import get_tracer
+from utils.profiler import get_profiler
+from utils.memory import (get_memory_accountant, get_leak_tracker, register_pipeline_components,
+                          format_memory_report)
 
 # Yeni optimize bileşenler
 from config.app_config import get_config, get_config_manager
@@ -185,9 +199,10 @@ class OptimizedFaceRecognitionApp:
         self.logger.info("🚀 Ultra-optimize edilmiş yüz tanıma sistemi başlatılıyor...")
         
         # Bileşenleri başlat
-        self.face_detector = FaceDetector(max_workers=self.config.system.max_workers)
-        self.face_recognizer = FaceRecognizer(tolerance=self.config.detection.recognition_tolerance)
-        self.user_manager = UserManager(data_dir=self.config.system.data_dir)
+        self.face_detector = FaceDetector(max_workers=self.config.system.max_workers,
+                                          encoding_timeout=self.config.system.encoding_timeout)
+        self.face_recognizer = create_face_recognizer(self.config.detection, self.config.system.gallery_shards)
+        self.user_manager = self._get_storage(self.config.system.user_backend)
         self.camera_manager = CameraManager(camera_index=self.config.camera.index)
         
         # Enhanced Performance tracking
@@ -204,9 +219,9 @@ class OptimizedFaceRecognitionApp:
         
         # Adaptive Performance Management
         self.performance_monitor = {
-            'fps_history': [],
-            'processing_times': [],
-            'memory_usage': [],
+            'fps_history': deque(maxlen=100),
+            'processing_times': deque(maxlen=100),
+            'memory_usage': deque(maxlen=100),
             'target_fps': 25,
             'min_fps': 10,
             'adaptive_quality': True,
@@ -214,15 +229,40 @@ class OptimizedFaceRecognitionApp:
             'error_recovery_mode': False
         }
         
+        # Aşama bazlı gecikme histogramları (capture/detect/encode/match/draw/display)
+        self.stage_metrics = StageMetrics(RECOGNITION_STAGES)
+        
+        # Örneklenen ve yavaş frame'lerin span'leri (Chrome trace-event JSON)
+        self.tracer = get_tracer()
+        self.tracer.configure(
+            self.config.system.tracing_enabled,
+            self.config.system.trace_sample_rate,
+            self.config.system.trace_slow_ms,
+            output_dir=self.config.system.logs_dir
+        )
+        
+        # Örneklemeli profiler ('p' tuşuyla açılıp kapanır; kapalıyken thread çalışmaz)
+        self.profiler = get_profiler(self.config.system.profiler_interval_ms, self.config.system.logs_dir)
+        
         # Frame Buffer Management
         self.frame_buffer = {
             'enabled': True,
             'max_size': 3,
-            'current_frames': [],
+            'write_index': 0,
             'processing_frame': None,
             'last_stable_frame': None
         }
         
+        # Hot loop buffer'ları (kamera çözünürlüğüne göre bir kez ayrılır)
+        self._frame_buffers = FrameBufferPool()
+        
+        # Bileşen bazlı bellek raporu ('m' tuşu, 'memory' komutu) ve tracemalloc sızıntı takibi
+        self._process = psutil.Process()
+        self.memory_accountant = get_memory_accountant()
+        register_pipeline_components(self.memory_accountant, self.face_detector, self.face_recognizer,
+                                     self._frame_buffers, self.tracer)
+        self.leak_tracker = get_leak_tracker()
+        
         # Stability & Error Recovery
         self.stability_monitor = {
             'consecutive_errors': 0,
@@ -232,6 +272,14 @@ class OptimizedFaceRecognitionApp:
             'auto_recovery_enabled': True
         }
         
+        # Dakikalık performans rollup'ları veritabanına periyodik ve toplu yazılır
+        if self.config.system.performance_rollups_enabled:
+            self.logger_manager.performance.start_rollup_flush(
+                get_database_manager().save_performance_rollups,
+                interval=self.config.system.rollup_flush_interval
+            )
+            atexit.register(self._stop_performance_rollups)
+        
         # Kayıtlı kullanıcıları yükle
         self._load_known_users()
     
@@ -240,16 +288,15 @@ class OptimizedFaceRecognitionApp:
         """Kayıtlı kullanıcıları sisteme yükler."""
         try:
             users = self.user_manager.load_all_users()
-            self.face_recognizer.clear_known_faces()
+            
+            # Galeri tek versiyon olarak kurulur (ara durumda boş galeri görünmez)
+            self.face_recognizer.load_known_faces(
+                ((user.name, user.face_encodings)
+                 for user in tqdm(users, desc="Kullanıcılar yükleniyor", disable=len(users) < 5)),
+                user_ids=self._gallery_user_ids()
+            )
             
             if users:
-                self.logger.info(f"📚 {len(users)} kullanıcı yükleniyor...")
-                
-                # Progress bar ile yükleme
-                for user in tqdm(users, desc="Kullanıcılar yükleniyor", disable=len(users) < 5):
-                    for encoding in user.face_encodings:
-                        self.face_recognizer.add_known_face(encoding, user.name)
-                
                 self.logger.info(f"✅ {len(users)} kullanıcı sisteme yüklendi.")
             else:
                 self.logger.info("ℹ️  Henüz kayıtlı kullanıcı yok.")
@@ -261,20 +308,14 @@ class OptimizedFaceRecognitionApp:
         """Performance metriklerini günceller ve adaptive ayarları yapar."""
         monitor = self.performance_monitor
         
-        # Metric geçmişini güncelle
+        # Metric geçmişini güncelle (deque'ler son 100 frame'i tutar)
         monitor['fps_history'].append(fps)
         monitor['processing_times'].append(frame_time)
         monitor['memory_usage'].append(memory_mb)
         
-        # Geçmiş boyutunu sınırla (son 100 frame)
-        max_history = 100
-        for key in ['fps_history', 'processing_times', 'memory_usage']:
-            if len(monitor[key]) > max_history:
-                monitor[key] = monitor[key][-max_history:]
-        
         # Adaptive quality kontrolü
         if monitor['adaptive_quality'] and len(monitor['fps_history']) > 10:
-            avg_fps = sum(monitor['fps_history'][-10:]) / 10
+            avg_fps = sum(islice(reversed(monitor['fps_history']), 10)) / 10
             
             # FPS çok düşükse, quality düşür
             if avg_fps < monitor['min_fps']:
@@ -290,20 +331,25 @@ class OptimizedFaceRecognitionApp:
         if not buffer['enabled']:
             return new_frame
         
-        # Frame'i buffer'a ekle
         if new_frame is not None and new_frame.shape[0] > 0 and new_frame.shape[1] > 0:
-            buffer['current_frames'].append(new_frame.copy())
-            buffer['last_stable_frame'] = new_frame.copy()
-            
-            # Buffer boyutunu sınırla
-            if len(buffer['current_frames']) > buffer['max_size']:
-                buffer['current_frames'].pop(0)
+            # Son stabil frame'in kendi buffer'ı var; capture buffer'ı bir sonraki okumada ezilir
+            stable = self._frame_buffers.get('last_stable', new_frame.shape, new_frame.dtype)
+            np.copyto(stable, new_frame)
+            buffer['last_stable_frame'] = stable
             
             return new_frame
         else:
             # Geçersiz frame - son stabil frame'i kullan
             self.session_stats['dropped_frames'] += 1
-            return buffer['last_stable_frame']
+            stable = buffer['last_stable_frame']
+            if stable is None:
+                return None
+            
+            # Üzerine çizim yapılacağı için stabil kopya değil, ring slot'una alınmış kopyası döner
+            slot = self._frame_buffers.get(f"ring_{buffer['write_index']}", stable.shape, stable.dtype)
+            np.copyto(slot, stable)
+            buffer['write_index'] = (buffer['write_index'] + 1) % buffer['max_size']
+            return slot
     
     def _check_system_stability(self) -> bool:
         """Sistem stabilite kontrolü yapar."""
@@ -351,6 +397,34 @@ class OptimizedFaceRecognitionApp:
         stability['consecutive_errors'] = 0
         stability['last_successful_processing'] = time.time()
     
+    @contextmanager
+    def _stage(self, stage: str):
+        """Aşama süresini histograma, performans rollup'larına ve aktif frame izine kaydeder."""
+        start = time.perf_counter()
+        try:
+            with self.tracer.span(stage):
+                yield
+        finally:
+            self._record_stage(stage, start)
+    
+    def _record_stage(self, stage: str, start: float) -> None:
+        """time.perf_counter() ile başlatılmış aşama süresini kaydeder."""
+        elapsed = time.perf_counter() - start
+        self.stage_metrics.record(stage, elapsed * 1000)
+        # Kare başına log satırı yazılmaz; süre yalnızca rollup penceresine eklenir
+        self.logger_manager.performance.record_rollup(f"stage_{stage}", elapsed)
+    
+    def _stop_performance_rollups(self) -> None:
+        """Kalan rollup'ları yazar; auto_cleanup açıksa eskiyen rollup'ları indirger."""
+        system = self.config.system
+        self.logger_manager.performance.stop_rollup_flush()
+        if system.auto_cleanup:
+            get_database_manager().downsample_performance_rollups(
+                system.rollup_minute_retention_days,
+                system.rollup_hour_retention_days,
+                system.rollup_day_retention_days
+            )
+    
     def _adaptive_frame_processing(self, frame: np.ndarray, current_fps: float) -> Tuple[List, List]:
         """Adaptive frame processing - FPS'e göre işlem yoğunluğunu ayarlar."""
         faces = []
@@ -365,8 +439,12 @@ class OptimizedFaceRecognitionApp:
                 if monitor['frame_skip_counter'] % 2 != 0:  # Her ikinci frame'i atla
                     return faces, results
             
-            # Normal işleme
-            faces = self.face_detector.detect_faces_opencv_optimized(frame, use_cache=True)
+            with self._stage('detect'):
+                # Frame başına tek hazırlık (küçültme/gri/RGB önceden ayrılmış buffer'lara yazılır)
+                prepared = self.face_detector.prepare_frame(frame, self._frame_buffers)
+                
+                # Normal işleme
+                faces = self.face_detector.detect_faces_opencv_optimized(prepared, use_cache=True)
             
             if faces:
                 # Sadece algılanan yüzlerin encoding'lerini al
@@ -375,11 +453,13 @@ class OptimizedFaceRecognitionApp:
                 # Recovery mode'da daha az jitter kullan
                 jitters = 0 if monitor['error_recovery_mode'] else 1
                 
-                face_encodings = self.face_detector.get_face_encodings_optimized(frame, face_locations)
+                with self._stage('encode'):
+                    face_encodings = self.face_detector.get_face_encodings_optimized(prepared, face_locations)
                 
                 # Tanıma yap
                 if face_encodings:
-                    results = self.face_recognizer.recognize_faces(face_encodings)
+                    with self._stage('match'):
+                        results = self.face_recognizer.recognize_faces(face_encodings)
                     self.session_stats['recognition_attempts'] += len(results)
             
             self._mark_successful_processing()
@@ -402,7 +482,7 @@ class OptimizedFaceRecognitionApp:
             Başarılı ise True, hata varsa False
         """
         if sample_count is None:
-            sample_count = 5  # Default
+            sample_count = self.config.detection.enrolment_max_samples
             
         if not name or not name.strip():
             self.logger.error("❌ Geçerli bir isim girmelisiniz!")
@@ -429,7 +509,8 @@ class OptimizedFaceRecognitionApp:
         )
         
         try:
-            face_encodings = []
+            # Bulanık, küçük, yan dönük ve öncekine çok benzeyen kareler sayılmaz
+            selector = create_sample_selector(self.config.detection, sample_count)
             sample_taken = 0
             
             self.logger.info(f"📸 {sample_count} adet fotoğraf çekilecek...")
@@ -447,15 +528,15 @@ class OptimizedFaceRecognitionApp:
                 if frame.shape[0] <= 0 or frame.shape[1] <= 0:
                     continue
                 
-                # Frame kopyalama ve boyut kontrolü
-                frame_copy = frame.copy()
-                if frame_copy.shape[0] <= 0 or frame_copy.shape[1] <= 0:
-                    continue
+                # Çizim için temiz frame'in önceden ayrılmış buffer'a kopyası
+                frame_copy = self._frame_buffers.get('display', frame.shape, frame.dtype)
+                np.copyto(frame_copy, frame)
                 
                 self.logger.debug(f"✅ Frame boyutu OK: {frame.shape}")
                 
-                # Optimize yüz algılama
-                faces = self.face_detector.detect_faces_opencv_optimized(frame, use_cache=True)
+                # Optimize yüz algılama (hazırlanan frame encoding ile paylaşılır)
+                prepared = self.face_detector.prepare_frame(frame, self._frame_buffers)
+                faces = self.face_detector.detect_faces_opencv_optimized(prepared, use_cache=True)
                 
                 # UI çizimi - Güvenli frame kontrolü ile
                 try:
@@ -507,15 +588,20 @@ class OptimizedFaceRecognitionApp:
                     self.logger.info("❌ Kayıt iptal edildi.")
                     break
                 elif key == ord('s') and faces:
-                    # Optimize encoding çıkarma
-                    current_encodings = self.face_detector.get_face_encodings_optimized(frame)
+                    # Encoding ile birlikte kalite ölçüleri (landmark'lar hizalamadan gelir)
+                    samples = self.face_detector.get_face_encodings_with_quality(prepared)
                     
-                    if current_encodings:
-                        face_encodings.extend(current_encodings)
-                        sample_taken += 1
-                        progress_bar.update(1)
-                        self.logger.debug(f"✅ Örnek {sample_taken}/{sample_count} kaydedildi.")
-                        self.session_stats['faces_detected'] += len(current_encodings)
+                    if samples:
+                        # Karede birden fazla yüz varsa kaydedilen kişi en büyük yüzdür
+                        encoding, quality = max(samples, key=lambda sample: sample[1].face_size)
+                        reason = selector.offer(encoding, quality)
+                        if reason is None:
+                            sample_taken += 1
+                            progress_bar.update(1)
+                            self.logger.debug(f"✅ Örnek {sample_taken}/{sample_count} kaydedildi (puan: {quality.score:.2f}).")
+                            self.session_stats['faces_detected'] += 1
+                        else:
+                            self.logger.warning(f"⚠️  Örnek reddedildi: {reason}. Tekrar deneyin.")
                     else:
                         self.logger.warning("⚠️  Yüz encoding'i alınamadı! Tekrar deneyin.")
                 elif key == ord('s') and not faces:
@@ -528,6 +614,7 @@ class OptimizedFaceRecognitionApp:
                 self.logger.error("❌ Hiç fotoğraf alınmadı, kayıt iptal edildi.")
                 return False
             
+            face_encodings = selector.encodings
             if len(face_encodings) == 0:
                 self.logger.error("❌ Yüz verisi alınamadı, kayıt iptal edildi.")
                 return False
@@ -541,9 +628,10 @@ class OptimizedFaceRecognitionApp:
             )
             
             if self.user_manager.save_user(user_data):
-                # Tanıma sistemine ekle
-                for encoding in face_encodings:
-                    self.face_recognizer.add_known_face(encoding, name)
+                # Tanıma sistemine ekle (tek galeri versiyonu)
+                user_ids = self._gallery_user_ids()
+                self.face_recognizer.add_known_faces(face_encodings, name,
+                                                     user_id=user_ids.get(name) if user_ids else None)
                 
                 self.logger.info(f"✅ '{name}' başarıyla kaydedildi! ({len(face_encodings)} yüz örneği)")
                 self.session_stats['users_processed'] += 1
@@ -576,8 +664,13 @@ class OptimizedFaceRecognitionApp:
         fps_counter = 0
         fps_start_time = time.time()
         last_recognition_result = None
+        capture_buffer = None  # Kamera okuması için yeniden kullanılan buffer
         stability_check_interval = 30  # 30 frame'de bir stabilite kontrolü
         
+        if self.config.system.memory_leak_tracking:
+            self.leak_tracker.start()
+            self.logger.info("🧪 tracemalloc sızıntı takibi açık ('m' ile fark raporu)")
+        
         try:
             while True:
                 # Stabilite kontrolü
@@ -586,11 +679,18 @@ class OptimizedFaceRecognitionApp:
                         self.logger.warning("⚠️ Sistem instabil, recovery stratejileri uygulanıyor...")
                         continue
                 
+                # Frame izi: capture -> detect -> encode -> match -> draw -> display
+                frame_trace = self.tracer.begin_trace('frame', frame_id=self.session_stats['total_frames'] + 1)
+                
                 # Frame capture with buffer management
-                raw_frame = self.camera_manager.capture_frame()
-                frame = self._manage_frame_buffer(raw_frame)
+                with self._stage('capture'):
+                    raw_frame = self.camera_manager.capture_frame(out=capture_buffer)
+                    if raw_frame is not None:
+                        capture_buffer = raw_frame
+                    frame = self._manage_frame_buffer(raw_frame)
                 
                 if frame is None:
+                    self.tracer.end_trace(frame_trace)
                     continue
                 
                 self.session_stats['total_frames'] += 1
@@ -624,14 +724,14 @@ class OptimizedFaceRecognitionApp:
                 frame_time = (time.time() - frame_start_time) * 1000
                 
                 # Performance metrics güncelle
-                import psutil
-                memory_mb = psutil.Process().memory_info().rss / 1024 / 1024
+                memory_mb = self._process.memory_info().rss / 1024 / 1024
                 self._update_performance_metrics(frame_time, current_fps, memory_mb)
                 
                 # Cache statistikleri
                 cache_stats = self.face_detector.get_performance_stats()
                 
                 # Enhanced Dashboard UI with stability info
+                display_start = None
                 try:
                     fps_data = {
                         'fps': current_fps,
@@ -642,7 +742,9 @@ class OptimizedFaceRecognitionApp:
                         'memory': memory_mb,
                         'recovery_mode': self.performance_monitor['error_recovery_mode'],
                         'dropped_frames': self.session_stats['dropped_frames'],
-                        'total_frames': self.session_stats['total_frames']
+                        'total_frames': self.session_stats['total_frames'],
+                        'profiling': self.profiler.is_running,
+                        'stages': {stage: self.stage_metrics.recent(stage) for stage in self.stage_metrics.stages}
                     }
                     
                     recognition_data = {
@@ -654,15 +756,17 @@ class OptimizedFaceRecognitionApp:
                     }
                     
                     # Safe UI rendering
-                    if frame.shape[0] > 0 and frame.shape[1] > 0:
-                        frame = self._draw_dashboard_ui(frame, fps_data, recognition_data=recognition_data)
-                        
-                        # Yüz overlay'leri çiz
+                    with self._stage('draw'):
                         if frame.shape[0] > 0 and frame.shape[1] > 0:
-                            frame = self._draw_face_overlay(frame, faces, results, mode='recognition')
+                            frame = self._draw_dashboard_ui(frame, fps_data, recognition_data=recognition_data)
+                            
+                            # Yüz overlay'leri çiz
+                            if frame.shape[0] > 0 and frame.shape[1] > 0:
+                                frame = self._draw_face_overlay(frame, faces, results, mode='recognition')
                     
                     # Final display
                     if frame.shape[0] > 0 and frame.shape[1] > 0:
+                        display_start = time.perf_counter()
                         cv2.imshow('Ultra-Optimized Face Recognition', frame)
                     else:
                         self.logger.debug("⚠️ Frame boyutu geçersiz, atlanıyor")
@@ -677,6 +781,11 @@ class OptimizedFaceRecognitionApp:
                 
                 # Enhanced keyboard controls
                 key = cv2.waitKey(1) & 0xFF
+                # Display: imshow + waitKey (pencere olay döngüsü ekrana basmayı burada yapar)
+                if display_start is not None:
+                    self._record_stage('display', display_start)
+                    self.tracer.record_span('display', display_start)
+                self.tracer.end_trace(frame_trace)
                 
                 if key == ord('q'):
                     break
@@ -706,6 +815,16 @@ class OptimizedFaceRecognitionApp:
                         json.dump(metadata, f, indent=2, default=str)
                     
                     self.logger.info(f"📸 Screenshot ve metadata kaydedildi: {screenshot_path}")
+                elif key == ord('p'):
+                    # Örneklemeli profiler aç/kapat
+                    profile_path = self.profiler.toggle()
+                    if self.profiler.is_running:
+                        self.logger.info("🔬 Profiler başlatıldı (durdurmak için tekrar 'p').")
+                    else:
+                        self.logger.info(f"🔬 Profiler durduruldu: {profile_path or 'örnek yok'}")
+                elif key == ord('m'):
+                    # Bellek raporu (sızıntı takibi açıksa tracemalloc farkıyla)
+                    self.log_memory_report()
                 elif key == ord('a'):
                     # Toggle adaptive mode
                     self.performance_monitor['adaptive_quality'] = not self.performance_monitor['adaptive_quality']
@@ -719,8 +838,71 @@ class OptimizedFaceRecognitionApp:
             cv2.destroyAllWindows()
             self.camera_manager.release()
             self._save_enhanced_session_stats()
+            trace_path = self.tracer.export()
+            if trace_path:
+                self.logger.info(f"🧵 Trace kaydedildi: {trace_path}")
+            if self.profiler.is_running:
+                self.logger.info(f"🔬 Profil kaydedildi: {self.profiler.stop()}")
+            if self.leak_tracker.is_running:
+                self.log_memory_report()
+                self.leak_tracker.stop()
             self.logger.info("👋 Ultra-optimized yüz tanıma durduruldu.")
     
+    def log_memory_report(self, top: int = 10) -> Dict:
+        """
+        Bileşen bazlı bellek raporunu loglar.
+        
+        Args:
+            top: Sızıntı takibi açıksa gösterilecek en çok büyüyen satır sayısı
+            
+        Returns:
+            Rapor sözlüğü (takip açıksa 'leak' alanıyla)
+        """
+        report = self.memory_accountant.report()
+        if self.leak_tracker.is_running:
+            report['leak'] = self.leak_tracker.diff(top)
+        
+        self.logger.info("💾 Bellek raporu:")
+        for line in format_memory_report(report):
+            self.logger.info(f"   {line}")
+        return report
+    
+    def memory_report(self, leak_frames: int = 0, top: int = 10) -> None:
+        """
+        Bellek raporunu yazdırır; istenirse sentetik frame'lerle tracemalloc sızıntı kontrolü yapar.
+        
+        Args:
+            leak_frames: Referans snapshot sonrası işlenecek frame sayısı (0 = yalnızca rapor)
+            top: Gösterilecek en çok büyüyen satır sayısı
+        """
+        report = self.memory_accountant.report()
+        
+        if leak_frames > 0:
+            rng = np.random.default_rng(0)
+            frames = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(4)]
+            probe = rng.standard_normal(128)
+            
+            def process(count: int) -> None:
+                for i in tqdm(range(count), desc="Frame işleniyor", leave=False):
+                    self._adaptive_frame_processing(frames[i % len(frames)], current_fps=30.0)
+                    if self.face_recognizer.get_known_faces_count():
+                        self.face_recognizer.recognize_faces([probe])
+            
+            # Isınma: cache'ler, buffer'lar ve tembel başlatmalar referansa dahil edilir
+            process(min(leak_frames, 20))
+            self.leak_tracker.start()
+            try:
+                process(leak_frames)
+                report = self.memory_accountant.report()
+                report['leak'] = self.leak_tracker.diff(top)
+            finally:
+                self.leak_tracker.stop()
+        
+        print("\n💾 Bellek Raporu:")
+        print("=" * 50)
+        for line in format_memory_report(report):
+            print(line)
+    
     def _save_session_stats(self):
         """Session istatistiklerini kaydet."""
         session_duration = time.time() - self.session_stats['start_time']
@@ -767,6 +949,14 @@ class OptimizedFaceRecognitionApp:
         self.logger.info(f"💾 Ortalama memory: {avg_memory:.1f}MB")
         self.logger.info(f"🔄 Recovery mode kullanım: {'Evet' if monitor['error_recovery_mode'] else 'Hayır'}")
         
+        # Aşama bazlı gecikmeler (oturum boyu histogramlardan)
+        stage_summary = self.stage_metrics.summary()
+        if stage_summary:
+            self.logger.info("⏲️  Aşama gecikmeleri (ms):")
+            for stage, stats in stage_summary.items():
+                self.logger.info(f"   {stage:<8} n={stats['count']:<6} p50={stats['p50_ms']:.1f} p95={stats['p95_ms']:.1f} "
+                                 f"p99={stats['p99_ms']:.1f} max={stats['max_ms']:.1f}")
+        
         # Stability metrikleri
         stability = self.stability_monitor
         self.logger.info(f"🛡️  Son hata: {stability['consecutive_errors']} ardışık")
@@ -793,6 +983,117 @@ class OptimizedFaceRecognitionApp:
             print(f"   🔄 Güncellenme: {user.updated_at}")
             print("-" * 30)
     
+    def _get_storage(self, backend: str):
+        """Seçilen depolama arka ucunu döndürür ('files' veya 'sqlite')."""
+        if backend == 'sqlite':
+            return get_database_manager()
+        return UserManager(data_dir=self.config.system.data_dir)
+    
+    def _gallery_user_ids(self, storage=None) -> Optional[Dict[str, int]]:
+        """SQLite deposunda galeri etiketleri için isim -> users.id eşlemesi; dosya deposunda None."""
+        storage = storage if storage is not None else self.user_manager
+        if isinstance(storage, DatabaseManager):
+            return storage.get_user_ids()
+        return None
+    
+    def enroll_directory(self, root: str, backend: str = 'files', workers: int = 0,
+                         batch_size: int = 32, resume: bool = True, state_file: Optional[str] = None,
+                         max_samples: Optional[int] = None, assume_cropped: bool = False) -> dict:
+        """
+        Kişi başına bir klasör içeren dizinden toplu kullanıcı kaydı yapar.
+        
+        Args:
+            root: Kök dizin (root/<kişi adı>/*.jpg)
+            backend: Depolama arka ucu ('files' veya 'sqlite')
+            workers: Worker süreç sayısı (0 = CPU sayısı)
+            batch_size: Tek yazımda kaydedilecek kullanıcı sayısı
+            resume: False ise ilerleme dosyası silinip baştan başlanır
+            state_file: İlerleme dosyası (varsayılan: logs/enroll_<dizin>_<arka uç>.jsonl)
+            max_samples: Kullanıcı başına maksimum encoding (None = enrolment_max_samples)
+            assume_cropped: Görüntülerin kırpılmış tek yüz olduğunu varsayar
+            
+        Returns:
+            Çalışma raporu
+        """
+        root_path = Path(root)
+        if not root_path.is_dir():
+            print(f"❌ Dizin bulunamadı: {root}")
+            return {}
+        
+        state_path = Path(state_file) if state_file else Path(self.config.system.logs_dir) / f"enroll_{root_path.resolve().name}_{backend}.jsonl"
+        if not resume and state_path.exists():
+            state_path.unlink()
+        
+        pipeline = ImagePipeline(num_workers=workers or os.cpu_count() or 1, assume_cropped=assume_cropped)
+        enroller = BulkEnroller(self._get_storage(backend), pipeline, state_path, self.config.detection,
+                                batch_size=batch_size, max_samples=max_samples)
+        
+        print(f"📂 Toplu kayıt: {root_path} → {backend} (ilerleme: {state_path})")
+        with tqdm(desc="Görüntüler", unit="img") as progress:
+            report = enroller.run(root_path, on_image=lambda result: progress.update(1))
+        
+        print(f"\n✅ Kaydedilen: {report['users_saved']}/{report['users_total']} kullanıcı")
+        print(f"⏭️  Önceki çalışmadan: {report['users_resumed']}, zaten kayıtlı: {report['users_existing']}, başarısız: {report['users_failed']}")
+        print(f"🖼️  Görüntü: {report['images_ok']}/{report['images']} geçerli, {report['images_per_second']:.1f} görüntü/s")
+        for reason, count in sorted(report['failures'].items(), key=lambda item: -item[1]):
+            print(f"   ⚠️  {reason}: {count}")
+        if report['samples_rejected']:
+            print(f"🔎 Elenen örnekler: {sum(report['samples_rejected'].values())}")
+            for reason, count in sorted(report['samples_rejected'].items(), key=lambda item: -item[1]):
+                print(f"   ↪️  {reason}: {count}")
+        
+        self.logger.info(f"📂 Toplu kayıt tamamlandı: {report['users_saved']} kullanıcı, {report['images_per_second']:.1f} görüntü/s")
+        return report
+    
+    def recognize_directory(self, root: str, output: str, backend: str = 'files', workers: int = 0,
+                            batch_size: int = 64, top_k: int = 2, output_format: Optional[str] = None,
+                            assume_cropped: bool = False) -> dict:
+        """
+        Dizindeki tüm görüntüleri galeriyle eşleştirir ve sonuçları CSV / JSON lines olarak yazar.
+        
+        Args:
+            root: Görüntü dizini
+            output: Sonuç dosyası
+            backend: Galerinin yükleneceği depolama ('files' veya 'sqlite')
+            workers: Worker süreç sayısı (0 = CPU sayısı)
+            batch_size: Tek eşleştirmede toplanacak görüntü sayısı
+            top_k: Yüz başına aday sayısı
+            output_format: "csv" veya "jsonl" (varsayılan: dosya uzantısından)
+            assume_cropped: Görüntülerin kırpılmış tek yüz olduğunu varsayar
+            
+        Returns:
+            Çalışma raporu
+        """
+        root_path = Path(root)
+        if not root_path.is_dir():
+            print(f"❌ Dizin bulunamadı: {root}")
+            return {}
+        
+        # Galeri her zaman seçilen arka uçtan kurulur (konfigürasyondaki user_backend'den bağımsız)
+        storage = self._get_storage(backend)
+        self.face_recognizer.load_known_faces(
+            ((user.name, user.face_encodings) for user in storage.load_all_users()),
+            user_ids=self._gallery_user_ids(storage)
+        )
+        
+        if self.face_recognizer.get_known_faces_count() == 0:
+            print("⚠️  Galeri boş; tüm yüzler 'Bilinmeyen' olarak yazılacak.")
+        
+        pipeline = ImagePipeline(num_workers=workers or os.cpu_count() or 1, assume_cropped=assume_cropped)
+        recognizer = BulkRecognizer(self.face_recognizer, pipeline, batch_size=batch_size, top_k=top_k)
+        
+        print(f"🔍 Toplu tanıma: {root_path} → {output}")
+        with tqdm(desc="Görüntüler", unit="img") as progress:
+            report = recognizer.run(root_path, Path(output), output_format, on_image=lambda result: progress.update(1))
+        
+        print(f"\n✅ {report['images']} görüntü, {report['faces']} yüz, {report['matched']} eşleşme")
+        print(f"⚡ {report['images_per_second']:.1f} görüntü/s ({report['elapsed']:.1f}s)")
+        for reason, count in sorted(report['failures'].items(), key=lambda item: -item[1]):
+            print(f"   ⚠️  {reason}: {count}")
+        
+        self.logger.info(f"🔍 Toplu tanıma tamamlandı: {report['images']} görüntü, {report['images_per_second']:.1f} görüntü/s")
+        return report
+    
     def delete_user(self, name: str) -> bool:
         """
         Kullanıcıyı siler.
@@ -814,8 +1115,8 @@ class OptimizedFaceRecognitionApp:
             return False
         
         if self.user_manager.delete_user(name):
-            # Tanıma sisteminden de kaldır
-            self.face_recognizer.remove_known_face(name)
+            # Tanıma sisteminden tüm örnekleriyle kaldır
+            self.face_recognizer.remove_user(name)
             print(f"✅ '{name}' başarıyla silindi.")
             return True
         else:
@@ -1021,15 +1322,21 @@ class OptimizedFaceRecognitionApp:
             
             # 1. Minimal Top Bar - Sadece temel bilgiler
             top_bar_height = 40
-            overlay = frame.copy()
-            cv2.rectangle(overlay, (0, 0), (width, top_bar_height), colors['dark'], -1)
-            cv2.addWeighted(frame, 0.7, overlay, 0.3, 0, frame)
+            # Sadece bar bölgesi karıştırılır (tam frame kopyası yerine)
+            bar_region = frame[:top_bar_height, :width]
+            bar = self._frame_buffers.get('top_bar', bar_region.shape, frame.dtype)
+            bar[:] = colors['dark']
+            cv2.addWeighted(bar_region, 0.7, bar, 0.3, 0, bar_region)
             
             # Mod göstergesi (sol üst)
             mode = registration_data['mode'] if registration_data else 'RECOGNITION'
             mode_color = colors['warning'] if mode == 'REGISTRATION' else colors['success']
             cv2.putText(frame, mode, (15, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, mode_color, 2)
             
+            # Profiler göstergesi
+            if fps_data.get('profiling'):
+                cv2.putText(frame, "PROF", (200, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, colors['danger'], 2)
+            
             # FPS göstergesi (sağ üst) - adaptive mode dahil
             current_fps = fps_data.get('fps', 0)
             recovery_mode = fps_data.get('recovery_mode', False)
@@ -1087,6 +1394,24 @@ class OptimizedFaceRecognitionApp:
                 
                 cv2.putText(frame, "A: Auto", (width - 250, height - 20), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, colors['white'], 1)
+                
+                cv2.putText(frame, "P: Prof", (width - 315, height - 20), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, colors['white'], 1)
+                
+                cv2.putText(frame, "M: Mem", (width - 380, height - 20), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, colors['white'], 1)
+            
+            # 4. Aşama gecikmeleri (sol, son N frame p50/p95/p99 ms)
+            stages = fps_data.get('stages')
+            if stages:
+                y = top_bar_height + 18
+                for stage, percentiles in stages.items():
+                    if percentiles is None:
+                        continue
+                    p50, p95, p99 = percentiles
+                    cv2.putText(frame, f"{stage:<8} {p50:5.1f} {p95:5.1f} {p99:5.1f}", (10, y),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.4, colors['white'], 1)
+                    y += 15
             
             return frame
         
@@ -1206,6 +1531,38 @@ def list_users():
     app.list_users()
 
 
+@cli.command('enroll-dir')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--backend', '-b', type=click.Choice(['files', 'sqlite']), default='files', help='Depolama arka ucu (varsayılan: files)')
+@click.option('--workers', '-w', default=0, type=click.IntRange(0), help='Worker süreç sayısı (varsayılan: CPU sayısı)')
+@click.option('--batch-size', default=32, type=click.IntRange(1), help='Tek yazımda kaydedilecek kullanıcı sayısı')
+@click.option('--resume/--no-resume', default=True, help='Yarıda kalan kayda devam et (varsayılan: açık)')
+@click.option('--state-file', default=None, help='İlerleme dosyası yolu')
+@click.option('--max-samples', default=None, type=click.IntRange(1), help='Kullanıcı başına maksimum örnek (varsayılan: enrolment_max_samples)')
+@click.option('--cropped', is_flag=True, help='Görüntüler kırpılmış tek yüz (algılama atlanır)')
+def enroll_dir(directory: str, backend: str, workers: int, batch_size: int, resume: bool,
+               state_file: str, max_samples: int, cropped: bool):
+    """Kişi başına bir klasör içeren dizinden toplu kayıt yapar"""
+    app = OptimizedFaceRecognitionApp()
+    app.enroll_directory(directory, backend, workers, batch_size, resume, state_file, max_samples, cropped)
+
+
+@cli.command('recognize-dir')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--output', '-o', required=True, help='Sonuç dosyası (.csv veya .jsonl)')
+@click.option('--format', 'output_format', type=click.Choice(['csv', 'jsonl']), default=None, help='Çıktı formatı (varsayılan: uzantıdan)')
+@click.option('--backend', '-b', type=click.Choice(['files', 'sqlite']), default='files', help='Galeri kaynağı (varsayılan: files)')
+@click.option('--workers', '-w', default=0, type=click.IntRange(0), help='Worker süreç sayısı (varsayılan: CPU sayısı)')
+@click.option('--batch-size', default=64, type=click.IntRange(1), help='Tek eşleştirmede toplanacak görüntü sayısı')
+@click.option('--top-k', default=2, type=click.IntRange(1), help='Yüz başına aday sayısı (2+ margin yazar)')
+@click.option('--cropped', is_flag=True, help='Görüntüler kırpılmış tek yüz (algılama atlanır)')
+def recognize_dir(directory: str, output: str, output_format: str, backend: str, workers: int,
+                  batch_size: int, top_k: int, cropped: bool):
+    """Dizindeki görüntüleri toplu olarak tanır ve sonuçları dosyaya yazar"""
+    app = OptimizedFaceRecognitionApp()
+    app.recognize_directory(directory, output, backend, workers, batch_size, top_k, output_format, cropped)
+
+
 @cli.command()
 @click.option('--name', '-n', help='Silinecek kullanıcı adı (interaktif menü için boş bırakın)')
 def delete(name: str):
@@ -1230,6 +1587,15 @@ def delete_interactive():
     app.interactive_delete_user()
 
 
+@cli.command()
+@click.option('--leak-check', default=0, help='tracemalloc farkı için işlenecek sentetik frame sayısı (0 = kapalı)')
+@click.option('--top', default=10, help='Gösterilecek en çok büyüyen satır sayısı')
+def memory(leak_check: int, top: int):
+    """Galeri, cache ve buffer bellek raporunu gösterir"""
+    app = OptimizedFaceRecognitionApp()
+    app.memory_report(leak_check, top)
+
+
 @cli.command()
 def test():
     """Sistem testini yapar"""
@@ -6,6 +6,7 @@ Enhanced with adaptive performance, stability testing, and memory profiling
 
 import sys
 import time
+import tracemalloc
 import psutil
 import numpy as np
 from pathlib import Path
@@ -16,6 +17,7 @@ PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from core.face_detector import OptimizedFaceDetector
+from core.face_recognizer import FaceRecognizer
 from utils.logger import get_logger_manager
 
 class UltraBenchmark:
@@ -129,6 +131,105 @@ class UltraBenchmark:
         
         return results
     
+    def run_batch_encoding_test(self, frame_count: int = 16, faces_per_frame: int = 2) -> Dict:
+        """Toplu encoding ile frame başına encoding throughput'unu karşılaştırır."""
+        print("🧬 Batch Encoding Test başlatılıyor...")
+        
+        rng = np.random.default_rng(42)
+        face_locations = [(60 + i * 40, 260 + i * 120, 220 + i * 40, 100 + i * 120) for i in range(faces_per_frame)]
+        frames = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(frame_count)]
+        total_faces = frame_count * faces_per_frame
+        
+        # Frame başına yol (mevcut davranış)
+        start_time = time.time()
+        for frame in frames:
+            self.detector.get_face_encodings_optimized(frame, face_locations)
+        per_call_time = time.time() - start_time
+        
+        # Toplu yol
+        start_time = time.time()
+        self.detector.get_face_encodings_batch([(frame, face_locations) for frame in frames])
+        batch_time = time.time() - start_time
+        
+        per_call_fps = total_faces / per_call_time if per_call_time > 0 else 0
+        batch_fps = total_faces / batch_time if batch_time > 0 else 0
+        
+        return {
+            'frames': frame_count,
+            'faces': total_faces,
+            'per_call_faces_per_s': per_call_fps,
+            'batch_faces_per_s': batch_fps,
+            'speedup': batch_fps / per_call_fps if per_call_fps > 0 else 0
+        }
+    
+    def run_gallery_quantization_test(self, users: int = 5000, samples_per_user: int = 4,
+                                      probe_count: int = 500) -> Dict:
+        """
+        Kuantalı galeride doğruluk, bellek ve sorgu süresini kesin aramayla karşılaştırır.
+        resident_bytes galeri kurulduktan sonra tracemalloc ile ölçülen (numpy dahil) bellekte kalan,
+        disk_bytes memmap dosyasındaki encoding başına baytdır.
+        """
+        print("🗜️ Gallery Quantization Test başlatılıyor...")
+        
+        # dlib encoding dağılımına yakın sentetik galeri (kişi içi mesafe ~0.4, kişiler arası ~1.0)
+        rng = np.random.default_rng(42)
+        centers = rng.normal(0, 0.09, (users, 128)).astype(np.float32)
+        entries = [(f"user{i}", list(centers[i] + rng.normal(0, 0.025, (samples_per_user, 128)).astype(np.float32)))
+                   for i in range(users)]
+        owners = rng.integers(0, users, probe_count)
+        probes = list(centers[owners] + rng.normal(0, 0.025, (probe_count, 128)).astype(np.float32))
+        
+        encodings = users * samples_per_user
+        
+        def measure(quantization, rerank_candidates=32):
+            # Kurulumda ayrılıp galeride kalan bellek (geçici bloklar ve sorgu tamponları hariç)
+            tracemalloc.start()
+            recognizer = FaceRecognizer(quantization=quantization, rerank_candidates=rerank_candidates)
+            recognizer.load_known_faces(entries)
+            resident = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            
+            start_time = time.time()
+            results = recognizer.recognize_faces(probes)
+            elapsed = time.time() - start_time
+            top1 = float(np.mean([r.user_id == recognizer.get_user_id(f"user{o}") for r, o in zip(results, owners)]))
+            return recognizer, results, {
+                'resident_bytes_per_encoding': resident // encodings,
+                'disk_bytes_per_encoding': recognizer.get_gallery_stats()['rerank_bytes'] // encodings,
+                'ms_per_probe': elapsed * 1000 / probe_count,
+                'top1_accuracy': top1
+            }
+        
+        _, exact_results, exact_report = measure(None)
+        report = {
+            'encodings': encodings,
+            'float64_bytes_per_encoding': 128 * 8,
+            'exact': dict(exact_report, scan_bytes_per_encoding=128 * 4)
+        }
+        
+        for mode in ("float16", "int8"):
+            recognizer, results, mode_report = measure(mode)
+            _, coarse_results, _ = measure(mode, rerank_candidates=1)  # Yeniden sıralamasız
+            stats = recognizer.get_gallery_stats()
+            
+            # Kaba mesafenin kesin mesafeden sapması (kuantalama hatası)
+            snapshot = recognizer.get_snapshot()
+            errors = []
+            for probe in probes[:50]:
+                coarse = np.sqrt(np.maximum(snapshot.quantizer.coarse_distances(snapshot.codes, snapshot.code_norms, probe), 0))
+                errors.append(coarse - np.linalg.norm(snapshot.encodings - probe, axis=1))
+            
+            report[mode] = dict(
+                mode_report,
+                scan_bytes_per_encoding=stats['coarse_bytes'] // stats['capacity'],
+                rerank_agreement=float(np.mean([a.user_id == b.user_id for a, b in zip(results, exact_results)])),
+                coarse_only_agreement=float(np.mean([a.user_id == b.user_id for a, b in zip(coarse_results, exact_results)])),
+                coarse_distance_rmse=float(np.sqrt(np.mean(np.square(errors)))),
+                max_distance_error=float(max(abs(a.confidence - b.confidence) for a, b in zip(results, exact_results)))
+            )
+        
+        return report
+    
     def run_stability_test(self) -> Dict:
         """Sistem stability ve error recovery testleri."""
         print("🛡️ Stability Test başlatılıyor...")
@@ -224,13 +325,38 @@ class UltraBenchmark:
             status = "✅ PASS" if passed else "❌ FAIL"
             print(f"  {test_name}: {status}")
         
-        # 4. Overall Performance Score
+        # 4. Batch Encoding Test
+        batch_results = self.run_batch_encoding_test()
+        self.results['batch_encoding'] = batch_results
+        
+        print(f"\n🧬 Batch Encoding Sonuçları:")
+        print(f"  Frame başına: {batch_results['per_call_faces_per_s']:.1f} yüz/s")
+        print(f"  Toplu: {batch_results['batch_faces_per_s']:.1f} yüz/s")
+        print(f"  Hızlanma: {batch_results['speedup']:.2f}x")
+        
+        # 5. Gallery Quantization Test
+        quant_results = self.run_gallery_quantization_test()
+        self.results['gallery_quantization'] = quant_results
+        
+        print(f"\n🗜️ Gallery Quantization Sonuçları ({quant_results['encodings']} encoding):")
+        exact = quant_results['exact']
+        print(f"  float32 kesin: {exact['resident_bytes_per_encoding']} B/encoding bellek, "
+              f"{exact['ms_per_probe']:.2f} ms/sorgu, top-1 {exact['top1_accuracy']:.3f}")
+        for mode in ("float16", "int8"):
+            data = quant_results[mode]
+            print(f"  {mode}: {data['resident_bytes_per_encoding']} B/encoding bellek "
+                  f"(+{data['disk_bytes_per_encoding']} B disk), {data['ms_per_probe']:.2f} ms/sorgu, "
+                  f"top-1 {data['top1_accuracy']:.3f}, uyum {data['rerank_agreement']:.3f} "
+                  f"(yeniden sıralamasız {data['coarse_only_agreement']:.3f}), "
+                  f"kaba mesafe RMSE {data['coarse_distance_rmse']:.4f}")
+        
+        # 6. Overall Performance Score
         self._calculate_performance_score()
         
         print(f"\n📈 Overall Performance Score: {self.results['overall_score']:.1f}/100")
         print("=" * 70)
         
-        # 5. Save detailed report
+        # 7. Save detailed report
         self._save_benchmark_report()
     
     def _calculate_performance_score(self) -> None:
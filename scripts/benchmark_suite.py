@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Realistic Benchmark Suite
+Decode, detect, encode, match, storage ve uçtan uca API gecikmelerini aşama aşama ölçer;
+sonuçlar p50/p95/p99 ile makine tarafından okunabilir JSON olarak yazılır.
+--baseline ile önceki raporla karşılaştırır ve gerilemede sıfırdan farklı kodla çıkar.
+"""
+
+import argparse
+import base64
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import cv2
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Proje root dizinini Python path'ine ekle
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.face_detector import FaceDetector
+from core.face_recognizer import FaceRecognizer
+from core.user_manager import UserManager, UserData
+from core.bulk_pipeline import iter_image_files
+from utils.database import DatabaseManager
+
+
+# (top, right, bottom, left) - face_recognition konum formatı
+FaceLocation = Tuple[int, int, int, int]
+
+SCENARIOS = ("decode", "detect", "encode", "match", "storage", "api")
+GALLERY_SIZES = (1_000, 10_000, 100_000)
+
+
+def make_synthetic_face(rng: np.random.Generator, shape: Tuple[int, int] = (480, 640)) -> Tuple[np.ndarray, FaceLocation]:
+    """
+    Çizilmiş sentetik yüz görüntüsü üretir (Haar ve HOG çoğunu algılar).
+
+    Args:
+        rng: Rastgele sayı üreteci
+        shape: Görüntü boyutu (yükseklik, genişlik)
+
+    Returns:
+        (BGR görüntü, yüz konumu)
+    """
+    height, width = shape
+    image = np.full((height, width, 3), rng.integers(90, 160, 3), np.uint8)
+    image = cv2.add(image, rng.integers(0, 25, (height, width, 3), dtype=np.uint8))
+
+    face_width = int(rng.integers(width // 5, width // 3))
+    face_height = int(face_width * 1.3)
+    cx = int(rng.integers(face_width, width - face_width))
+    cy = int(rng.integers(face_height // 2 + 10, height - face_height // 2 - 10))
+    skin = tuple(int(v) for v in rng.integers([90, 130, 170], [150, 180, 230]))
+    cv2.ellipse(image, (cx, cy), (face_width // 2, face_height // 2), 0, 0, 360, skin, -1)
+
+    eye_dx, eye_y = face_width // 5, cy - face_height // 8
+    stroke = max(2, face_width // 40)
+    for side in (-1, 1):
+        eye_x = cx + side * eye_dx
+        cv2.ellipse(image, (eye_x, eye_y), (face_width // 9, face_width // 18), 0, 0, 360, (245, 245, 245), -1)
+        cv2.circle(image, (eye_x, eye_y), face_width // 28 + 1, (40, 30, 20), -1)
+        cv2.line(image, (eye_x - face_width // 8, eye_y - face_width // 8),
+                 (eye_x + face_width // 8, eye_y - face_width // 7), (50, 40, 30), stroke)
+
+    nose = np.array([[cx, eye_y + face_width // 20], [cx - face_width // 14, cy + face_height // 10],
+                     [cx + face_width // 14, cy + face_height // 10]], np.int32)
+    cv2.polylines(image, [nose], False, tuple(int(c * 0.7) for c in skin), max(1, face_width // 60))
+    cv2.ellipse(image, (cx, cy + face_height // 4), (face_width // 5, face_height // 16), 0, 0, 180, (60, 60, 150), stroke)
+
+    image = cv2.GaussianBlur(image, (3, 3), 0)
+    location = (cy - face_height // 2, cx + face_width // 2, cy + face_height // 2, cx - face_width // 2)
+    return image, location
+
+
+def make_synthetic_gallery(rng: np.random.Generator, users: int,
+                           samples_per_user: int = 4) -> Tuple[np.ndarray, List[Tuple[str, np.ndarray]]]:
+    """dlib dağılımına yakın sentetik galeri (kişi içi mesafe ~0.4, kişiler arası ~1.0)."""
+    centers = rng.normal(0, 0.09, (users, 128)).astype(np.float32)
+    noise = rng.normal(0, 0.025, (users, samples_per_user, 128)).astype(np.float32)
+    return centers, [(f"user{i}", centers[i] + noise[i]) for i in range(users)]
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Gecikme örneklerini yüzdelik özetine çevirir."""
+    values = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        'count': int(values.size),
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'min_ms': float(values.min()),
+        'max_ms': float(values.max())
+    }
+
+
+def time_calls(func: Callable[[], object], iterations: int, warmup: int = 2) -> List[float]:
+    """Fonksiyonu ısındırıp her çağrının süresini milisaniye olarak ölçer."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+class BenchmarkSuite:
+    """Aşama bazlı benchmark takımı."""
+
+    def __init__(self, fixtures_dir: Optional[str] = None, quick: bool = False,
+                 gallery_sizes: Tuple[int, ...] = GALLERY_SIZES, seed: int = 42):
+        """
+        BenchmarkSuite başlatır.
+
+        Args:
+            fixtures_dir: Gerçek yüz görüntüleri dizini (yoksa sentetik yüzler üretilir)
+            quick: Daha az tekrar ve en büyük galeri olmadan hızlı çalıştırma
+            gallery_sizes: Eşleştirme için galeri boyutları
+            seed: Sentetik veri tohumu
+        """
+        self.quick = quick
+        self.iterations = 10 if quick else 50
+        self.gallery_sizes = tuple(size for size in gallery_sizes if not (quick and size > 10_000))
+        self.rng = np.random.default_rng(seed)
+        self.detector = FaceDetector()
+        self.fixtures = self._load_fixtures(fixtures_dir)
+        self.fixture_source = fixtures_dir or "synthetic"
+
+    def _load_fixtures(self, fixtures_dir: Optional[str]) -> List[Tuple[np.ndarray, FaceLocation]]:
+        """Fixture görüntülerini ve yüz konumlarını yükler."""
+        if not fixtures_dir:
+            return [make_synthetic_face(self.rng) for _ in range(8)]
+
+        import face_recognition
+        fixtures = []
+        for path in iter_image_files(Path(fixtures_dir)):
+            image = cv2.imread(str(path))
+            if image is None:
+                continue
+            locations = face_recognition.face_locations(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+            if locations:
+                fixtures.append((image, locations[0]))
+        if not fixtures:
+            raise ValueError(f"Fixture dizininde yüz içeren görüntü yok: {fixtures_dir}")
+        return fixtures
+
+    def _cycle(self, items: List) -> Callable[[], object]:
+        """Her çağrıda sıradaki öğeyi döndüren yardımcı."""
+        state = {'index': 0}
+
+        def next_item():
+            item = items[state['index'] % len(items)]
+            state['index'] += 1
+            return item
+        return next_item
+
+    def bench_decode(self) -> Dict[str, List[float]]:
+        """JPEG decode: tam çözünürlük ve decode sırasında küçültme."""
+        print("🖼️  Decode...")
+        large = [cv2.resize(image, (1920, 1440)) for image, _ in self.fixtures]
+        payloads = [cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes() for image in large]
+        next_payload = self._cycle(payloads)
+        return {
+            'decode.jpeg_full': time_calls(
+                lambda: cv2.imdecode(np.frombuffer(next_payload(), np.uint8), cv2.IMREAD_COLOR), self.iterations),
+            'decode.jpeg_reduced': time_calls(
+                lambda: FaceDetector.decode_image(next_payload()), self.iterations)
+        }
+
+    def bench_detect(self) -> Dict[str, List[float]]:
+        """Algılama: her backend için cache'siz frame başına süre."""
+        print("🔎 Detect...")
+        next_frame = self._cycle([image for image, _ in self.fixtures])
+        return {
+            'detect.opencv_haar': time_calls(
+                lambda: self.detector.detect_faces_opencv_optimized(next_frame(), use_cache=False), self.iterations),
+            'detect.dlib_hog': time_calls(
+                lambda: self.detector.detect_faces_dlib_optimized(next_frame()), self.iterations)
+        }
+
+    def bench_encode(self) -> Dict[str, List[float]]:
+        """Encoding: bilinen konumla tek yüz ve 8 yüzlük batch (yüz başına süre)."""
+        print("🧬 Encode...")
+        next_fixture = self._cycle(self.fixtures)
+
+        def single():
+            image, location = next_fixture()
+            return self.detector.get_face_encodings_optimized(image, [location])
+
+        batch = [(image, [location]) for image, location in (self.fixtures * 2)[:8]]
+        batch_samples = time_calls(lambda: self.detector.get_face_encodings_batch(batch), max(3, self.iterations // 5))
+        return {
+            'encode.single_face': time_calls(single, self.iterations),
+            'encode.batch8_per_face': [sample / len(batch) for sample in batch_samples]
+        }
+
+    def bench_match(self) -> Dict[str, List[float]]:
+        """Eşleştirme: sentetik galerilerde tek sorgu ve top-3 gecikmesi."""
+        metrics = {}
+        for size in self.gallery_sizes:
+            print(f"🎯 Match ({size} kullanıcı)...")
+            centers, entries = make_synthetic_gallery(self.rng, size)
+            recognizer = FaceRecognizer()
+            recognizer.load_known_faces(entries)
+
+            probes = list(centers[self.rng.integers(0, size, 64)] + self.rng.normal(0, 0.025, (64, 128)).astype(np.float32))
+            next_probe = self._cycle(probes)
+            metrics[f'match.gallery_{size}.recognize'] = time_calls(
+                lambda: recognizer.recognize_faces([next_probe()]), self.iterations)
+            metrics[f'match.gallery_{size}.topk3'] = time_calls(
+                lambda: recognizer.recognize_topk([next_probe()], k=3), self.iterations)
+        return metrics
+
+    def bench_storage(self, users: int = 500, samples_per_user: int = 5) -> Dict[str, List[float]]:
+        """Depolama: dosya ve SQLite arka uçlarından tüm kullanıcıları yükleme."""
+        print("💾 Storage...")
+        temp_dir = tempfile.mkdtemp(prefix="face_bench_")
+        try:
+            now = datetime.now().isoformat()
+            _, entries = make_synthetic_gallery(self.rng, users, samples_per_user)
+            user_data = [UserData(name, list(encodings), now, now) for name, encodings in entries]
+
+            user_manager = UserManager(data_dir=f"{temp_dir}/users")
+            user_manager.save_users(user_data)
+            db_manager = DatabaseManager(f"{temp_dir}/bench.db")
+            db_manager.save_users(user_data)
+
+            iterations = max(3, self.iterations // 10)
+            return {
+                f'storage.files_load_{users}_users': time_calls(user_manager.load_all_users, iterations, warmup=1),
+                f'storage.sqlite_load_{users}_users': time_calls(db_manager.load_all_users, iterations, warmup=1)
+            }
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def bench_api(self, gallery_users: int = 1_000) -> Dict[str, List[float]]:
+        """Uçtan uca API: POST /api/recognize (base64 JPEG -> JSON)."""
+        print("🌐 API...")
+        from fastapi.testclient import TestClient
+        import api.main as api_main
+
+        payloads = [base64.b64encode(cv2.imencode(".jpg", image)[1].tobytes()).decode()
+                    for image, _ in self.fixtures]
+        next_payload = self._cycle(payloads)
+
+        # Sunucunun data/ dizinine dokunmamak için geçici çalışma dizini
+        temp_dir = tempfile.mkdtemp(prefix="face_bench_api_")
+        previous_cwd = os.getcwd()
+        os.chdir(temp_dir)
+        try:
+            with TestClient(api_main.app, base_url="http://localhost") as client:
+                _, entries = make_synthetic_gallery(self.rng, gallery_users)
+                api_main.face_recognizer.load_known_faces(entries)
+
+                def recognize():
+                    response = client.post("/api/recognize", json={'image_data': next_payload()})
+                    response.raise_for_status()
+
+                return {'api.recognize_end_to_end': time_calls(recognize, max(5, self.iterations // 2))}
+        finally:
+            os.chdir(previous_cwd)
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def run(self, scenarios: Tuple[str, ...] = SCENARIOS, repeat: int = 1) -> Dict:
+        """
+        Seçilen senaryoları çalıştırır.
+
+        Args:
+            scenarios: Çalıştırılacak senaryolar
+            repeat: Tekrar sayısı; her tekrarın p50 değeri gürültü tahmini için saklanır
+
+        Returns:
+            {'meta': ..., 'metrics': {metrik: yüzdelik özeti}}
+        """
+        raw: Dict[str, List[float]] = {}
+        run_p50s: Dict[str, List[float]] = {}
+        for _ in range(repeat):
+            for scenario in scenarios:
+                for name, samples in getattr(self, f"bench_{scenario}")().items():
+                    raw.setdefault(name, []).extend(samples)
+                    run_p50s.setdefault(name, []).append(float(np.percentile(samples, 50)))
+
+        metrics = {}
+        for name, samples in raw.items():
+            metrics[name] = summarize(samples)
+            metrics[name]['p50_runs_ms'] = run_p50s[name]
+
+        return {
+            'meta': {
+                'timestamp': datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'fixtures': self.fixture_source,
+                'quick': self.quick,
+                'repeat': repeat,
+                'scenarios': list(scenarios)
+            },
+            'metrics': metrics
+        }
+
+
+def print_report(report: Dict) -> None:
+    """Metrikleri tablo olarak yazdırır."""
+    print(f"\n{'Metrik':<42} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    print("-" * 75)
+    for name, stats in report['metrics'].items():
+        print(f"{name:<42} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f} {stats['p99_ms']:>10.3f}")
+
+
+def _representative_ms(stats: Dict) -> Tuple[float, float]:
+    """Metrik için (tekrarların medyan p50 değeri, tekrarlar arası yayılım) döndürür."""
+    runs = stats.get('p50_runs_ms') or [stats['p50_ms']]
+    return float(np.median(runs)), float(max(runs) - min(runs))
+
+
+def compare_reports(baseline: Dict, current: Dict, tolerance: float = 0.15,
+                    min_delta_ms: float = 0.5) -> List[Dict]:
+    """
+    Mevcut raporu baseline ile karşılaştırır.
+
+    Bir metrik; medyan p50 değeri baseline'ı hem göreli toleransı, hem mutlak
+    eşiği, hem de baseline tekrarları arasındaki yayılımı aşacak kadar geçerse
+    gerilemiş sayılır.
+
+    Args:
+        baseline: Baseline rapor
+        current: Yeni rapor
+        tolerance: Göreli tolerans (0.15 = %15)
+        min_delta_ms: Bu farkın altındaki değişimler gürültü sayılır
+
+    Returns:
+        Metrik başına satırlar (metric, baseline_ms, current_ms, change_pct, status)
+    """
+    rows = []
+    base_metrics, current_metrics = baseline['metrics'], current['metrics']
+    for name in sorted(set(base_metrics) | set(current_metrics)):
+        if name not in current_metrics:
+            rows.append({'metric': name, 'baseline_ms': _representative_ms(base_metrics[name])[0],
+                         'current_ms': None, 'change_pct': None, 'status': 'missing'})
+            continue
+        current_ms = _representative_ms(current_metrics[name])[0]
+        if name not in base_metrics:
+            rows.append({'metric': name, 'baseline_ms': None, 'current_ms': current_ms,
+                         'change_pct': None, 'status': 'new'})
+            continue
+
+        baseline_ms, spread = _representative_ms(base_metrics[name])
+        allowance = max(baseline_ms * tolerance, min_delta_ms, spread)
+        if current_ms > baseline_ms + allowance:
+            status = 'regressed'
+        elif current_ms < baseline_ms - allowance:
+            status = 'improved'
+        else:
+            status = 'ok'
+        change_pct = (current_ms / baseline_ms - 1) * 100 if baseline_ms > 0 else 0.0
+        rows.append({'metric': name, 'baseline_ms': baseline_ms, 'current_ms': current_ms,
+                     'change_pct': change_pct, 'status': status})
+    return rows
+
+
+def print_comparison(rows: List[Dict]) -> None:
+    """Baseline karşılaştırmasını okunabilir fark tablosu olarak yazdırır."""
+    icons = {'ok': '✅', 'improved': '🚀', 'regressed': '❌', 'new': '🆕', 'missing': '⚠️ '}
+    print(f"\n{'Metrik':<42} {'baseline':>10} {'şimdi':>10} {'değişim':>9}  durum")
+    print("-" * 88)
+    for row in rows:
+        baseline_ms = f"{row['baseline_ms']:.3f}" if row['baseline_ms'] is not None else "-"
+        current_ms = f"{row['current_ms']:.3f}" if row['current_ms'] is not None else "-"
+        change = f"{row['change_pct']:+.1f}%" if row['change_pct'] is not None else "-"
+        print(f"{row['metric']:<42} {baseline_ms:>10} {current_ms:>10} {change:>9}  {icons[row['status']]} {row['status']}")
+
+
+def main():
+    """Benchmark takımı komut satırı girişi."""
+    parser = argparse.ArgumentParser(description="Aşama bazlı gerçekçi benchmark takımı")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS,
+                        help="Çalıştırılacak senaryolar (varsayılan: hepsi veya baseline'dakiler)")
+    parser.add_argument('--fixtures', help="Yüz görüntüleri dizini (varsayılan: sentetik yüzler)")
+    parser.add_argument('--quick', action='store_true', help="Az tekrar, 100k galeri yok")
+    parser.add_argument('--repeat', type=int, help="Tekrar sayısı (varsayılan: 1, baseline ile 3)")
+    parser.add_argument('--baseline', help="Karşılaştırılacak baseline rapor; gerileme varsa çıkış kodu 1")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="Göreli gerileme toleransı (varsayılan: 0.15)")
+    parser.add_argument('--min-delta-ms', type=float, default=0.5, help="Gürültü sayılan mutlak fark (ms)")
+    parser.add_argument('--output', help="JSON rapor yolu (varsayılan: logs/benchmark_suite_<zaman>.json)")
+    args = parser.parse_args()
+
+    baseline = None
+    scenarios, quick, fixtures = args.scenarios, args.quick, args.fixtures
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        # Baseline ile aynı koşullarda çalıştır
+        meta = baseline.get('meta', {})
+        scenarios = scenarios or meta.get('scenarios')
+        quick = quick or meta.get('quick', False)
+        if fixtures is None and meta.get('fixtures') not in (None, "synthetic"):
+            fixtures = meta['fixtures']
+    repeat = args.repeat or (3 if baseline else 1)
+
+    suite = BenchmarkSuite(fixtures_dir=fixtures, quick=quick)
+    report = suite.run(tuple(scenarios or SCENARIOS), repeat=repeat)
+    print_report(report)
+
+    output = Path(args.output) if args.output else \
+        Path("logs") / f"benchmark_suite_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Rapor kaydedildi: {output}")
+
+    if baseline is not None:
+        rows = compare_reports(baseline, report, args.tolerance, args.min_delta_ms)
+        print_comparison(rows)
+        regressed = [row['metric'] for row in rows if row['status'] == 'regressed']
+        if regressed:
+            print(f"\n❌ {len(regressed)} metrik baseline'a göre geriledi: {', '.join(regressed)}")
+            sys.exit(1)
+        print("\n✅ Baseline'a göre gerileme yok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+API Load Generator
+JPEG frame'lerini /api/recognize ve POST /api/users uç noktalarına hedef eşzamanlılık
+veya hızda gönderir; uç nokta başına gecikme histogramı, hata oranı ve doyma noktası raporlar.
+Sunucu adresi verilmezse localhost üzerinde geçici bir uvicorn süreci başlatılır.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import numpy as np
+import cv2
+import httpx
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# Proje root dizinini Python path'ine ekle
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.bulk_pipeline import iter_image_files
+
+
+ENDPOINTS = ("recognize", "users")
+# Histogram kova üst sınırları (ms); son kova taşanları toplar
+BUCKET_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+MAX_INFLIGHT = 512
+
+
+class LatencyHistogram:
+    """Sabit kovalı gecikme histogramı (yüzdelikler için ham örnekler de tutulur)."""
+
+    def __init__(self) -> None:
+        self._counts = [0] * len(BUCKET_BOUNDS_MS)
+        self._samples: List[float] = []
+
+    def record(self, latency_ms: float) -> None:
+        """Gecikme örneği ekler."""
+        self._samples.append(latency_ms)
+        for index, bound in enumerate(BUCKET_BOUNDS_MS):
+            if latency_ms <= bound:
+                self._counts[index] += 1
+                break
+
+    def summary(self) -> Dict:
+        """Yüzdelikler ve kova sayıları."""
+        if not self._samples:
+            return {'count': 0, 'buckets': {}}
+        values = np.asarray(self._samples)
+        return {
+            'count': int(values.size),
+            'mean_ms': float(values.mean()),
+            'p50_ms': float(np.percentile(values, 50)),
+            'p95_ms': float(np.percentile(values, 95)),
+            'p99_ms': float(np.percentile(values, 99)),
+            'max_ms': float(values.max()),
+            'buckets': {(f"≤{bound:g}" if bound != float("inf") else "+inf"): count
+                        for bound, count in zip(BUCKET_BOUNDS_MS, self._counts) if count}
+        }
+
+
+class EndpointStats:
+    """Uç nokta başına gecikme ve durum kodu sayaçları."""
+
+    def __init__(self) -> None:
+        self.histogram = LatencyHistogram()
+        self.status_counts: Dict[str, int] = {}
+        self.errors = 0
+
+    def record(self, latency_ms: float, status: str, ok: bool) -> None:
+        """Tamamlanan isteği kaydeder (status: HTTP kodu veya istisna adı)."""
+        self.histogram.record(latency_ms)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self) -> Dict:
+        requests = sum(self.status_counts.values())
+        return {
+            'requests': requests,
+            'errors': self.errors,
+            'error_rate': self.errors / requests if requests else 0.0,
+            'status_counts': self.status_counts,
+            'latency': self.histogram.summary()
+        }
+
+
+class LoadGenerator:
+    """Kapalı döngü (eşzamanlılık) veya açık döngü (hız) yük üreteci."""
+
+    def __init__(self, base_url: str, frames: Sequence[bytes], users_share: float = 0.0,
+                 timeout: float = 30.0, seed: int = 3) -> None:
+        """
+        LoadGenerator başlatır.
+
+        Args:
+            base_url: Sunucu adresi (ör. http://127.0.0.1:8000)
+            frames: JPEG frame baytları
+            users_share: İsteklerin POST /api/users'a giden oranı (0-1)
+            timeout: İstek zaman aşımı (saniye)
+            seed: Uç nokta seçimi için rastgele tohum
+        """
+        if not frames:
+            raise ValueError("En az bir frame gereklidir")
+        self._base_url = base_url.rstrip("/")
+        self._frames = list(frames)
+        self._frames_b64 = [base64.b64encode(frame).decode() for frame in self._frames]
+        self._users_share = users_share
+        self._timeout = timeout
+        self._rng = np.random.default_rng(seed)
+        self._sequence = 0
+        # POST /api/users ile oluşturulan loadtest_* kullanıcıları (çalışma sonunda silinir)
+        self._created_users: List[str] = []
+
+    def _next_request(self) -> tuple:
+        """Sıradaki (uç nokta, frame indeksi)."""
+        self._sequence += 1
+        endpoint = "users" if self._rng.random() < self._users_share else "recognize"
+        return endpoint, self._sequence % len(self._frames)
+
+    async def _send(self, client: httpx.AsyncClient, stats: Dict[str, EndpointStats]) -> None:
+        """Tek istek gönderir ve sonucunu kaydeder."""
+        endpoint, frame_index = self._next_request()
+        start = time.perf_counter()
+        try:
+            if endpoint == "recognize":
+                response = await client.post("/api/recognize", json={'image_data': self._frames_b64[frame_index]})
+            else:
+                name = f"loadtest_{uuid.uuid4().hex[:12]}"
+                response = await client.post(
+                    "/api/users",
+                    data={'name': name},
+                    files=[('photos', (f"frame{frame_index}.jpg", self._frames[frame_index], "image/jpeg"))])
+                if response.status_code == 200:
+                    self._created_users.append(name)
+            # 4xx yanıtları (ör. yüz bulunamadı) sunucu hatası sayılmaz
+            status, ok = str(response.status_code), response.status_code < 500
+        except httpx.HTTPError as e:
+            status, ok = type(e).__name__, False
+        stats[endpoint].record((time.perf_counter() - start) * 1000, status, ok)
+
+    def _client(self, connections: int) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        return httpx.AsyncClient(base_url=self._base_url, timeout=self._timeout, limits=limits)
+
+    async def warmup(self, requests: int = 4) -> None:
+        """Sunucunun tembel başlatmalarını (encoding worker'ları vb.) ölçüm dışında tetikler."""
+        async def send(client, index):
+            try:
+                await client.post("/api/recognize", json={'image_data': self._frames_b64[index % len(self._frames)]})
+            except httpx.HTTPError:
+                pass
+
+        async with self._client(requests) as client:
+            # Eşzamanlı gönderilir ki havuzdaki tüm worker'lar başlasın
+            await asyncio.gather(*(send(client, index) for index in range(requests)))
+
+    async def cleanup_users(self, connections: int = 4) -> int:
+        """
+        Yük sırasında oluşturulan kullanıcıları siler.
+
+        Returns:
+            Silinen kullanıcı sayısı
+        """
+        names, self._created_users = self._created_users, []
+        semaphore = asyncio.Semaphore(connections)
+
+        async def delete(client, name):
+            async with semaphore:
+                try:
+                    return (await client.delete(f"/api/users/{name}")).status_code == 200
+                except httpx.HTTPError:
+                    return False
+
+        async with self._client(connections) as client:
+            deleted = await asyncio.gather(*(delete(client, name) for name in names))
+        failed = [name for name, ok in zip(names, deleted) if not ok]
+        if failed:
+            print(f"⚠️  {len(failed)} loadtest kullanıcısı silinemedi: {', '.join(failed[:5])}")
+        return len(names) - len(failed)
+
+    async def run_concurrency(self, concurrency: int, duration: float) -> Dict:
+        """
+        Sabit sayıda eşzamanlı istemciyle yük uygular.
+
+        Args:
+            concurrency: Eşzamanlı istemci sayısı
+            duration: Süre (saniye)
+
+        Returns:
+            Seviye sonucu
+        """
+        stats = {endpoint: EndpointStats() for endpoint in ENDPOINTS}
+        deadline = time.perf_counter() + duration
+
+        async with self._client(concurrency) as client:
+            async def worker():
+                while time.perf_counter() < deadline:
+                    await self._send(client, stats)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+        return self._level_result('concurrency', concurrency, stats, elapsed)
+
+    async def run_rate(self, rate: float, duration: float) -> Dict:
+        """
+        Sabit hızda (istek/saniye) açık döngü yük uygular; yanıt beklemeden gönderir.
+
+        Args:
+            rate: Hedef istek/saniye
+            duration: Süre (saniye)
+
+        Returns:
+            Seviye sonucu (uçuştaki istek sınırı aşılırsa 'dropped' artar)
+        """
+        stats = {endpoint: EndpointStats() for endpoint in ENDPOINTS}
+        tasks = set()
+        dropped = 0
+        interval = 1.0 / rate
+
+        async with self._client(MAX_INFLIGHT) as client:
+            start = time.perf_counter()
+            next_send = start
+            while next_send < start + duration:
+                await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+                if len(tasks) >= MAX_INFLIGHT:
+                    dropped += 1
+                else:
+                    task = asyncio.ensure_future(self._send(client, stats))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                next_send += interval
+            if tasks:
+                await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - start
+
+        result = self._level_result('rate', rate, stats, elapsed)
+        result['dropped'] = dropped
+        return result
+
+    @staticmethod
+    def _level_result(mode: str, level: float, stats: Dict[str, EndpointStats], elapsed: float) -> Dict:
+        endpoints = {endpoint: endpoint_stats.summary() for endpoint, endpoint_stats in stats.items()
+                     if endpoint_stats.status_counts}
+        requests = sum(summary['requests'] for summary in endpoints.values())
+        errors = sum(summary['errors'] for summary in endpoints.values())
+        return {
+            'mode': mode,
+            'level': level,
+            'elapsed': elapsed,
+            'requests': requests,
+            'throughput_rps': requests / elapsed if elapsed > 0 else 0.0,
+            'error_rate': errors / requests if requests else 0.0,
+            'endpoints': endpoints
+        }
+
+
+def find_saturation(levels: List[Dict], min_gain: float = 0.1, max_error_rate: float = 0.01) -> Optional[Dict]:
+    """
+    Doyma noktasını bulur: verimi bir önceki seviyeye göre min_gain'den az artan,
+    hedef hızın gerisinde kalan veya hata oranı sınırı aşan ilk seviyeden önceki seviye.
+
+    Args:
+        levels: Artan yük sırasıyla seviye sonuçları
+        min_gain: Anlamlı sayılan minimum göreli verim artışı
+        max_error_rate: Kabul edilen hata oranı
+
+    Returns:
+        {'level', 'throughput_rps', 'reason'} veya doyma görülmediyse None
+    """
+    for previous, current in zip(levels, levels[1:]):
+        # Açık döngüde hedef hıza yetişilemiyorsa sunucu doymuştur
+        behind_rate = current['mode'] == 'rate' and current['throughput_rps'] < current['level'] * (1 - min_gain)
+        if current['error_rate'] > max_error_rate:
+            reason = f"hata oranı {current['error_rate']:.1%} (seviye {current['level']:g})"
+        elif behind_rate:
+            reason = f"hedef hız {current['level']:g} istek/s karşılanamadı"
+        elif current['throughput_rps'] < previous['throughput_rps'] * (1 + min_gain):
+            reason = f"seviye {current['level']:g} verimi artırmadı"
+        else:
+            continue
+        return {'level': previous['level'], 'throughput_rps': previous['throughput_rps'], 'reason': reason}
+    return None
+
+
+def load_frames(frames_dir: Optional[str], count: int = 16) -> List[bytes]:
+    """Dizindeki JPEG'leri okur; dizin yoksa sentetik yüz frame'leri üretir."""
+    if frames_dir:
+        return [path.read_bytes() for path in iter_image_files(Path(frames_dir))
+                if path.suffix.lower() in (".jpg", ".jpeg")]
+
+    from scripts.benchmark_suite import make_synthetic_face
+    rng = np.random.default_rng(11)
+    return [cv2.imencode(".jpg", make_synthetic_face(rng)[0])[1].tobytes() for _ in range(count)]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_server(startup_timeout: float = 60.0) -> Iterator[str]:
+    """
+    Geçici çalışma dizininde uvicorn başlatır (proje data/ dizinine dokunmaz).
+
+    Yields:
+        Sunucu adresi
+    """
+    port = _free_port()
+    workdir = tempfile.mkdtemp(prefix="face_load_")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(PROJECT_ROOT), os.environ.get("PYTHONPATH")])))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + startup_timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"Sunucu başlatılamadı (çıkış kodu {process.returncode})")
+            try:
+                if httpx.get(f"{url}/api/health", timeout=2).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.time() > deadline:
+                raise RuntimeError("Sunucu zamanında hazır olmadı")
+            time.sleep(0.5)
+        yield url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_level(result: Dict) -> None:
+    """Seviye sonucunu yazdırır."""
+    print(f"\n📈 {result['mode']}={result['level']:g}: {result['requests']} istek, "
+          f"{result['throughput_rps']:.2f} istek/s, hata %{result['error_rate'] * 100:.1f}"
+          + (f", düşen {result['dropped']}" if result.get('dropped') else ""))
+    for endpoint, summary in result['endpoints'].items():
+        latency = summary['latency']
+        print(f"   {endpoint:<10} p50 {latency['p50_ms']:8.1f} ms  p95 {latency['p95_ms']:8.1f} ms  "
+              f"p99 {latency['p99_ms']:8.1f} ms  durum {summary['status_counts']}")
+        total = latency['count']
+        for bucket, count in latency['buckets'].items():
+            print(f"      {bucket:>7} ms {'█' * max(1, round(40 * count / total))} {count}")
+
+
+async def run_levels(generator: LoadGenerator, concurrency: Sequence[int], rates: Sequence[float],
+                     duration: float) -> List[Dict]:
+    """Seviyeleri sırayla çalıştırır; oluşturulan test kullanıcılarını en sonda siler."""
+    await generator.warmup()
+    results = []
+    try:
+        for level in rates or concurrency:
+            if rates:
+                result = await generator.run_rate(level, duration)
+            else:
+                result = await generator.run_concurrency(level, duration)
+            print_level(result)
+            results.append(result)
+    finally:
+        deleted = await generator.cleanup_users()
+        if deleted:
+            print(f"\n🧹 {deleted} loadtest kullanıcısı silindi")
+    return results
+
+
+def main():
+    """Yük üreteci komut satırı girişi."""
+    parser = argparse.ArgumentParser(description="FastAPI servisi için yük üreteci")
+    parser.add_argument('--url', help="Sunucu adresi (varsayılan: geçici yerel uvicorn başlatılır)")
+    parser.add_argument('--frames', help="JPEG frame dizini (varsayılan: sentetik yüzler)")
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 2, 4, 8],
+                        help="Eşzamanlılık seviyeleri (kapalı döngü)")
+    parser.add_argument('--rate', nargs='+', type=float,
+                        help="Hedef istek/saniye seviyeleri (açık döngü; verilirse --concurrency yok sayılır)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seviye başına süre (saniye)")
+    parser.add_argument('--users-share', type=float, default=0.0,
+                        help="POST /api/users'a giden istek oranı (0-1)")
+    parser.add_argument('--allow-writes', action='store_true',
+                        help="--url ile verilen sunucuda --users-share'in kullanıcı oluşturmasına izin ver")
+    parser.add_argument('--timeout', type=float, default=30.0, help="İstek zaman aşımı (saniye)")
+    parser.add_argument('--output', help="JSON rapor yolu (varsayılan: logs/load_test_<zaman>.json)")
+    args = parser.parse_args()
+
+    # Dış sunucuda kullanıcı oluşturmak gerçek veriyi değiştirir; açık onay gerekir
+    if args.url and args.users_share > 0 and not args.allow_writes:
+        parser.error("--users-share, --url ile yalnızca --allow-writes verilirse kullanılabilir "
+                     "(oluşturulan loadtest_* kullanıcıları çalışma sonunda silinir)")
+
+    frames = load_frames(args.frames)
+    if not frames:
+        print(f"❌ JPEG bulunamadı: {args.frames}")
+        sys.exit(1)
+
+    def run(url: str) -> List[Dict]:
+        print(f"🚀 Yük testi: {url} ({len(frames)} frame)")
+        generator = LoadGenerator(url, frames, args.users_share, args.timeout)
+        return asyncio.run(run_levels(generator, args.concurrency, args.rate, args.duration))
+
+    if args.url:
+        url, levels = args.url, run(args.url)
+    else:
+        with local_server() as url:
+            levels = run(url)
+
+    saturation = find_saturation(levels)
+    if saturation:
+        print(f"\n🧱 Doyma noktası: {saturation['level']:g} ({saturation['throughput_rps']:.2f} istek/s) - "
+              f"{saturation['reason']}")
+    else:
+        print("\n📈 Test edilen seviyelerde doyma görülmedi")
+
+    output = Path(args.output) if args.output else \
+        Path("logs") / f"load_test_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'url': url, 'timestamp': datetime.now().isoformat(), 'levels': levels,
+                   'saturation': saturation}, f, indent=2)
+    print(f"📄 Rapor kaydedildi: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Matching Microbenchmark
+FaceRecognizer eşleştirme stratejilerinin galeri boyutu ve sorgu batch boyutuyla
+nasıl ölçeklendiğini ölçer; tablo ve grafik için hazır CSV üretir.
+"""
+
+import argparse
+import csv
+import sys
+import time
+import tracemalloc
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+# Proje root dizinini Python path'ine ekle
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.face_recognizer import FaceRecognizer
+from core.sharded_gallery import ShardedFaceRecognizer
+
+
+GALLERY_SIZES = (1_000, 10_000, 100_000)
+BATCH_SIZES = (1, 4, 16, 64)
+SAMPLES_PER_USER = 4
+FIELDS = ['strategy', 'gallery_size', 'batch_size', 'qps', 'batch_p50_ms',
+          'index_bytes', 'query_peak_bytes']
+
+# strateji -> (recognizer fabrikası, sorgu fonksiyonu)
+STRATEGIES: Dict[str, tuple] = {
+    'exact': (lambda: FaceRecognizer(), lambda r, probes: r.recognize_faces(probes)),
+    'float16': (lambda: FaceRecognizer(quantization="float16"), lambda r, probes: r.recognize_faces(probes)),
+    'int8': (lambda: FaceRecognizer(quantization="int8"), lambda r, probes: r.recognize_faces(probes)),
+    'topk': (lambda: FaceRecognizer(), lambda r, probes: r.recognize_topk(probes, k=3)),
+    'sharded': (lambda: ShardedFaceRecognizer(num_shards=2), lambda r, probes: r.recognize_faces(probes)),
+}
+
+
+def random_unit_encodings(rng: np.random.Generator, count: int) -> np.ndarray:
+    """Birim normlu rastgele 128 boyutlu encoding'ler üretir."""
+    encodings = rng.standard_normal((count, 128)).astype(np.float32)
+    encodings /= np.linalg.norm(encodings, axis=1, keepdims=True)
+    return encodings
+
+
+def index_bytes(recognizer) -> int:
+    """Galeri indeksinin bellek kullanımı (bellekteki satırlar + kaba arama kodları; memmap hariç)."""
+    stats = recognizer.get_gallery_stats()
+    shards = stats.get('per_shard', [stats])
+    return sum(shard['bytes'] + shard['coarse_bytes'] for shard in shards)
+
+
+def measure(query: Callable[[List[np.ndarray]], object], batches: Sequence[List[np.ndarray]],
+            min_time: float) -> Dict[str, float]:
+    """
+    Batch'leri en az min_time saniye boyunca sorgular.
+
+    Returns:
+        {'qps': saniyedeki sorgu, 'batch_p50_ms': batch gecikmesi medyanı}
+    """
+    query(batches[0])  # ısınma
+    latencies = []
+    probes = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < min_time or len(latencies) < 3:
+        batch = batches[len(latencies) % len(batches)]
+        batch_start = time.perf_counter()
+        query(batch)
+        latencies.append((time.perf_counter() - batch_start) * 1000)
+        probes += len(batch)
+    return {'qps': probes / (time.perf_counter() - start), 'batch_p50_ms': float(np.median(latencies))}
+
+
+def query_peak_bytes(query: Callable[[List[np.ndarray]], object], batch: List[np.ndarray]) -> int:
+    """Tek batch sorgusunun çağıran süreçteki geçici bellek tepe noktası."""
+    tracemalloc.start()
+    try:
+        query(batch)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(gallery_sizes: Sequence[int] = GALLERY_SIZES, batch_sizes: Sequence[int] = BATCH_SIZES,
+                  strategies: Sequence[str] = tuple(STRATEGIES), min_time: float = 0.5,
+                  seed: int = 7) -> List[Dict]:
+    """
+    Tüm strateji, galeri ve batch kombinasyonlarını ölçer.
+
+    Args:
+        gallery_sizes: Galerideki encoding sayıları
+        batch_sizes: Sorgu batch boyutları
+        strategies: STRATEGIES anahtarları
+        min_time: Hücre başına minimum ölçüm süresi (saniye)
+        seed: Rastgele tohum
+
+    Returns:
+        FIELDS sütunlarıyla satır listesi
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for size in gallery_sizes:
+        gallery = random_unit_encodings(rng, size)
+        entries = [(f"user{i}", gallery[i * SAMPLES_PER_USER:(i + 1) * SAMPLES_PER_USER])
+                   for i in range((size + SAMPLES_PER_USER - 1) // SAMPLES_PER_USER)]
+        # Sorgular galeri örneklerine yakın (eşleşen) ve rastgele (eşleşmeyen) karışık
+        probes = np.concatenate([gallery[rng.integers(0, size, 128)] + rng.normal(0, 0.02, (128, 128)).astype(np.float32),
+                                 random_unit_encodings(rng, 128)])
+        rng.shuffle(probes)
+
+        for strategy in strategies:
+            factory, query_fn = STRATEGIES[strategy]
+            recognizer = factory()
+            try:
+                recognizer.load_known_faces(entries)
+                memory = index_bytes(recognizer)
+                for batch_size in batch_sizes:
+                    batches = [list(probes[i:i + batch_size]) for i in range(0, len(probes) - batch_size + 1, batch_size)]
+                    query = lambda batch: query_fn(recognizer, batch)
+                    timing = measure(query, batches, min_time)
+                    rows.append({
+                        'strategy': strategy,
+                        'gallery_size': size,
+                        'batch_size': batch_size,
+                        'qps': round(timing['qps'], 1),
+                        'batch_p50_ms': round(timing['batch_p50_ms'], 4),
+                        'index_bytes': memory,
+                        'query_peak_bytes': query_peak_bytes(query, batches[0])
+                    })
+                    print(f"  {strategy:<8} galeri={size:<7} batch={batch_size:<3} "
+                          f"{rows[-1]['qps']:>10.1f} qps")
+            finally:
+                if hasattr(recognizer, "close"):
+                    recognizer.close()
+    return rows
+
+
+def print_table(rows: List[Dict]) -> None:
+    """Sonuçları tablo olarak yazdırır."""
+    print(f"\n{'Strateji':<9} {'Galeri':>8} {'Batch':>6} {'QPS':>11} {'p50 ms':>10} {'İndeks MB':>10} {'Tepe KB':>9}")
+    print("-" * 70)
+    for row in rows:
+        print(f"{row['strategy']:<9} {row['gallery_size']:>8} {row['batch_size']:>6} {row['qps']:>11.1f} "
+              f"{row['batch_p50_ms']:>10.3f} {row['index_bytes'] / 1024 ** 2:>10.2f} {row['query_peak_bytes'] / 1024:>9.1f}")
+
+
+def main():
+    """Eşleştirme microbenchmark komut satırı girişi."""
+    parser = argparse.ArgumentParser(description="Galeri ve batch boyutuna göre eşleştirme microbenchmark'ı")
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(GALLERY_SIZES), help="Galeri boyutları")
+    parser.add_argument('--batches', nargs='+', type=int, default=list(BATCH_SIZES), help="Sorgu batch boyutları")
+    parser.add_argument('--strategies', nargs='+', choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument('--min-time', type=float, default=0.5, help="Hücre başına ölçüm süresi (saniye)")
+    parser.add_argument('--csv', help="CSV yolu (varsayılan: logs/match_benchmark_<zaman>.csv)")
+    args = parser.parse_args()
+
+    print("🎯 Eşleştirme microbenchmark başlatılıyor...")
+    rows = run_benchmark(args.sizes, args.batches, args.strategies, args.min_time)
+    print_table(rows)
+
+    output = Path(args.csv) if args.csv else \
+        Path("logs") / f"match_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\n📄 CSV kaydedildi: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,22 +13,33 @@ import numpy as np
 import cv2
 from typing import List, Dict, Any
 import tempfile
+import json
+import tracemalloc
 import shutil
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Proje dizinini Python path'ine ekle
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 # Test imports
-from core.face_detector import OptimizedFaceDetector
+from core.face_detector import OptimizedFaceDetector, FaceDetector
+from core.prepared_frame import PreparedFrame, FrameBufferPool
+from core.encoding_pool import EncodingWorkerPool
 from core.face_recognizer import FaceRecognizer, RecognitionResult
+from core.sharded_gallery import ShardedFaceRecognizer
+from core.bulk_pipeline import ImagePipeline, BulkEnroller, BulkRecognizer
+from core.sample_quality import SampleSelector, SampleQuality, assess_face, create_sample_selector
 from core.user_manager import UserManager, UserData
 from utils.camera import CameraManager
 from utils.file_manager import FileManager
 from utils.database import DatabaseManager, get_database_manager
-from config.app_config import ConfigManager, get_config_manager
-from utils.logger import setup_logging, get_logger_manager
+from config.app_config import ConfigManager, DetectionConfig, get_config_manager
+from utils.logger import setup_logging, get_logger_manager, PerformanceLogger
+from utils.metrics import LatencyHistogram, StageMetrics, MetricsRegistry
+from utils.tracing import Tracer
+from utils.profiler import SamplingProfiler
+from utils.memory import MemoryAccountant, LeakTracker, register_pipeline_components, format_memory_report
 
 
 class TestResult:
@@ -145,6 +156,23 @@ class AdvancedTestSuite:
         # Silinmiş kullanıcı kontrolü
         deleted_user = db_manager.load_user("test_user")
         assert deleted_user is None, "Silinmiş kullanıcı hala yükleniyor"
+        
+        # Silinen kullanıcı aynı adla yeniden oluşturulabilir; eski encoding'ler geri gelmez
+        new_encodings = [np.random.rand(128).astype(np.float32) for _ in range(2)]
+        user_data.face_encodings = new_encodings
+        assert db_manager.save_user(user_data), "Silinen kullanıcı yeniden oluşturulamadı"
+        recreated = db_manager.load_user("test_user")
+        assert recreated is not None and len(recreated.face_encodings) == 2, "Yeniden oluşturulan kullanıcı yanlış"
+        assert np.allclose(recreated.face_encodings[0], new_encodings[0]), "Eski encoding'ler geri geldi"
+        assert not db_manager.save_user(user_data), "Etkin kullanıcı ikinci kez kaydedildi"
+        assert db_manager.get_user_statistics()['total_encodings'] == 2, "Eski encoding'ler silinmedi"
+        
+        # Toplu kayıt yolu da silinen kullanıcıyı yeniden etkinleştirir
+        assert db_manager.delete_user("test_user"), "Kullanıcı ikinci kez silinemedi"
+        assert db_manager.save_users([user_data]) == ["test_user"], "Toplu kayıt silinen kullanıcıyı oluşturmadı"
+        assert db_manager.save_users([user_data]) == [], "Toplu kayıt etkin kullanıcıyı yeniden kaydetti"
+        assert list(db_manager.get_user_ids()) == ["test_user"], "Yeniden oluşturulan kullanıcı listelenmedi"
+        assert len(db_manager.load_user("test_user").face_encodings) == 2, "Toplu kayıt encoding'leri yanlış"
     
     def test_face_detector_performance(self):
         """Yüz algılama performans testi."""
@@ -185,6 +213,343 @@ class AdvancedTestSuite:
         cleared_stats = detector.get_performance_stats()
         assert cleared_stats['cache_size'] == 0, "Cache temizlenmedi"
     
+    def test_prepared_frame_sharing(self):
+        """Frame hazırlığının aşamalar arasında paylaşım testi."""
+        detector = OptimizedFaceDetector()
+        frame = np.random.randint(0, 255, (720, 1280, 3), dtype=np.uint8)
+        
+        prepared = detector.prepare_frame(frame)
+        assert detector.prepare_frame(prepared) is prepared, "PreparedFrame tekrar sarıldı"
+        
+        # Her dönüşüm frame başına bir kez yapılmalı
+        assert prepared.rgb(640) is prepared.rgb(640), "RGB görünümü memoize edilmedi"
+        assert prepared.equalized(640) is prepared.equalized(640), "Eşitlenmiş görünüm memoize edilmedi"
+        assert prepared.scaled(640).shape[1] == 640, "Küçültme genişliği yanlış"
+        assert prepared.scaled(1920) is frame, "Küçük frame gereksiz yere kopyalandı"
+        
+        # Ham frame ile aynı algılama sonucu
+        raw_faces = detector.detect_faces_opencv_optimized(frame, use_cache=False)
+        prepared_faces = detector.detect_faces_opencv_optimized(prepared, use_cache=False)
+        assert raw_faces == prepared_faces, "PreparedFrame algılama sonucu farklı"
+        
+        # Koordinat dönüşümleri
+        assert prepared.rects_to_original([(64, 32, 128, 128)], 640) == [(128, 64, 256, 256)], "Kutu dönüşümü yanlış"
+        assert prepared.locations_to_scaled([(64, 256, 192, 128)], 640) == [(32, 128, 96, 64)], "Konum dönüşümü yanlış"
+    
+    def test_frame_buffer_reuse(self):
+        """Önceden ayrılmış buffer'larla kararlı durumda frame başına ayırma testi."""
+        detector = OptimizedFaceDetector()
+        buffers = FrameBufferPool()
+        frame = np.random.randint(0, 255, (720, 1280, 3), dtype=np.uint8)
+        
+        def process(pool):
+            prepared = detector.prepare_frame(frame, pool)
+            detector._get_frame_hash(prepared.frame)
+            detector.detect_faces_opencv_optimized(prepared, use_cache=False)
+            return prepared.rgb(640)
+        
+        def peak_growth(pool, frames=10):
+            process(pool)  # Isınma: buffer'lar bir kez ayrılır
+            tracemalloc.start()
+            try:
+                baseline = tracemalloc.get_traced_memory()[0]
+                for _ in range(frames):
+                    process(pool)
+                return tracemalloc.get_traced_memory()[1] - baseline
+            finally:
+                tracemalloc.stop()
+        
+        # Buffer'lı sonuç buffer'sız ile aynı olmalı ve yeniden kullanılmalı
+        assert np.array_equal(process(buffers), process(None)), "Buffer'lı görünüm farklı"
+        assert process(buffers) is process(buffers), "Buffer yeniden kullanılmadı"
+        
+        frame_bytes = 640 * 360 * 3
+        unbuffered = peak_growth(None)
+        buffered = peak_growth(buffers)
+        assert unbuffered >= frame_bytes, f"Referans ölçüm hatalı: {unbuffered} B"
+        assert buffered < 64 * 1024, f"Kararlı durumda frame başına ayırma var: {buffered} B"
+    
+    def test_stage_latency_histograms(self):
+        """Aşama histogramlarının yüzdelik doğruluğu ve ring buffer penceresi testi."""
+        rng = np.random.default_rng(45)
+        samples = rng.lognormal(mean=2.0, sigma=0.8, size=20000)
+        
+        histogram = LatencyHistogram()
+        for value in samples:
+            histogram.record(float(value))
+        for q in (50, 95, 99):
+            exact = float(np.percentile(samples, q))
+            assert abs(histogram.percentile(q) - exact) / exact < 0.05, f"p{q} hatalı: {histogram.percentile(q)} vs {exact}"
+        
+        # İki yarının birleşimi tek histogramla aynı olmalı
+        first, second = LatencyHistogram(), LatencyHistogram()
+        for index, value in enumerate(samples):
+            (first if index % 2 else second).record(float(value))
+        first.merge(second)
+        merged, single = first.summary(), histogram.summary()
+        assert np.isclose(merged.pop("mean_ms"), single.pop("mean_ms")) and merged == single, "Histogram birleştirme yanlış"
+        
+        # Ring buffer yalnızca son N örneği yansıtır; histogram tüm oturumu tutar
+        metrics = StageMetrics(("detect", "encode"), window=10)
+        for _ in range(100):
+            metrics.record("detect", 100.0)
+        for _ in range(10):
+            metrics.record("detect", 5.0)
+        with metrics.measure("match"):
+            pass
+        assert metrics.recent("detect") == (5.0, 5.0, 5.0), f"Pencere yüzdelikleri yanlış: {metrics.recent('detect')}"
+        assert metrics.recent("encode") is None, "Boş aşama yüzdelik döndürdü"
+        summary = metrics.summary()
+        assert set(summary) == {"detect", "match"} and summary["detect"]["count"] == 110, f"Özet yanlış: {summary}"
+        assert 95.0 < summary["detect"]["p50_ms"] <= 100.0, "Oturum p50 değeri yanlış"
+    
+    def test_prometheus_metrics_registry(self):
+        """Thread shard'lı metrik kaydının birleştirme ve Prometheus çıktısı testi."""
+        import threading
+        registry = MetricsRegistry(buckets=(0.01, 0.1))
+        registry.describe("jobs_total", "counter", "Processed jobs")
+        registry.register_gauge("queue_depth", "Queued jobs", lambda: {(("queue", 'a"b'),): 3})
+        registry.register_gauge("missing", "Unavailable source", lambda: None)
+        
+        def worker():
+            for index in range(1000):
+                registry.inc("jobs_total", route="/api/x")
+                registry.observe("job_seconds", 0.005 if index % 2 else 0.05, route="/api/x")
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        lines = registry.render().splitlines()
+        assert '# TYPE jobs_total counter' in lines and 'jobs_total{route="/api/x"} 4000' in lines, "Sayaç birleştirme yanlış"
+        assert 'job_seconds_bucket{route="/api/x",le="0.01"} 2000' in lines, "Histogram kovası yanlış"
+        assert 'job_seconds_bucket{route="/api/x",le="+Inf"} 4000' in lines, "Kümülatif kova yanlış"
+        assert 'job_seconds_count{route="/api/x"} 4000' in lines, "Histogram sayısı yanlış"
+        assert 'queue_depth{queue="a\\"b"} 3' in lines, "Gauge/etiket kaçışı yanlış"
+        assert not any(line.startswith("missing") for line in lines), "Boş gauge yazıldı"
+    
+    def test_tracing_spans(self):
+        """İç içe span'ler, örnekleme/yavaş iz seçimi ve Chrome trace dışa aktarımı testi."""
+        tracer = Tracer(enabled=True, sample_rate=0.0, slow_ms=20.0)
+        
+        # Hızlı ve örneklenmemiş iz atılır; yavaş iz tüm span'leriyle tutulur
+        with tracer.trace("frame", frame_id=1):
+            with tracer.span("detect"):
+                pass
+        assert tracer.get_event_count() == 0, "Örneklenmeyen hızlı iz tutuldu"
+        
+        with tracer.trace("frame", trace_id="slow-frame", frame_id=2) as trace_id:
+            assert tracer.current_trace_id() == trace_id == "slow-frame", "Aktif iz kimliği yanlış"
+            with tracer.span("encode"):
+                with tracer.span("align"):
+                    time.sleep(0.03)
+            display_start = time.perf_counter()
+            tracer.record_span("display", display_start)
+        assert tracer.current_trace_id() is None, "İz bittikten sonra aktif kaldı"
+        
+        path = tracer.export(os.path.join(self.temp_dir, "trace.json"))
+        events = {event["name"]: event for event in json.load(open(path))["traceEvents"]}
+        assert set(events) == {"frame", "encode", "align", "display"}, f"Span'ler eksik: {set(events)}"
+        assert events["align"]["args"]["parent"] == "encode" and events["encode"]["args"]["parent"] == "frame", "Span hiyerarşisi yanlış"
+        assert all(event["ph"] == "X" and event["args"]["trace_id"] == "slow-frame" for event in events.values()), "Trace-event formatı yanlış"
+        assert events["frame"]["args"]["slow"] and events["encode"]["dur"] >= 30000, "Yavaş iz süreleri yanlış"
+        assert tracer.get_event_count() == 0, "Dışa aktarım sonrası span'ler silinmedi"
+        
+        # Kapalı tracer ve iz dışındaki span'ler hiçbir şey kaydetmez
+        tracer.configure(False, 1.0, 0.0)
+        with tracer.trace("frame") as trace_id, tracer.span("detect"):
+            pass
+        assert trace_id is None and tracer.export() is None, "Kapalı tracer span kaydetti"
+    
+    def test_sampling_profiler(self):
+        """Çalışma anında açılıp kapanan örneklemeli profiler ve collapsed-stack çıktısı testi."""
+        import threading
+        
+        profiler = SamplingProfiler(interval_ms=2.0, output_dir=self.temp_dir)
+        assert profiler.stop() is None and not profiler.is_running, "Çalışmayan profiler durduruldu"
+        
+        def profiled_busy_loop(stop_event):
+            while not stop_event.is_set():
+                sum(i * i for i in range(1000))
+        
+        stop_event = threading.Event()
+        worker = threading.Thread(target=profiled_busy_loop, args=(stop_event,), name="busy-worker")
+        worker.start()
+        try:
+            assert profiler.start() and not profiler.start(), "Profiler iki kez başlatıldı"
+            time.sleep(0.3)
+            path = profiler.toggle()
+        finally:
+            stop_event.set()
+            worker.join()
+        
+        assert path is not None and path.exists() and not profiler.is_running, "Profil dosyası yazılmadı"
+        lines = path.read_text(encoding='utf-8').splitlines()
+        stacks = [line.rsplit(" ", 1) for line in lines]
+        assert all(count.isdigit() for _, count in stacks), "Collapsed-stack formatı yanlış"
+        busy = [stack for stack, _ in stacks if "profiled_busy_loop (test_system.py)" in stack]
+        assert busy and all(stack.startswith("busy-worker;") for stack in busy), "Örneklenen fonksiyon bulunamadı"
+        assert profiler.get_status()['last_output'] == str(path), "Durum bilgisi yanlış"
+    
+    def test_upload_decoding_limits(self):
+        """Yükleme çözme: decode sırasında küçültme ve çözmeden önce boyut sınırı testi."""
+        rng = np.random.default_rng(23)
+        image = cv2.resize(rng.integers(0, 255, (30, 40, 3), dtype=np.uint8), (2600, 1950))
+        data = cv2.imencode(".jpg", image)[1].tobytes()
+        
+        # 2600 / 4 = 650 >= 640: dört kat küçültülerek çözülmeli
+        frame = FaceDetector.decode_image(data)
+        assert frame.shape == (488, 650, 3), f"Küçültülmüş decode boyutu yanlış: {frame.shape}"
+        assert FaceDetector.decode_image(data, target_width=2600).shape == image.shape, "Tam çözünürlük decode yanlış"
+        
+        for bad_data, max_pixels in ((data, 1_000_000), (b"not an image", None)):
+            try:
+                FaceDetector.decode_image(bad_data, max_pixels=max_pixels)
+                assert False, "Geçersiz görüntü kabul edildi"
+            except ValueError:
+                pass
+    
+    def test_batch_encoding_consistency(self):
+        """Toplu encoding ile frame başına encoding tutarlılık testi."""
+        detector = OptimizedFaceDetector()
+        
+        rng = np.random.default_rng(7)
+        frames = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(3)]
+        face_locations = [(80, 300, 240, 140), (60, 600, 200, 460)]
+        
+        batch_results = detector.get_face_encodings_batch([(frame, face_locations) for frame in frames])
+        assert len(batch_results) == len(frames), "Batch sonuç sayısı yanlış"
+        
+        for frame, batch_encodings in zip(frames, batch_results):
+            single_encodings = detector.get_face_encodings_optimized(frame, face_locations)
+            assert len(batch_encodings) == len(single_encodings), "Yüz başına encoding sayısı yanlış"
+            for batch_enc, single_enc in zip(batch_encodings, single_encodings):
+                assert np.allclose(batch_enc, single_enc, atol=1e-5), "Batch encoding farklı"
+        
+        # Chip cache: aynı track + kutu için hizalama tekrar kullanılmalı
+        track_ids = ["track-1", "track-2"]
+        first = detector.get_face_encodings_optimized(frames[0], face_locations, track_ids=track_ids)
+        second = detector.get_face_encodings_optimized(frames[0], face_locations, track_ids=track_ids)
+        stats = detector.get_performance_stats()
+        assert stats['chip_cache_hits'] == 2, "Chip cache kullanılmadı"
+        assert all(np.allclose(a, b) for a, b in zip(first, second)), "Cache'li encoding farklı"
+        assert all(np.allclose(a, b, atol=1e-5) for a, b in zip(first, batch_results[0])), "Chip encoding farklı"
+        
+        # Encoding worker havuzu (paylaşımlı bellek) aynı sonucu vermeli
+        try:
+            pool_results = detector.get_face_encodings_batch([(frame, face_locations) for frame in frames], use_pool=True)
+            for pool_encodings, batch_encodings in zip(pool_results, batch_results):
+                assert all(np.allclose(a, b, atol=1e-5) for a, b in zip(pool_encodings, batch_encodings)), "Havuz encoding farklı"
+        finally:
+            detector.shutdown()
+    
+    def test_encoding_pool_worker_crash(self):
+        """Encoding havuzu: çöken worker'ın görevi hata ile biter, slot geri alınır, worker ve kilitli görev kuyruğu yenilenir."""
+        import signal
+        
+        rng = np.random.default_rng(31)
+        frame = rng.integers(0, 255, (240, 320, 3), dtype=np.uint8)
+        location = [(40, 200, 200, 40)]
+        pool = EncodingWorkerPool(num_workers=1, num_slots=2, slot_shape=(240, 320, 3))
+        try:
+            # Kopyalanamayan frame slot sızdırmaz
+            try:
+                pool.submit(frame[:, :, 0], location)
+                assert False, "Gri frame kabul edildi"
+            except ValueError:
+                pass
+            assert pool._free_slots.qsize() == 2, "Başarısız submit slot sızdırdı"
+            
+            # Worker görevi aldığı anda öldürülür (dlib içinde segfault benzeri)
+            future = pool.submit(frame, location)
+            deadline = time.time() + 60
+            while pool._owners[0] == 0 and not future.done() and time.time() < deadline:
+                time.sleep(0.01)
+            if not future.done():
+                os.kill(pool._workers[0].pid, signal.SIGKILL)
+                try:
+                    future.result(timeout=30)
+                    assert False, "Çöken worker'ın görevi başarılı döndü"
+                except RuntimeError:
+                    pass
+                assert pool.get_stats()['worker_restarts'] == 1, "Worker yeniden başlatılmadı"
+            
+            # Yeni worker ile havuz çalışmaya devam eder; tüm slot'lar geri döner
+            assert len(pool.encode(frame, location, timeout=60)) == 1, "Havuz toparlanamadı"
+            assert pool.get_stats()['pending'] == 0 and pool._free_slots.qsize() == 2, "Slot geri alınmadı"
+            
+            # Boştaki worker get() içinde görev kuyruğunun kilidini tutar; öldürülürse yenisi
+            # kuyruğu hiç okuyamaz ve görev sahipsiz (0) kalır. Süre sınırı kuyruğu yeniler.
+            pool._task_deadline = 2.0
+            time.sleep(0.5)
+            restarts = pool.get_stats()['worker_restarts']
+            os.kill(pool._workers[0].pid, signal.SIGKILL)
+            deadline = time.time() + 30
+            while pool.get_stats()['worker_restarts'] == restarts and time.time() < deadline:
+                time.sleep(0.05)
+            future = pool.submit(frame, location)
+            try:
+                future.result(timeout=30)
+                assert False, "Kilitli kuyruktaki görev başarılı döndü"
+            except RuntimeError:
+                pass
+            assert pool.get_stats()['worker_restarts'] == restarts + 2, "Görev kuyruğu yenilenmedi"
+            
+            pool._task_deadline = 60.0
+            assert len(pool.encode(frame, location, timeout=60)) == 1, "Havuz kilitli kuyruktan toparlanamadı"
+            assert pool.get_stats()['pending'] == 0 and pool._free_slots.qsize() == 2, "Süresi dolan görevin slot'u geri alınmadı"
+        finally:
+            pool.close()
+    
+    def test_enrolment_sample_quality(self):
+        """Kayıt örneği kalite ölçümü, eşikler ve benzer örnek ayıklama testi."""
+        rng = np.random.default_rng(29)
+        sharp = rng.integers(0, 255, (200, 200), dtype=np.uint8)
+        blurred = cv2.GaussianBlur(sharp, (21, 21), 8)
+        location = (20, 180, 180, 20)
+        
+        # Karşıdan bakan yüz: burun göz ortasının altında; yan dönük: burun bir göze kaymış
+        frontal = np.array([[60, 80], [80, 80], [120, 80], [140, 80], [100, 130]], dtype=np.float32)
+        turned = frontal.copy()
+        turned[4] = (135, 130)
+        
+        sharp_quality = assess_face(sharp, location, frontal)
+        assert sharp_quality.sharpness > assess_face(blurred, location).sharpness * 10, "Bulanıklık ölçümü yanlış"
+        assert sharp_quality.face_size == 160 and sharp_quality.yaw < 0.01, "Boyut/poz ölçümü yanlış"
+        assert assess_face(sharp, location, turned).yaw > 0.35, "Yan dönüş ölçülemedi"
+        
+        base = rng.normal(0, 0.09, 128).astype(np.float32)
+        good = SampleQuality(500.0, 160, 0.05, 0.0)
+        samples = [
+            (base, good),
+            (base + 0.005, SampleQuality(450.0, 150, 0.05, 0.0)),          # ardışık kare
+            (base + rng.normal(0, 0.03, 128), SampleQuality(5.0, 160, 0.05, 0.0)),   # bulanık
+            (base + rng.normal(0, 0.03, 128), SampleQuality(500.0, 30, 0.05, 0.0)),  # küçük
+            (base + rng.normal(0, 0.03, 128), SampleQuality(500.0, 160, 0.6, 0.0)),  # yan dönük
+            (base + rng.normal(0, 0.03, 128), SampleQuality(300.0, 140, 0.1, 5.0)),
+            (base + rng.normal(0, 0.03, 128), SampleQuality(200.0, 120, 0.1, 5.0)),
+        ]
+        accepted, rejected = SampleSelector(max_samples=2).select(samples)
+        assert accepted == [0, 5], f"Seçilen örnekler yanlış: {accepted}"
+        assert rejected == {1: "önceki örneğe çok benzer", 2: "bulanık", 3: "yüz çok küçük",
+                            4: "yüz düz bakmıyor", 6: "örnek sınırı dolu"}, f"Ret nedenleri yanlış: {rejected}"
+        
+        # Konfigürasyondan kurulan seçici baş eğimi sınırını da uygular
+        detection = DetectionConfig(enrolment_max_samples=3, sample_max_roll=4.0)
+        accepted, rejected = create_sample_selector(detection).select(samples)
+        assert accepted == [0] and rejected[5] == rejected[6] == "yüz düz bakmıyor", f"max_roll uygulanmadı: {rejected}"
+        
+        # Kalite ölçümlü encoding, normal batch encoding ile aynı olmalı
+        detector = OptimizedFaceDetector()
+        frame = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+        face_locations = [(80, 300, 240, 140)]
+        with_quality = detector.get_face_encodings_with_quality(frame, face_locations)
+        plain = detector.get_face_encodings_batch([(frame, face_locations)])[0]
+        assert len(with_quality) == 1 and np.allclose(with_quality[0][0], plain[0], atol=1e-5), "Kaliteli encoding farklı"
+        assert with_quality[0][1].face_size == 160, "Encoding çözünürlüğünde yüz boyutu yanlış"
+    
     def test_face_recognizer_accuracy(self):
         """Yüz tanıma doğruluk testi."""
         recognizer = FaceRecognizer(tolerance=0.6)
@@ -219,6 +584,322 @@ class AdvancedTestSuite:
         recognizer.clear_known_faces()
         assert recognizer.get_known_faces_count() == 0, "Yüzler temizlenmedi"
     
+    def test_incremental_gallery_updates(self):
+        """Galeride toplu ekleme, tombstone silme ve sıkıştırma testi."""
+        recognizer = FaceRecognizer(tolerance=0.6, compaction_ratio=0.5)
+        rng = np.random.default_rng(3)
+        
+        samples = {name: rng.random((3, 128)) * 0.1 + offset
+                   for name, offset in (("alice", 0.0), ("bob", 1.0), ("carol", 2.0))}
+        for name, encodings in samples.items():
+            assert recognizer.add_known_faces(list(encodings), name) == 3, "Toplu ekleme sayısı yanlış"
+        assert recognizer.get_known_faces_count() == 9, "Bilinen yüz sayısı yanlış"
+        
+        # Snapshot güncellemelerden etkilenmemeli
+        before = recognizer.get_snapshot()
+        assert recognizer.remove_user("alice") == 3, "Kullanıcının tüm örnekleri silinmedi"
+        assert before.active_count == 9 and before.alive.all(), "Eski snapshot değişti"
+        assert recognizer.get_version() > before.version, "Versiyon artmadı"
+        
+        # Silinen kullanıcının hiçbir örneği eşleşmemeli
+        results = recognizer.recognize_faces(list(samples["alice"]))
+        assert all(r.user_name != "alice" for r in results), "Tombstone örnek eşleşti"
+        assert recognizer.get_gallery_stats()['tombstones'] == 3, "Tombstone sayısı yanlış"
+        assert not recognizer.remove_known_face("alice"), "Silinmiş kullanıcı tekrar silindi"
+        
+        # Eşik aşılınca otomatik sıkıştırma
+        recognizer.remove_user("bob")
+        stats = recognizer.get_gallery_stats()
+        assert stats['tombstones'] == 0 and stats['active'] == 3, "Sıkıştırma yapılmadı"
+        assert recognizer.get_known_names() == ["carol"] * 3, "Sıkıştırma sonrası isimler yanlış"
+        assert recognizer.recognize_faces([samples["carol"][1]])[0].user_name == "carol", "Sıkıştırma sonrası tanıma hatalı"
+    
+    def test_gallery_user_ids(self):
+        """Galeride int32 etiket ve kullanıcı ID tablosu testi."""
+        recognizer = FaceRecognizer(tolerance=0.6)
+        rng = np.random.default_rng(5)
+        alice, bob = rng.random((3, 128)), rng.random((2, 128)) + 1.0
+        
+        # Veritabanı ID'leri ile yükleme
+        recognizer.load_known_faces([("alice", list(alice)), ("bob", list(bob))],
+                                    user_ids={"alice": 17, "bob": 42})
+        snapshot = recognizer.get_snapshot()
+        assert snapshot.encodings.dtype == np.float32, "Encoding'ler float32 değil"
+        assert snapshot.labels.dtype == np.int32, "Etiketler int32 değil"
+        assert snapshot.labels.tolist() == [17, 17, 17, 42, 42], "Etiketler yanlış"
+        assert recognizer.get_user_table() == {17: "alice", 42: "bob"}, "Kullanıcı tablosu yanlış"
+        
+        result = recognizer.recognize_faces([bob[0]])[0]
+        assert result.is_match and result.user_id == 42 and result.user_name == "bob", "Sonuç ID'si yanlış"
+        
+        # Otomatik ID çakışmamalı; eski isim listesi API'si korunmalı
+        recognizer.add_known_face(rng.random(128) + 2.0, "carol")
+        assert recognizer.get_user_id("carol") not in (17, 42), "Otomatik ID çakıştı"
+        assert recognizer.get_known_names().count("alice") == 3, "İsim listesi yanlış"
+        
+        recognizer.remove_user("alice")
+        assert 17 not in recognizer.get_user_table(), "Silinen kullanıcı tabloda kaldı"
+        assert 17 in snapshot.users, "Eski snapshot kullanıcı tablosu değişti"
+    
+    def test_quantized_gallery_rerank(self):
+        """Kuantalı galeride kaba arama + kesin yeniden sıralama tutarlılık testi."""
+        rng = np.random.default_rng(21)
+        centers = rng.normal(0, 0.09, (300, 128)).astype(np.float32)
+        entries = [(f"user{i}", list(centers[i] + rng.normal(0, 0.025, (3, 128)))) for i in range(len(centers))]
+        probes = list(centers[:50] + rng.normal(0, 0.025, (50, 128)))
+        
+        exact = FaceRecognizer(tolerance=0.6)
+        exact.load_known_faces(entries)
+        exact.remove_user("user7")
+        expected = exact.recognize_faces(probes)
+        
+        for mode in ("float16", "int8"):
+            recognizer = FaceRecognizer(tolerance=0.6, quantization=mode, rerank_candidates=16)
+            recognizer.load_known_faces(entries)
+            recognizer.remove_user("user7")  # Tombstone'lar kaba aramada da atlanmalı
+            
+            results = recognizer.recognize_faces(probes)
+            for result, reference in zip(results, expected):
+                assert result.user_id == reference.user_id, f"{mode}: yeniden sıralama sonucu farklı"
+                assert abs(result.confidence - reference.confidence) < 1e-5, f"{mode}: mesafe kesin değil"
+            
+            # Artımlı ekleme mevcut kalibrasyonla kodlanmalı
+            recognizer.add_known_faces([centers[7]], "returning")
+            assert recognizer.recognize_faces([centers[7]])[0].user_name == "returning", f"{mode}: yeni kayıt bulunamadı"
+            
+            stats = recognizer.get_gallery_stats()
+            bytes_per_code = stats['coarse_bytes'] / stats['capacity']
+            assert bytes_per_code <= (260 if mode == "float16" else 132), f"{mode}: kod boyutu beklenenden büyük"
+            
+            # Bellekteki tek indeks kodlardır; float32 satırlar diskteki memmap'tedir
+            assert isinstance(recognizer.get_snapshot().encodings, np.memmap), f"{mode}: float32 satırlar bellekte"
+            assert stats['rerank_bytes'] == stats['capacity'] * 128 * 4, f"{mode}: disk baytları yanlış"
+            assert stats['bytes'] / stats['capacity'] <= 5, f"{mode}: float32 satırlar bellek baytlarında sayıldı"
+            
+            # Sıkıştırma yeni bir memmap'e taşır; eski snapshot okunabilir kalır
+            before = recognizer.get_snapshot()
+            for i in range(100, 300):
+                recognizer.remove_user(f"user{i}")
+            assert recognizer.get_gallery_stats()['tombstones'] < 200 * 3, f"{mode}: sıkıştırma yapılmadı"
+            assert before.encodings[0].tolist() == entries[0][1][0].astype(np.float32).tolist(), f"{mode}: eski snapshot bozuldu"
+            kept = [i for i in range(len(probes)) if i != 7]  # user7'nin yerini "returning" aldı
+            results = recognizer.recognize_faces([probes[i] for i in kept])
+            assert [r.user_id for r in results] == [expected[i].user_id for i in kept], f"{mode}: sıkıştırma sonrası sonuç farklı"
+    
+    def test_topk_recognition(self):
+        """Top-k farklı kullanıcı ve margin hesaplama testi."""
+        rng = np.random.default_rng(13)
+        centers = rng.normal(0, 0.09, (200, 128)).astype(np.float32)
+        entries = [(f"user{i}", list(centers[i] + rng.normal(0, 0.025, (1 + i % 4, 128)))) for i in range(len(centers))]
+        probes = list(centers[:20] + rng.normal(0, 0.025, (20, 128)))
+        
+        for mode in (None, "int8"):
+            recognizer = FaceRecognizer(tolerance=0.6, quantization=mode, rerank_candidates=8)
+            recognizer.load_known_faces(entries)
+            recognizer.remove_user("user5")
+            snapshot = recognizer.get_snapshot()
+            
+            results = recognizer.recognize_topk(probes, k=3)
+            assert len(results) == len(probes), "Top-k sonuç sayısı yanlış"
+            for probe, result in zip(probes, results):
+                # Kaba kuvvet referansı: kullanıcı başına en küçük mesafe
+                distances = np.linalg.norm(snapshot.encodings - probe, axis=1)
+                per_user = {}
+                for row in np.argsort(distances):
+                    if snapshot.alive[row]:
+                        per_user.setdefault(int(snapshot.labels[row]), float(distances[row]))
+                expected = sorted(per_user.items(), key=lambda item: item[1])[:3]
+                
+                assert [m.user_id for m in result.matches] == [uid for uid, _ in expected], f"{mode}: top-k sırası yanlış"
+                assert abs(result.margin - (expected[1][1] - expected[0][1])) < 1e-5, f"{mode}: margin yanlış"
+                assert result.best.user_name != "user5", f"{mode}: silinen kullanıcı döndü"
+            
+            # Tek en iyi sonuç recognize_faces ile aynı olmalı
+            single = recognizer.recognize_faces(probes)
+            assert all(t.best.user_id == r.user_id for t, r in zip(results, single) if r.is_match), "Top-1 farklı"
+        
+        try:
+            recognizer.recognize_topk(probes, k=0)
+            assert False, "Geçersiz k kabul edildi"
+        except ValueError:
+            pass
+    
+    def test_sharded_gallery(self):
+        """Parçalı galerinin tek galeri ile aynı sonuçları vermesi testi."""
+        import threading
+        rng = np.random.default_rng(17)
+        centers = rng.normal(0, 0.09, (120, 128)).astype(np.float32)
+        entries = [(f"user{i}", list(centers[i] + rng.normal(0, 0.025, (1 + i % 3, 128)))) for i in range(len(centers))]
+        probes = list(centers[:15] + rng.normal(0, 0.025, (15, 128))) + list(rng.normal(0, 0.09, (5, 128)))
+        
+        reference = FaceRecognizer(tolerance=0.6)
+        reference.load_known_faces(entries)
+        reference.remove_user("user3")
+        expected = reference.recognize_topk(probes, k=3)
+        
+        # Süreç içi shard'lar ve gerçek worker süreçleri aynı protokolü kullanır
+        for use_processes in (False, True):
+            with ShardedFaceRecognizer(num_shards=3, tolerance=0.6, use_processes=use_processes) as sharded:
+                sharded.load_known_faces(entries)
+                assert sharded.remove_user("user3") == 1, "Shard'dan kullanıcı silinemedi"
+                assert sharded.get_known_faces_count() == reference.get_known_faces_count(), "Encoding sayısı farklı"
+                
+                results = sharded.recognize_topk(probes, k=3)
+                for got, want in zip(results, expected):
+                    assert [m.user_id for m in got.matches] == [m.user_id for m in want.matches], "Birleştirilmiş top-k farklı"
+                    assert got.is_match == want.is_match, "Eşleşme kararı farklı"
+                    assert abs(got.margin - want.margin) < 1e-5, "Margin farklı"
+                
+                single = sharded.recognize_faces(probes)
+                assert [r.user_name for r in single] == [r.user_name for r in reference.recognize_faces(probes)], "Top-1 farklı"
+                
+                # Bir shard hata verse de diğer yanıtlar tüketilmeli; sonraki istekler kaymamalı
+                try:
+                    sharded._fan_out({0: ("unknown-op",), 1: ("stats",), 2: ("stats",)})
+                    assert False, "Shard hatası yükseltilmedi"
+                except RuntimeError:
+                    pass
+                
+                # Eşzamanlı okuyucuların yanıtları istek ID'si ile doğru sorguya dönmeli
+                expected_ids = [[m.user_id for m in r.matches] for r in expected]
+                mismatches = []
+                def reader(offset):
+                    for _ in range(5):
+                        ordered = probes[offset:] + probes[:offset]
+                        got = [[m.user_id for m in r.matches] for r in sharded.recognize_topk(ordered, k=3)]
+                        if got != expected_ids[offset:] + expected_ids[:offset]:
+                            mismatches.append(offset)
+                threads = [threading.Thread(target=reader, args=(offset,)) for offset in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                assert not mismatches, "Eşzamanlı okumada yanıtlar karıştı"
+                
+                sharded.add_known_faces([centers[3]], "user3")
+                assert sharded.recognize_faces([centers[3]])[0].user_name == "user3", "Yeni eklenen kullanıcı bulunamadı"
+                stats = sharded.get_gallery_stats()
+                assert sum(s['active'] for s in stats['per_shard']) == stats['active'], "Shard istatistikleri tutarsız"
+    
+    def test_concurrent_gallery_snapshots(self):
+        """Eşzamanlı okuyucuların yarım güncellenmiş galeri görmemesi testi."""
+        import threading
+        
+        recognizer = FaceRecognizer(tolerance=0.6)
+        rng = np.random.default_rng(11)
+        base_users = [(f"user{i}", list(rng.random((4, 128)))) for i in range(8)]
+        recognizer.load_known_faces(base_users)
+        probe = base_users[0][1][0]
+        
+        stop = threading.Event()
+        errors = []
+        
+        def reader():
+            while not stop.is_set():
+                snapshot = recognizer.get_snapshot()
+                # Her versiyonda kullanıcılar 4 örnekle tam görünmeli
+                if snapshot.active_count % 4 != 0 or snapshot.active_count < 32:
+                    errors.append(snapshot.active_count)
+                if recognizer.recognize_faces([probe])[0].user_name != "user0":
+                    errors.append("user0")
+        
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        try:
+            for i in range(50):
+                with recognizer.batch_update():
+                    recognizer.add_known_faces(list(rng.random((2, 128))), "temp")
+                    recognizer.add_known_faces(list(rng.random((2, 128))), "temp")
+                recognizer.remove_user("temp")
+                recognizer.load_known_faces(base_users)
+        finally:
+            stop.set()
+            for thread in readers:
+                thread.join()
+        
+        assert not errors, f"Tutarsız galeri görüldü: {errors[:5]}"
+        snapshot = recognizer.get_snapshot()
+        assert not snapshot.encodings.flags.writeable, "Snapshot yazılabilir"
+    
+    def test_bulk_enrollment(self):
+        """Dizinden toplu kayıt, kaldığı yerden devam ve toplu tanıma testi."""
+        root = Path(self.temp_dir) / "enroll"
+        rng = np.random.default_rng(19)
+        for person, count in (("alice", 2), ("bob", 1), ("carol", 0)):
+            (root / person).mkdir(parents=True)
+            for i in range(count):
+                cv2.imwrite(str(root / person / f"{i}.png"), rng.integers(0, 255, (160, 160, 3), dtype=np.uint8))
+        (root / "bob" / "broken.jpg").write_bytes(b"not an image")
+        
+        storage = UserManager(data_dir=f"{self.temp_dir}/bulk_users")
+        state_path = Path(self.temp_dir) / "enroll_state.jsonl"
+        
+        # Kırpılmış görüntü varsayımıyla her geçerli görüntü bir encoding üretir
+        enroller = BulkEnroller(storage, ImagePipeline(num_workers=0, assume_cropped=True), state_path,
+                                DetectionConfig(), batch_size=1)
+        report = enroller.run(root)
+        assert report['users_saved'] == 2 and report['users_failed'] == 1, f"Kayıt sayıları yanlış: {report}"
+        assert report['images'] == 4 and report['images_ok'] == 3, "Görüntü sayıları yanlış"
+        assert report['failures'] == {"okunamadı": 1}, f"Hata nedenleri yanlış: {report['failures']}"
+        assert len(storage.load_user("alice").face_encodings) == 2, "Encoding'ler kaydedilmedi"
+        
+        # İkinci çalışma kaydedilenleri atlar ve hiçbir görüntüyü tekrar işlemez (carol yeniden denenir)
+        report = enroller.run(root)
+        assert report['users_resumed'] == 2 and report['images'] == 0, "Kaldığı yerden devam edilmedi"
+        
+        # Başarısız kullanıcılar devam ederken atlanmaz, yeniden denenir
+        cv2.imwrite(str(root / "carol" / "0.png"), rng.integers(0, 255, (160, 160, 3), dtype=np.uint8))
+        report = enroller.run(root)
+        assert report['users_resumed'] == 2 and report['users_saved'] == 1, f"Başarısız kullanıcı yeniden denenmedi: {report}"
+        (root / "carol" / "0.png").unlink()
+        
+        # Örnekler dizin sırasıyla değil kalite sırasıyla seçilir; aynı kare tekrar olarak elenir
+        quality_root = Path(self.temp_dir) / "enroll_quality"
+        (quality_root / "dave").mkdir(parents=True)
+        sharp = rng.integers(0, 255, (160, 160, 3), dtype=np.uint8)
+        cv2.imwrite(str(quality_root / "dave" / "0.png"), cv2.GaussianBlur(sharp, (3, 3), 0.8))
+        cv2.imwrite(str(quality_root / "dave" / "1.png"), sharp)
+        cv2.imwrite(str(quality_root / "dave" / "2.png"), sharp)
+        quality_enroller = BulkEnroller(storage, ImagePipeline(num_workers=0, assume_cropped=True),
+                                        Path(self.temp_dir) / "enroll_quality.jsonl", DetectionConfig(), max_samples=1)
+        report = quality_enroller.run(quality_root)
+        assert report['users_saved'] == 1, f"Kalite seçimli kayıt başarısız: {report}"
+        assert report['samples_rejected'] == {"önceki örneğe çok benzer": 1, "örnek sınırı dolu": 1}, \
+            f"Örnek ret nedenleri yanlış: {report['samples_rejected']}"
+        expected = next(ImagePipeline(num_workers=0, assume_cropped=True).process([(None, quality_root / "dave" / "1.png")]))
+        assert np.allclose(storage.load_user("dave").face_encodings[0], expected.encodings[0]), "En net örnek seçilmedi"
+        
+        # Algılama modunda gürültü görüntüsünde yüz bulunmaz
+        results = list(ImagePipeline(num_workers=0).process([("alice", root / "alice" / "0.png")]))
+        assert results[0].error == "yüz bulunamadı", "Algılama hatası raporlanmadı"
+        
+        # Toplu tanıma: kayıtlı görüntüler kendi kullanıcılarıyla eşleşmeli
+        recognizer = FaceRecognizer(tolerance=0.6)
+        recognizer.load_known_faces((user.name, user.face_encodings) for user in storage.load_all_users())
+        output_path = Path(self.temp_dir) / "recognized.jsonl"
+        bulk = BulkRecognizer(recognizer, ImagePipeline(num_workers=0, assume_cropped=True), batch_size=2)
+        report = bulk.run(root, output_path)
+        rows = [json.loads(line) for line in output_path.read_text(encoding='utf-8').splitlines()]
+        assert report['images'] == 4 and report['faces'] == 3, f"Toplu tanıma sayıları yanlış: {report}"
+        assert [row['user_name'] for row in rows if not row.get('error')] == ["alice", "alice", "bob"], "Toplu tanıma eşleşmesi yanlış"
+        assert all(row['distance'] < 1e-4 for row in rows if not row.get('error')), "Aynı görüntü mesafesi sıfır değil"
+        
+        csv_report = bulk.run(root, Path(self.temp_dir) / "recognized.csv")
+        assert csv_report['matched'] == 3, "CSV çıktısı eşleşmeleri yanlış"
+        
+        # SQLite arka ucu batch'i tek transaction'da yazar ve mevcut kullanıcıları atlar
+        db_manager = DatabaseManager(f"{self.temp_dir}/bulk.db")
+        users = [storage.load_user("alice"), storage.load_user("bob")]
+        assert db_manager.save_users(users) == ["alice", "bob"], "Toplu DB kaydı başarısız"
+        assert db_manager.save_users(users[:1]) == [], "Mevcut kullanıcı tekrar kaydedildi"
+        assert len(db_manager.load_user("alice").face_encodings) == 2, "DB encoding sayısı yanlış"
+        
+        # Batch hatası tüm kullanıcıları düşürmez; kullanıcı başına yeniden denenir
+        broken = UserData(name="broken", face_encodings=[lambda: None], created_at="", updated_at="")
+        retry_db = DatabaseManager(f"{self.temp_dir}/bulk_retry.db")
+        assert retry_db.save_users([users[0], broken]) == ["alice"], "Batch hatasında geçerli kullanıcı kaydedilmedi"
+    
     def test_user_manager_operations(self):
         """Kullanıcı yöneticisi işlem testi."""
         user_manager = UserManager(data_dir=f"{self.temp_dir}/users")
@@ -305,39 +986,141 @@ class AdvancedTestSuite:
         assert not unsafe_write, "Güvensiz dosya yazma engellenmedi"
     
     def test_memory_leak_detection(self):
-        """Memory leak testi."""
-        import gc
-        import psutil
-        import os
-        
-        process = psutil.Process(os.getpid())
-        initial_memory = process.memory_info().rss
-        
-        # Memory intensive operations
+        """Memory leak testi (tracemalloc snapshot farkı)."""
         detector = OptimizedFaceDetector()
+        rng = np.random.default_rng(11)
+        frames = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(3)]
         
-        for i in range(30):  # 50'den 30'a düşürdük
-            # Büyük test görüntüsü
-            large_img = np.random.randint(0, 255, (720, 1280, 3), dtype=np.uint8)  # Boyutu düşürdük
-            faces = detector.detect_faces_opencv_optimized(large_img)
-            
-            if i % 5 == 0:
-                gc.collect()  # Daha sık garbage collection
-        
-        # Cache temizle
+        # Isınma: cache yapıları ve tembel başlatmalar referans snapshot'a dahil edilir
+        for frame in frames:
+            detector.detect_faces_opencv_optimized(frame)
         detector.clear_cache()
-        gc.collect()
-        
-        # Biraz bekle
-        import time
-        time.sleep(0.5)
         
-        final_memory = process.memory_info().rss
-        memory_diff = final_memory - initial_memory
-        memory_diff_mb = memory_diff / (1024 * 1024)
+        tracker = LeakTracker()
+        tracker.start()
+        try:
+            for i in range(30):
+                large_img = frames[i % len(frames)].copy()
+                detector.detect_faces_opencv_optimized(large_img)
+            del large_img
+            detector.clear_cache()
+            leak = tracker.diff(top=5)
+        finally:
+            tracker.stop()
+        
+        # Net büyüme tek bir 720p frame'in (2.6MB) çok altında kalmalı
+        growth_kb = leak['growth_bytes'] / 1024
+        assert growth_kb < 256, f"Potansiyel memory leak: {growth_kb:.1f}KB artış, en çok büyüyen: {leak['top'][:3]}"
+        assert not tracker.is_running and tracker.diff() is None, "Sızıntı takibi kapatılamadı"
+    
+    def test_memory_accounting(self):
+        """Galeri, cache ve buffer bileşenlerinin bellek muhasebesi testi."""
+        recognizer = FaceRecognizer()
+        rng = np.random.default_rng(5)
+        recognizer.load_known_faces([(f"user{i}", rng.standard_normal((4, 128))) for i in range(8)])
+        buffers = FrameBufferPool()
+        buffers.get("display", (480, 640, 3))
+        
+        accountant = MemoryAccountant()
+        register_pipeline_components(accountant, recognizer=recognizer, frame_buffers=buffers)
+        accountant.register("queue", lambda: {"pending": 128})
+        accountant.register("missing", lambda: None)
+        accountant.register("broken", lambda: 1 / 0)
+        
+        report = accountant.report()
+        components = report['components']
+        assert components['frame_buffers'] == 480 * 640 * 3, "Frame buffer baytı yanlış"
+        assert components['gallery'] >= 32 * 128 * 4, f"Galeri baytı yanlış: {components['gallery']}"
+        assert components['queue.pending'] == 128 and 'missing' not in components and 'broken' not in components, \
+            "Alt bileşen / atlanan bileşen işleme yanlış"
+        assert report['accounted_bytes'] == sum(components.values()), "Toplam yanlış"
+        assert report['rss_bytes'] > report['accounted_bytes'] and report['unaccounted_bytes'] > 0, "RSS karşılaştırması yanlış"
+        assert any("frame_buffers" in line for line in format_memory_report(report)), "Rapor formatı yanlış"
+        
+        # Gauge okumaları yakın tarihli ölçümü tekrar kullanır; max_age=0 her zaman ölçer
+        buffers.get("extra", (10, 10, 3))
+        assert accountant.components(max_age=60)['frame_buffers'] == 480 * 640 * 3, "Önbellekli ölçüm kullanılmadı"
+        assert accountant.components()['frame_buffers'] == 480 * 640 * 3 + 300, "Yeni ölçüm yapılmadı"
+    
+    def test_performance_rollups(self):
+        """Dakikalık performans rollup'ları, saat/gün indirgemesi ve zaman serisi sorgusu testi."""
+        import sqlite3
+        import threading
         
-        # Memory artışı 200MB'dan az olmalı (daha esnek threshold)
-        assert memory_diff_mb < 200, f"Potansiyel memory leak: {memory_diff_mb:.1f}MB artış"
+        db_manager = DatabaseManager(f"{self.temp_dir}/rollups.db")
+        
+        # Sink yokken rollup toplanmaz; sink ile kapanışta açık dakika da yazılır
+        perf = PerformanceLogger()
+        perf.log_execution_time("detect", 0.5)
+        assert perf.drain_rollups(include_current=True) == [], "Sink olmadan rollup toplandı"
+        perf.start_rollup_flush(db_manager.save_performance_rollups, interval=3600)
+        for latency_ms in range(1, 101):
+            perf.record_rollup("detect", latency_ms / 1000)
+        assert perf.stop_rollup_flush() == 1, "Açık dakika yazılmadı"
+        assert perf.metrics["detect"]['total_calls'] == 1, "record_rollup çağrı metriklerine yazdı"
+        
+        current = db_manager.query_performance_rollups("detect", resolution="minute")
+        assert len(current) == 1 and current[0]['count'] == 100, f"Dakikalık rollup yanlış: {current}"
+        assert abs(current[0]['p50_ms'] - 50) <= 50 * 0.05 and current[0]['max_ms'] == 100, "Rollup yüzdelikleri yanlış"
+        
+        # Thread başına pencereler: kısmi yazım, boşta kalan eski dakika ve dakika değişimi örnekleri bir kez sayar
+        perf = PerformanceLogger()
+        collected = []
+        perf.start_rollup_flush(collected.extend, interval=3600)
+        def record():
+            for _ in range(50):
+                perf.record_rollup("match", 0.002)
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        perf.flush_rollups(include_current=True)
+        for thread in threads:
+            thread.join()
+        perf.log_execution_time("match", 0.002)
+        window = perf._local.window
+        minute, histograms = window.current
+        window.current = (minute - 5, histograms)  # Sahibi boşta kalmış eski dakika
+        assert perf.flush_rollups() >= 1, "Boşta kalan eski dakika yazılmadı"
+        perf.log_execution_time("match", 0.002)  # Dakika değişimi eski pencereyi kapatır
+        perf.stop_rollup_flush()
+        assert sum(histogram.count for _, _, histogram in collected) == 202, \
+            f"Rollup örnek sayısı yanlış: {sum(histogram.count for _, _, histogram in collected)}"
+        
+        # Aynı saatteki eski dakikalar tek saatlik kovada, 30 günden eski saatler günlük kovada birleşir
+        now = datetime.now()
+        three_days_ago = (now - timedelta(days=3)).replace(hour=10, minute=5, second=0, microsecond=0)
+        forty_days_ago = (now - timedelta(days=40)).replace(hour=10, minute=0, second=0, microsecond=0)
+        rollups = []
+        for minute, latency_ms, samples in ((three_days_ago, 10.0, 10), (three_days_ago.replace(minute=40), 30.0, 10),
+                                            (forty_days_ago, 5.0, 5)):
+            histogram = LatencyHistogram()
+            for _ in range(samples):
+                histogram.record(latency_ms)
+            rollups.append((minute, "detect", histogram))
+        assert db_manager.save_performance_rollups(rollups) == 3, "Toplu rollup yazımı yanlış"
+        
+        result = db_manager.downsample_performance_rollups(2, 30, 365)
+        assert result == {'minute': 3, 'hour': 1, 'day': 0}, f"İndirgeme sayıları yanlış: {result}"
+        
+        hourly = db_manager.query_performance_rollups("detect", start=now - timedelta(days=4), resolution="hour")
+        assert [row['count'] for row in hourly] == [20, 100], f"Saatlik seri yanlış: {hourly}"
+        assert hourly[0]['bucket_start'] == three_days_ago.replace(minute=0).isoformat() and hourly[0]['max_ms'] == 30, \
+            "Birleştirilen saatlik kova yanlış"
+        daily = db_manager.query_performance_rollups("detect", start=now - timedelta(days=60))
+        assert [row['count'] for row in daily] == [5, 20, 100] and daily[0]['resolution'] == 'day', f"Günlük seri yanlış: {daily}"
+        
+        # cleanup_old_logs ham kayıtları silmeden önce rollup'lara katlar
+        db_manager.log_performance("load_users", 0.25)
+        with sqlite3.connect(db_manager.db_path) as conn:
+            conn.execute("UPDATE performance_metrics SET timestamp = ?", ((now - timedelta(days=45)).isoformat(),))
+        assert db_manager.cleanup_old_logs(30) == 1, "Ham kayıt silinmedi"
+        folded = db_manager.query_performance_rollups("load_users", start=now - timedelta(days=60))
+        assert len(folded) == 1 and folded[0]['count'] == 1, f"Ham kayıt rollup'a katlanmadı: {folded}"
+        
+        # Temizlik verilen saklama sürelerini kullanır
+        db_manager.cleanup_old_logs(30, 2, 30, 30)
+        daily = db_manager.query_performance_rollups("detect", start=now - timedelta(days=60))
+        assert [row['count'] for row in daily] == [20, 100], f"Günlük saklama süresi uygulanmadı: {daily}"
     
     def test_concurrent_operations(self):
         """Eşzamanlı işlem testi."""
@@ -373,6 +1156,27 @@ class AdvancedTestSuite:
         assert errors_queue.empty(), f"Thread hatası: {errors_queue.get() if not errors_queue.empty() else 'Unknown'}"
         assert results_queue.qsize() == 40, f"Beklenen sonuç sayısı 40, alınan: {results_queue.qsize()}"
     
+    def test_benchmark_regression_gate(self):
+        """Benchmark baseline karşılaştırmasının gerileme ve gürültü ayrımı testi."""
+        from scripts.benchmark_suite import compare_reports
+        
+        def report(**metrics):
+            return {'metrics': {name: {'p50_ms': runs[0], 'p50_runs_ms': runs} for name, runs in metrics.items()}}
+        
+        baseline = report(decode=[10.0, 10.2, 9.8], match=[0.20, 0.21, 0.19],
+                          noisy=[50.0, 70.0, 60.0], removed=[5.0])
+        current = report(decode=[13.0, 12.8, 13.1], match=[0.35, 0.36, 0.34],
+                         noisy=[75.0, 78.0, 76.0], added=[1.0])
+        status = {row['metric']: row['status'] for row in compare_reports(baseline, current, tolerance=0.15)}
+        
+        # decode %30 yavaşladı; match göreli olarak çok ama mutlak olarak gürültü seviyesinde;
+        # noisy baseline tekrarları arasındaki yayılımın içinde
+        assert status == {'decode': 'regressed', 'match': 'ok', 'noisy': 'ok',
+                          'removed': 'missing', 'added': 'new'}, f"Karşılaştırma durumları yanlış: {status}"
+        
+        improved = compare_reports(current, baseline, tolerance=0.15)
+        assert {row['metric']: row['status'] for row in improved}['decode'] == 'improved', "İyileşme algılanmadı"
+    
     def cleanup(self):
         """Test sonrası temizlik."""
         if self.temp_dir and os.path.exists(self.temp_dir):
@@ -386,11 +1190,31 @@ class AdvancedTestSuite:
             (self.test_config_system, "Konfigürasyon Sistemi"),
             (self.test_database_operations, "Veritabanı İşlemleri"),
             (self.test_face_detector_performance, "Yüz Algılama Performans"),
+            (self.test_prepared_frame_sharing, "Frame Hazırlık Paylaşımı"),
+            (self.test_frame_buffer_reuse, "Frame Buffer Yeniden Kullanımı"),
+            (self.test_stage_latency_histograms, "Aşama Gecikme Histogramları"),
+            (self.test_prometheus_metrics_registry, "Prometheus Metrik Kaydı"),
+            (self.test_tracing_spans, "İzleme Span'leri"),
+            (self.test_sampling_profiler, "Örneklemeli Profiler"),
+            (self.test_upload_decoding_limits, "Yükleme Çözme Sınırları"),
+            (self.test_batch_encoding_consistency, "Toplu Encoding Tutarlılığı"),
+            (self.test_encoding_pool_worker_crash, "Encoding Worker Çökmesi"),
+            (self.test_enrolment_sample_quality, "Kayıt Örnek Kalitesi"),
             (self.test_face_recognizer_accuracy, "Yüz Tanıma Doğruluk"),
+            (self.test_incremental_gallery_updates, "Artımlı Galeri Güncelleme"),
+            (self.test_gallery_user_ids, "Galeri Kullanıcı ID'leri"),
+            (self.test_quantized_gallery_rerank, "Kuantalı Galeri Yeniden Sıralama"),
+            (self.test_topk_recognition, "Top-k Tanıma"),
+            (self.test_sharded_gallery, "Parçalı Galeri"),
+            (self.test_concurrent_gallery_snapshots, "Eşzamanlı Galeri Snapshot"),
+            (self.test_bulk_enrollment, "Toplu Kayıt ve Tanıma"),
             (self.test_user_manager_operations, "Kullanıcı Yöneticisi"),
             (self.test_file_manager_security, "Dosya Güvenliği"),
             (self.test_memory_leak_detection, "Memory Leak Testi"),
-            (self.test_concurrent_operations, "Eşzamanlı İşlemler")
+            (self.test_memory_accounting, "Bellek Muhasebesi"),
+            (self.test_performance_rollups, "Performans Rollup'ları"),
+            (self.test_concurrent_operations, "Eşzamanlı İşlemler"),
+            (self.test_benchmark_regression_gate, "Benchmark Gerileme Kontrolü")
     ]
     
         print(f"📊 Toplam {len(test_cases)} test çalıştırılacak\n")
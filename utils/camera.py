@@ -52,10 +52,13 @@ class CameraManager:
             print(f"Kamera başlatılırken hata: {e}")
             return False
     
-    def capture_frame(self) -> Optional[np.ndarray]:
+    def capture_frame(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
         """
         Kameradan bir frame yakalar.
         
+        Args:
+            out: Frame'in yazılacağı önceden ayrılmış buffer (boyut uyuşmazsa yenisi ayrılır)
+        
         Returns:
             Yakalanan frame veya None
         """
@@ -64,7 +67,7 @@ class CameraManager:
             return None
         
         try:
-            ret, frame = self._capture.read()
+            ret, frame = self._capture.read(out) if out is not None else self._capture.read()
             
             if not ret or frame is None:
                 print("Frame yakalanamadı!")
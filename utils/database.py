@@ -14,7 +14,25 @@ import numpy as np
 from datetime import timedelta
 
 from core.user_manager import UserData
-from utils.logger import get_logger
+from utils.logger import get_logger, Rollup
+from utils.metrics import LatencyHistogram
+
+
+# Rollup çözünürlükleri (inceden kabaya); eskiyen kayıtlar bir sonrakine indirgenir
+ROLLUP_RESOLUTIONS = ('minute', 'hour', 'day')
+
+
+def _bucket_start(timestamp: datetime, resolution: str) -> str:
+    """Zamanı çözünürlük kovasının başına hizalar (ISO formatında)."""
+    if resolution == 'minute':
+        timestamp = timestamp.replace(second=0, microsecond=0)
+    elif resolution == 'hour':
+        timestamp = timestamp.replace(minute=0, second=0, microsecond=0)
+    elif resolution == 'day':
+        timestamp = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        raise ValueError(f"Geçersiz rollup çözünürlüğü: {resolution}")
+    return timestamp.isoformat()
 
 
 class DatabaseManager:
@@ -90,6 +108,22 @@ class DatabaseManager:
                     )
                 """)
                 
+                # Performance rollup tablosu (dakika/saat/gün özetleri; histogram birleştirilebilir)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS performance_rollups (
+                        resolution TEXT NOT NULL,
+                        bucket_start TEXT NOT NULL,
+                        function_name TEXT NOT NULL,
+                        count INTEGER NOT NULL,
+                        p50_ms REAL NOT NULL,
+                        p95_ms REAL NOT NULL,
+                        max_ms REAL NOT NULL,
+                        total_ms REAL NOT NULL,
+                        histogram TEXT NOT NULL,
+                        PRIMARY KEY (resolution, function_name, bucket_start)
+                    )
+                """)
+                
                 # İndeksler
                 conn.execute("CREATE INDEX IF NOT EXISTS idx_users_name ON users(name)")
                 conn.execute("CREATE INDEX IF NOT EXISTS idx_users_active ON users(is_active)")
@@ -97,6 +131,7 @@ class DatabaseManager:
                 conn.execute("CREATE INDEX IF NOT EXISTS idx_recognition_logs_timestamp ON recognition_logs(timestamp)")
                 conn.execute("CREATE INDEX IF NOT EXISTS idx_recognition_logs_user ON recognition_logs(user_id)")
                 conn.execute("CREATE INDEX IF NOT EXISTS idx_performance_metrics_function ON performance_metrics(function_name)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_performance_rollups_time ON performance_rollups(resolution, bucket_start)")
                 
                 conn.commit()
                 self.logger.info("✅ Veritabanı başarıyla başlatıldı.")
@@ -117,18 +152,8 @@ class DatabaseManager:
         """
         try:
             with sqlite3.connect(self.db_path) as conn:
-                # Kullanıcıyı ekle
-                cursor = conn.execute("""
-                    INSERT INTO users (name, created_at, updated_at, metadata)
-                    VALUES (?, ?, ?, ?)
-                """, (
-                    user_data.name,
-                    user_data.created_at,
-                    user_data.updated_at,
-                    json.dumps({})
-                ))
-                
-                user_id = cursor.lastrowid
+                # Kullanıcıyı ekle (silinmiş aynı adlı kayıt yeniden etkinleştirilir)
+                user_id = self._insert_user_row(conn, user_data)
                 
                 # Face encoding'leri ekle
                 for encoding in user_data.face_encodings:
@@ -155,6 +180,90 @@ class DatabaseManager:
             self.logger.error(f"❌ Kullanıcı kaydetme hatası: {e}")
             return False
     
+    def _insert_user_row(self, conn: sqlite3.Connection, user_data: UserData) -> int:
+        """
+        Kullanıcı satırını ekler; aynı adlı soft-delete edilmiş satır varsa onu
+        yeniden etkinleştirip üzerine yazar ve eski encoding'lerini siler.
+        
+        Args:
+            conn: Açık veritabanı bağlantısı (commit çağırana aittir)
+            user_data: Kaydedilecek kullanıcı verisi
+            
+        Returns:
+            Kullanıcı satırının id'si
+            
+        Raises:
+            sqlite3.IntegrityError: Aynı adlı etkin kullanıcı varsa
+        """
+        try:
+            cursor = conn.execute("""
+                INSERT INTO users (name, created_at, updated_at, metadata)
+                VALUES (?, ?, ?, ?)
+            """, (
+                user_data.name,
+                user_data.created_at,
+                user_data.updated_at,
+                json.dumps({})
+            ))
+            return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            row = conn.execute("""
+                SELECT id FROM users WHERE name = ? AND is_active = 0
+            """, (user_data.name,)).fetchone()
+            if row is None:
+                raise
+        
+        user_id = row[0]
+        conn.execute("""
+            UPDATE users
+            SET is_active = 1, created_at = ?, updated_at = ?, metadata = ?
+            WHERE id = ?
+        """, (user_data.created_at, user_data.updated_at, json.dumps({}), user_id))
+        conn.execute("DELETE FROM face_encodings WHERE user_id = ?", (user_id,))
+        return user_id
+    
+    def save_users(self, users: List[UserData]) -> List[str]:
+        """
+        Birden fazla kullanıcıyı tek bağlantı ve tek transaction ile kaydeder.
+        Performance: Toplu kayıtta kullanıcı başına commit (fsync) yerine batch başına bir commit.
+        
+        Args:
+            users: Kaydedilecek kullanıcı verileri
+            
+        Returns:
+            Kaydedilen kullanıcı adları (zaten mevcut olanlar atlanır; batch hatasında kullanıcı başına yeniden denenir)
+        """
+        saved = []
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                encoding_rows = []
+                now = datetime.now().isoformat()
+                for user_data in users:
+                    try:
+                        user_id = self._insert_user_row(conn, user_data)
+                    except sqlite3.IntegrityError:
+                        self.logger.warning(f"⚠️  Kullanıcı '{user_data.name}' zaten mevcut!")
+                        continue
+                    
+                    encoding_rows.extend(
+                        (user_id, pickle.dumps(encoding), now) for encoding in user_data.face_encodings
+                    )
+                    saved.append(user_data.name)
+                
+                conn.executemany("""
+                    INSERT INTO face_encodings (user_id, encoding_data, created_at)
+                    VALUES (?, ?, ?)
+                """, encoding_rows)
+                
+                conn.commit()
+                self.logger.info(f"✅ {len(saved)} kullanıcı veritabanına toplu kaydedildi.")
+                return saved
+                
+        except Exception as e:
+            # Transaction geri alındı; tek hatalı kayıt tüm batch'i düşürmesin diye kullanıcı başına dene
+            self.logger.error(f"❌ Toplu kullanıcı kaydetme hatası, kullanıcı başına deneniyor: {e}")
+            return [user_data.name for user_data in users if self.save_user(user_data)]
+    
     def load_user(self, name: str) -> Optional[UserData]:
         """
         Kullanıcıyı veritabanından yükler.
@@ -306,6 +415,27 @@ class DatabaseManager:
             self.logger.error(f"❌ Kullanıcı kontrol hatası: {e}")
             return False
     
+    def get_user_ids(self) -> Dict[str, int]:
+        """
+        Aktif kullanıcıların isim -> ID eşlemesini döndürür.
+        Galeri etiketleri bu ID'lerle kurulursa tanıma sonuçları doğrudan users tablosuna bağlanır.
+        
+        Returns:
+            İsim -> users.id sözlüğü
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                rows = conn.execute("""
+                    SELECT name, id FROM users
+                    WHERE is_active = 1
+                """).fetchall()
+                
+                return {name: user_id for name, user_id in rows}
+                
+        except Exception as e:
+            self.logger.error(f"❌ Kullanıcı ID listesi hatası: {e}")
+            return {}
+    
     def log_recognition(self, user_id: Optional[int], recognized_name: str, 
                        confidence: float, is_successful: bool, session_id: str = None) -> None:
         """
@@ -409,15 +539,196 @@ class DatabaseManager:
             self.logger.error(f"❌ İstatistik alma hatası: {e}")
             return {}
     
-    def cleanup_old_logs(self, days: int = 30) -> int:
+    def _upsert_rollups(self, conn: sqlite3.Connection, resolution: str,
+                        histograms: Dict[Tuple[str, str], LatencyHistogram]) -> None:
         """
-        Eski logları temizler.
+        Rollup'ları toplu yazar; aynı kovada kayıt varsa histogramlar birleştirilir.
+        
+        Args:
+            conn: Açık bağlantı (commit çağırana aittir)
+            resolution: Hedef çözünürlük
+            histograms: (fonksiyon adı, kova başlangıcı) -> histogram
+        """
+        rows = []
+        for (function_name, bucket_start), histogram in histograms.items():
+            existing = conn.execute("""
+                SELECT histogram FROM performance_rollups
+                WHERE resolution = ? AND function_name = ? AND bucket_start = ?
+            """, (resolution, function_name, bucket_start)).fetchone()
+            if existing:
+                histogram.merge(LatencyHistogram.from_sparse(json.loads(existing[0])))
+            summary = histogram.summary()
+            rows.append((
+                resolution, bucket_start, function_name, summary['count'],
+                summary['p50_ms'], summary['p95_ms'], summary['max_ms'],
+                summary['mean_ms'] * summary['count'], json.dumps(histogram.to_sparse())
+            ))
+        
+        conn.executemany("""
+            INSERT OR REPLACE INTO performance_rollups
+            (resolution, bucket_start, function_name, count, p50_ms, p95_ms, max_ms, total_ms, histogram)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+    
+    def save_performance_rollups(self, rollups: List[Rollup]) -> int:
+        """
+        Dakikalık performance rollup'larını tek transaction'da kaydeder.
+        
+        Args:
+            rollups: (dakika başlangıcı, fonksiyon adı, LatencyHistogram) listesi
+            
+        Returns:
+            Yazılan kova sayısı
+        """
+        merged: Dict[Tuple[str, str], LatencyHistogram] = {}
+        for minute, function_name, histogram in rollups:
+            key = (function_name, _bucket_start(minute, 'minute'))
+            if key in merged:
+                merged[key].merge(histogram)
+            else:
+                merged[key] = histogram
+        
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                self._upsert_rollups(conn, 'minute', merged)
+                conn.commit()
+            return len(merged)
+            
+        except Exception as e:
+            self.logger.error(f"❌ Performance rollup kayıt hatası: {e}")
+            return 0
+    
+    def downsample_performance_rollups(self, minute_retention_days: int = 2, hour_retention_days: int = 30,
+                                       day_retention_days: int = 365) -> Dict[str, int]:
+        """
+        Eskiyen rollup'ları bir üst çözünürlüğe indirger (dakika -> saat -> gün).
+        
+        Args:
+            minute_retention_days: Dakikalık kayıtların tutulacağı gün
+            hour_retention_days: Saatlik kayıtların tutulacağı gün
+            day_retention_days: Günlük kayıtların tutulacağı gün (sonrası silinir)
+            
+        Returns:
+            Çözünürlük başına indirgenen/silinen kayıt sayısı
+        """
+        now = datetime.now()
+        result = {}
+        
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                for source, target, retention in (('minute', 'hour', minute_retention_days),
+                                                  ('hour', 'day', hour_retention_days)):
+                    cutoff = (now - timedelta(days=retention)).isoformat()
+                    rows = conn.execute("""
+                        SELECT function_name, bucket_start, histogram FROM performance_rollups
+                        WHERE resolution = ? AND bucket_start < ?
+                    """, (source, cutoff)).fetchall()
+                    
+                    merged: Dict[Tuple[str, str], LatencyHistogram] = {}
+                    for function_name, bucket_start, histogram_data in rows:
+                        key = (function_name, _bucket_start(datetime.fromisoformat(bucket_start), target))
+                        histogram = LatencyHistogram.from_sparse(json.loads(histogram_data))
+                        if key in merged:
+                            merged[key].merge(histogram)
+                        else:
+                            merged[key] = histogram
+                    
+                    self._upsert_rollups(conn, target, merged)
+                    conn.execute("""
+                        DELETE FROM performance_rollups WHERE resolution = ? AND bucket_start < ?
+                    """, (source, cutoff))
+                    result[source] = len(rows)
+                
+                cursor = conn.execute("""
+                    DELETE FROM performance_rollups WHERE resolution = 'day' AND bucket_start < ?
+                """, ((now - timedelta(days=day_retention_days)).isoformat(),))
+                result['day'] = cursor.rowcount
+                conn.commit()
+            
+            if any(result.values()):
+                self.logger.info(f"🗜️ Performance rollup'ları indirgendi: {result}")
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"❌ Rollup indirgeme hatası: {e}")
+            return {}
+    
+    def query_performance_rollups(self, function_name: Optional[str] = None, start: Optional[datetime] = None,
+                                  end: Optional[datetime] = None, resolution: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Zaman aralığındaki gecikme serisini döndürür (grafik için).
+        
+        Args:
+            function_name: Yalnızca bu fonksiyon (None ise tümü)
+            start: Başlangıç (varsayılan: bitişten 1 gün önce)
+            end: Bitiş (varsayılan: şimdi)
+            resolution: 'minute', 'hour' veya 'day'; None ise aralık uzunluğuna göre seçilir
+            
+        Returns:
+            function_name, bucket_start, count, mean_ms, p50_ms, p95_ms, max_ms alanlı kayıtlar.
+            İstenen çözünürlükten ince kayıtlar da (henüz indirgenmemiş) aynı kovalarda birleştirilir.
+        """
+        end = end or datetime.now()
+        start = start or end - timedelta(days=1)
+        if resolution is None:
+            span = end - start
+            resolution = 'minute' if span <= timedelta(hours=6) else 'hour' if span <= timedelta(days=14) else 'day'
+        levels = ROLLUP_RESOLUTIONS[:ROLLUP_RESOLUTIONS.index(resolution) + 1]
+        
+        query = f"""
+            SELECT function_name, bucket_start, histogram FROM performance_rollups
+            WHERE resolution IN ({", ".join("?" * len(levels))}) AND bucket_start >= ? AND bucket_start < ?
+        """
+        params: List[Any] = [*levels, _bucket_start(start, resolution), end.isoformat()]
+        if function_name:
+            query += " AND function_name = ?"
+            params.append(function_name)
+        
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                rows = conn.execute(query, params).fetchall()
+        except Exception as e:
+            self.logger.error(f"❌ Rollup sorgu hatası: {e}")
+            return []
+        
+        merged: Dict[Tuple[str, str], LatencyHistogram] = {}
+        for name, bucket_start, histogram_data in rows:
+            key = (name, _bucket_start(datetime.fromisoformat(bucket_start), resolution))
+            histogram = LatencyHistogram.from_sparse(json.loads(histogram_data))
+            if key in merged:
+                merged[key].merge(histogram)
+            else:
+                merged[key] = histogram
+        
+        series = []
+        for (name, bucket_start), histogram in sorted(merged.items()):
+            summary = histogram.summary()
+            series.append({
+                'function_name': name,
+                'bucket_start': bucket_start,
+                'resolution': resolution,
+                'count': summary['count'],
+                'mean_ms': summary['mean_ms'],
+                'p50_ms': summary['p50_ms'],
+                'p95_ms': summary['p95_ms'],
+                'max_ms': summary['max_ms']
+            })
+        return series
+    
+    def cleanup_old_logs(self, days: int = 30, minute_retention_days: int = 2, hour_retention_days: int = 30,
+                         day_retention_days: int = 365) -> int:
+        """
+        Eski logları temizler; ham performance kayıtları silinmeden önce dakikalık
+        rollup'lara katlanır ve rollup'lar saat/gün çözünürlüğüne indirgenir.
         
         Args:
             days: Silinecek log yaşı (gün)
+            minute_retention_days: Dakikalık rollup'ların tutulacağı gün (system.rollup_minute_retention_days)
+            hour_retention_days: Saatlik rollup'ların tutulacağı gün (system.rollup_hour_retention_days)
+            day_retention_days: Günlük rollup'ların tutulacağı gün (system.rollup_day_retention_days)
             
         Returns:
-            Silinen kayıt sayısı
+            Silinen ham kayıt sayısı
         """
         try:
             # Güvenli tarih hesaplama
@@ -431,6 +742,16 @@ class DatabaseManager:
                     WHERE timestamp < ?
                 """, (cutoff_str,))
                 
+                # Ham performance kayıtlarını dakikalık rollup'lara katla
+                merged: Dict[Tuple[str, str], LatencyHistogram] = {}
+                for function_name, execution_time, timestamp in conn.execute("""
+                    SELECT function_name, execution_time, timestamp FROM performance_metrics
+                    WHERE timestamp < ?
+                """, (cutoff_str,)):
+                    key = (function_name, _bucket_start(datetime.fromisoformat(timestamp), 'minute'))
+                    merged.setdefault(key, LatencyHistogram()).record(execution_time * 1000)
+                self._upsert_rollups(conn, 'minute', merged)
+                
                 # Performance metrics temizle
                 cursor2 = conn.execute("""
                     DELETE FROM performance_metrics 
@@ -441,7 +762,9 @@ class DatabaseManager:
                 conn.commit()
                 
                 self.logger.info(f"🧹 {deleted_count} eski log kaydı temizlendi.")
-                return deleted_count
+            
+            self.downsample_performance_rollups(minute_retention_days, hour_retention_days, day_retention_days)
+            return deleted_count
                 
         except Exception as e:
             self.logger.error(f"❌ Log temizleme hatası: {e}")
@@ -4,13 +4,23 @@ Gelişmiş logging sistemi
 
 import logging
 import sys
+import threading
+import time
+from collections import deque
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List, Tuple
 from datetime import datetime
 import json
 import traceback
 from functools import wraps
 
+from .metrics import LatencyHistogram
+from .tracing import get_tracer
+
+
+# (dakika başlangıcı, fonksiyon adı, gecikme histogramı)
+Rollup = Tuple[datetime, str, LatencyHistogram]
+
 
 class ColoredFormatter(logging.Formatter):
     """Renkli console output için formatter."""
@@ -30,12 +40,39 @@ class ColoredFormatter(logging.Formatter):
         return super().format(record)
 
 
+class _RollupWindow:
+    """Tek thread'in açık dakikası: current = (epoch dakikası, fonksiyon -> histogram)."""
+    
+    __slots__ = ('current',)
+    
+    def __init__(self):
+        self.current: Tuple[Optional[int], Dict[str, LatencyHistogram]] = (None, {})
+
+
 class PerformanceLogger:
-    """Performance metriklerini loglar."""
+    """
+    Performance metriklerini loglar.
+    Çalışma süreleri ayrıca dakikalık gecikme histogramlarında toplanır; kapanan dakikalar
+    arka plan thread'iyle periyodik olarak toplu şekilde sink'e (ör. veritabanı) yazılır.
+    Performance: MetricsRegistry gibi her thread kendi dakika penceresine kilitsiz yazar;
+    yazma thread'i kümülatif histogramların son yazımdan bu yana farkını alır.
+    """
     
     def __init__(self):
         self.metrics: Dict[str, Any] = {}
         self.logger = logging.getLogger('performance')
+        
+        # Thread başına dakika pencereleri; kilit yalnızca yeni thread kaydında ve yazarken alınır
+        self._rollup_lock = threading.Lock()
+        self._local = threading.local()
+        self._windows: List[_RollupWindow] = []
+        # Sahibi dakikayı değiştirince kapanan (epoch dakikası, histogramlar) çiftleri
+        self._closed_windows: "deque[Tuple[int, Dict[str, LatencyHistogram]]]" = deque()
+        # Kısmen yazılmış histogramların son yazılan kopyası (yalnızca yazma thread'i kullanır)
+        self._flushed: Dict[LatencyHistogram, LatencyHistogram] = {}
+        self._rollup_sink: Optional[Callable[[List[Rollup]], Any]] = None
+        self._flush_stop = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
     
     def log_execution_time(self, function_name: str, execution_time: float):
         """Fonksiyon çalışma süresini loglar."""
@@ -55,8 +92,126 @@ class PerformanceLogger:
         metrics['max_time'] = max(metrics['max_time'], execution_time)
         metrics['min_time'] = min(metrics['min_time'], execution_time)
         
+        self.record_rollup(function_name, execution_time)
         self.logger.debug(f"{function_name}: {execution_time:.4f}s")
     
+    def record_rollup(self, name: str, execution_time: float) -> None:
+        """
+        Süreyi yalnızca dakikalık rollup'a ekler; log satırı yazmaz.
+        Kare başına aşama süreleri gibi sıcak yollar için kullanılır.
+        
+        Args:
+            name: Metrik adı
+            execution_time: Süre (saniye)
+        """
+        # Rollup'lar yalnızca yazan bir sink varken toplanır (yoksa bellekte birikmez)
+        if self._rollup_sink is not None:
+            self._record_rollup(name, execution_time)
+    
+    def _record_rollup(self, function_name: str, execution_time: float) -> None:
+        """Süreyi bu thread'in açık dakika histogramına ekler (kilitsiz)."""
+        window = getattr(self._local, 'window', None)
+        if window is None:
+            window = self._local.window = _RollupWindow()
+            with self._rollup_lock:
+                self._windows.append(window)
+        
+        minute = int(time.time() // 60)
+        open_minute, histograms = window.current
+        if minute != open_minute:
+            if histograms:
+                self._closed_windows.append((open_minute, histograms))
+            histograms = {}
+            window.current = (minute, histograms)
+        histogram = histograms.get(function_name)
+        if histogram is None:
+            histogram = histograms[function_name] = LatencyHistogram()
+        histogram.record(execution_time * 1000)
+    
+    def _take(self, minute: int, histograms: Dict[str, LatencyHistogram], closed: bool,
+              rollups: List[Rollup]) -> None:
+        """Histogramların son yazımdan bu yana farkını rollup'lara ekler (kilit altında çağrılır)."""
+        start = datetime.fromtimestamp(minute * 60)
+        for name, histogram in list(histograms.items()):
+            snapshot = histogram.copy()
+            delta = snapshot.since(self._flushed.get(histogram))
+            if closed:
+                self._flushed.pop(histogram, None)
+            else:
+                self._flushed[histogram] = snapshot
+            if delta.count:
+                rollups.append((start, name, delta))
+    
+    def drain_rollups(self, include_current: bool = False) -> List[Rollup]:
+        """
+        Yazılmamış dakikalık rollup'ları alır.
+        Sahibi boşta kaldığı için kapanmamış eski dakikalar da alınır.
+        
+        Args:
+            include_current: True ise içinde bulunulan dakikanın şimdiye kadarki kısmı da alınır
+            
+        Returns:
+            (dakika başlangıcı, fonksiyon adı, LatencyHistogram) listesi
+        """
+        rollups: List[Rollup] = []
+        current_minute = int(time.time() // 60)
+        with self._rollup_lock:
+            while self._closed_windows:
+                minute, histograms = self._closed_windows.popleft()
+                self._take(minute, histograms, True, rollups)
+            for window in self._windows:
+                minute, histograms = window.current
+                if minute is not None and (include_current or minute < current_minute):
+                    self._take(minute, histograms, False, rollups)
+        return rollups
+    
+    def flush_rollups(self, include_current: bool = False) -> int:
+        """
+        Bekleyen rollup'ları sink'e tek seferde yazar.
+        
+        Returns:
+            Yazılan rollup sayısı
+        """
+        rollups = self.drain_rollups(include_current)
+        if not rollups or self._rollup_sink is None:
+            return 0
+        try:
+            self._rollup_sink(rollups)
+        except Exception as e:
+            self.logger.error(f"❌ Performance rollup yazılamadı: {e}")
+            return 0
+        return len(rollups)
+    
+    def start_rollup_flush(self, sink: Callable[[List[Rollup]], Any], interval: float = 60.0) -> None:
+        """
+        Rollup'ları arka planda periyodik olarak sink'e yazmaya başlar.
+        
+        Args:
+            sink: Rollup listesini toplu yazan fonksiyon (ör. DatabaseManager.save_performance_rollups)
+            interval: Yazma aralığı (saniye)
+        """
+        if self._flush_thread is not None:
+            return
+        self._rollup_sink = sink
+        self._flush_stop.clear()
+        
+        def run():
+            while not self._flush_stop.wait(interval):
+                self.flush_rollups()
+        
+        self._flush_thread = threading.Thread(target=run, name="performance-rollups", daemon=True)
+        self._flush_thread.start()
+    
+    def stop_rollup_flush(self) -> int:
+        """Periyodik yazmayı durdurur ve açık dakika dahil kalan rollup'ları yazar."""
+        if self._flush_thread is not None:
+            self._flush_stop.set()
+            self._flush_thread.join()
+            self._flush_thread = None
+        written = self.flush_rollups(include_current=True)
+        self._rollup_sink = None
+        return written
+    
     def get_metrics(self) -> Dict[str, Any]:
         """Performance metriklerini döndürür."""
         return self.metrics.copy()
@@ -178,7 +333,7 @@ class LoggerManager:
 
 # Decorators
 def log_execution_time(logger_name: str = None):
-    """Fonksiyon çalışma süresini loglar."""
+    """Fonksiyon çalışma süresini loglar (aktif bir iz varsa span olarak da kaydeder)."""
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
@@ -186,12 +341,14 @@ def log_execution_time(logger_name: str = None):
             start_time = time.time()
             
             try:
-                result = func(*args, **kwargs)
+                with get_tracer().span(func.__name__):
+                    result = func(*args, **kwargs)
                 execution_time = time.time() - start_time
                 
-                # Global logger manager'dan performance logger'ı kullan
-                if hasattr(wrapper, '_logger_manager'):
-                    wrapper._logger_manager.performance.log_execution_time(
+                # Global logger manager'dan performance logger'ı kullan (setup_logging decorator'a bağlar)
+                logger_manager = getattr(log_execution_time, '_logger_manager', None)
+                if logger_manager is not None:
+                    logger_manager.performance.log_execution_time(
                         func.__name__, execution_time
                     )
                 
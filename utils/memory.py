@@ -0,0 +1,244 @@
+"""
+Bellek muhasebesi servisi - Bileşen bazlı bellek raporu ve tracemalloc sızıntı takibi
+"""
+
+import gc
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import psutil
+
+
+MemoryCallback = Callable[[], Union[int, Dict[str, int], None]]
+
+
+class MemoryAccountant:
+    """
+    Galeri, cache, buffer ve kuyrukların tuttuğu baytları süreç RSS'i ile yan yana raporlar.
+    Değerler rapor istendiğinde bileşenlerin kendi sayaçlarından okunur; hot path'e maliyet eklenmez.
+    """
+
+    def __init__(self) -> None:
+        """MemoryAccountant başlatır."""
+        self._components: Dict[str, MemoryCallback] = {}
+        self._process = psutil.Process()
+        # Son bileşen ölçümü (monotonic zaman, isim -> bayt); sık okunan gauge'lar için
+        self._last: Tuple[float, Dict[str, int]] = (float('-inf'), {})
+
+    def register(self, name: str, callback: MemoryCallback) -> None:
+        """
+        Bellek bileşeni tanımlar.
+
+        Args:
+            name: Bileşen ismi (ör. "gallery")
+            callback: Bayt veya {alt bileşen: bayt} döndüren fonksiyon; None döndürürse atlanır
+        """
+        self._components[name] = callback
+
+    def unregister(self, name: str) -> None:
+        """Bileşeni rapordan çıkarır."""
+        self._components.pop(name, None)
+
+    def components(self, max_age: float = 0.0) -> Dict[str, int]:
+        """
+        Bileşen baytlarını ölçer (süreç RSS'i okunmaz).
+
+        Args:
+            max_age: Son ölçüm bu kadar saniyeden yeniyse tekrar kullanılır (0 = her zaman ölç)
+
+        Returns:
+            İsim -> bayt sözlüğü
+        """
+        measured_at, components = self._last
+        if max_age > 0 and time.monotonic() - measured_at < max_age:
+            return dict(components)
+
+        components = {}
+        for name, callback in list(self._components.items()):
+            try:
+                value = callback()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            if isinstance(value, dict):
+                for part, part_bytes in value.items():
+                    components[f"{name}.{part}"] = int(part_bytes)
+            else:
+                components[name] = int(value)
+        self._last = (time.monotonic(), components)
+        return dict(components)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Bellek raporu üretir.
+
+        Returns:
+            rss_bytes, children_rss_bytes (worker süreçleri), components (isim -> bayt),
+            accounted_bytes ve unaccounted_bytes (RSS - hesaplanan) alanları
+        """
+        components = self.components()
+        rss = self._process.memory_info().rss
+        try:
+            children_rss = sum(child.memory_info().rss for child in self._process.children(recursive=True))
+        except psutil.Error:
+            children_rss = 0
+
+        accounted = sum(components.values())
+        return {
+            'rss_bytes': rss,
+            'children_rss_bytes': children_rss,
+            'components': components,
+            'accounted_bytes': accounted,
+            'unaccounted_bytes': max(0, rss - accounted)
+        }
+
+
+def format_memory_report(report: Dict[str, Any]) -> List[str]:
+    """Raporu (ve varsa sızıntı farkını) log/terminal satırlarına çevirir."""
+    mb = 1024 * 1024
+    lines = [f"RSS: {report['rss_bytes'] / mb:.1f}MB (worker süreçleri: {report['children_rss_bytes'] / mb:.1f}MB)"]
+    for name, size in sorted(report['components'].items(), key=lambda item: -item[1]):
+        lines.append(f"  {name:<28} {size / mb:>9.2f}MB")
+    lines.append(f"  {'hesaplanmayan':<28} {report['unaccounted_bytes'] / mb:>9.2f}MB")
+
+    leak = report.get('leak')
+    if leak:
+        lines.append(f"tracemalloc büyümesi: {leak['growth_bytes'] / 1024:+.1f}KB "
+                     f"(izlenen: {leak['traced_bytes'] / mb:.1f}MB)")
+        for stat in leak['top']:
+            lines.append(f"  {stat['size_diff'] / 1024:+9.1f}KB {stat['count_diff']:+6d} blok  {stat['location']}")
+    return lines
+
+
+class LeakTracker:
+    """
+    tracemalloc snapshot farkı ile uzun çalışmalarda büyüyen ayırma noktalarını bulur.
+    Performance: tracemalloc açıkken tüm Python ayırmaları yavaşlar; yalnızca teşhis için açılmalıdır.
+    """
+
+    _IGNORED = (tracemalloc.__file__, "<frozen importlib._bootstrap>",
+                "<frozen importlib._bootstrap_external>", "<unknown>")
+
+    def __init__(self, frames: int = 1) -> None:
+        """
+        LeakTracker başlatır.
+
+        Args:
+            frames: Ayırma başına saklanacak stack derinliği (1 = yalnızca ayırma satırı)
+        """
+        self._frames = frames
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._owns_tracing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._baseline is not None
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        gc.collect()
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in self._IGNORED]
+        )
+
+    def start(self) -> None:
+        """tracemalloc'u başlatır (kapalıysa) ve referans snapshot alır."""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self._frames)
+                self._owns_tracing = True
+            self._baseline = self._snapshot()
+
+    def diff(self, top: int = 10) -> Optional[Dict[str, Any]]:
+        """
+        Referans snapshot'tan bu yana değişimi hesaplar.
+
+        Args:
+            top: Döndürülecek en çok büyüyen satır sayısı
+
+        Returns:
+            growth_bytes (net büyüme), traced_bytes, peak_bytes ve top (location, size_diff,
+            count_diff, size) alanları; takip başlatılmadıysa None
+        """
+        with self._lock:
+            if self._baseline is None:
+                return None
+            stats = self._snapshot().compare_to(self._baseline, 'lineno')
+            traced, peak = tracemalloc.get_traced_memory()
+
+        growing = sorted((stat for stat in stats if stat.size_diff > 0), key=lambda stat: -stat.size_diff)
+        return {
+            'growth_bytes': sum(stat.size_diff for stat in stats),
+            'traced_bytes': traced,
+            'peak_bytes': peak,
+            'top': [
+                {
+                    'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    'size_diff': stat.size_diff,
+                    'count_diff': stat.count_diff,
+                    'size': stat.size
+                }
+                for stat in growing[:top]
+            ]
+        }
+
+    def stop(self) -> None:
+        """Referans snapshot'ı bırakır; tracemalloc'u bu sınıf başlattıysa kapatır."""
+        with self._lock:
+            self._baseline = None
+            if self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+
+
+def gallery_bytes(recognizer) -> int:
+    """Galeri indeksinin bellek kullanımı (bellekteki satırlar + kaba arama kodları, tüm shard'lar; memmap hariç)."""
+    stats = recognizer.get_gallery_stats()
+    shards = stats.get('per_shard', [stats])
+    return sum(shard['bytes'] + shard['coarse_bytes'] for shard in shards)
+
+
+def register_pipeline_components(accountant: MemoryAccountant, detector=None, recognizer=None,
+                                 frame_buffers=None, tracer=None) -> None:
+    """
+    Standart tanıma hattı bileşenlerini rapora ekler.
+
+    Args:
+        accountant: Hedef MemoryAccountant
+        detector: get_memory_stats sunan yüz algılayıcı
+        recognizer: get_gallery_stats sunan tanıyıcı (tekil veya parçalı)
+        frame_buffers: Hot loop FrameBufferPool'u
+        tracer: Span tamponu tutan Tracer
+    """
+    if recognizer is not None:
+        accountant.register("gallery", lambda: gallery_bytes(recognizer))
+    if detector is not None:
+        accountant.register("detector", detector.get_memory_stats)
+    if frame_buffers is not None:
+        accountant.register("frame_buffers", lambda: frame_buffers.nbytes)
+    if tracer is not None:
+        accountant.register("trace_buffer", tracer.get_memory_bytes)
+
+
+# Global instances
+_accountant: Optional[MemoryAccountant] = None
+_leak_tracker: Optional[LeakTracker] = None
+
+
+def get_memory_accountant() -> MemoryAccountant:
+    """Global bellek muhasebecisini döndürür."""
+    global _accountant
+    if _accountant is None:
+        _accountant = MemoryAccountant()
+    return _accountant
+
+
+def get_leak_tracker() -> LeakTracker:
+    """Global sızıntı takipçisini döndürür."""
+    global _leak_tracker
+    if _leak_tracker is None:
+        _leak_tracker = LeakTracker()
+    return _leak_tracker
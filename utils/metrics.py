@@ -0,0 +1,424 @@
+"""
+Metrik servisi - Aşama bazlı gecikme histogramları ve Prometheus metrik kaydı
+"""
+
+import copy
+import math
+import threading
+import time
+import numpy as np
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+# Canlı tanıma döngüsünün aşamaları (overlay ve raporlarda bu sırayla gösterilir)
+RECOGNITION_STAGES = ("capture", "detect", "encode", "match", "draw", "display")
+
+
+class LatencyHistogram:
+    """
+    Logaritmik sabit kovalı gecikme histogramı (HDR benzeri).
+    Performance: Kayıt O(1), bellek örnek sayısından bağımsızdır; yüzdelikler kova
+    çözünürlüğü kadar (varsayılan ~%4.4 göreli hata) doğrudur.
+    """
+
+    def __init__(self, min_ms: float = 0.01, max_ms: float = 60_000.0, buckets_per_doubling: int = 16) -> None:
+        """
+        LatencyHistogram başlatır.
+
+        Args:
+            min_ms: En küçük ayırt edilen gecikme (altı ilk kovaya düşer)
+            max_ms: En büyük ayırt edilen gecikme (üstü son kovaya düşer)
+            buckets_per_doubling: Her iki katlık aralıktaki kova sayısı
+        """
+        if min_ms <= 0 or max_ms <= min_ms:
+            raise ValueError("Geçersiz histogram aralığı")
+
+        self._min_ms = min_ms
+        self._log_step = math.log(2) / buckets_per_doubling
+        self._bucket_count = int(math.ceil(math.log(max_ms / min_ms) / self._log_step)) + 2
+        self._counts = np.zeros(self._bucket_count, dtype=np.int64)
+        self._count = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+
+    def _bucket(self, latency_ms: float) -> int:
+        if latency_ms < self._min_ms:
+            return 0
+        return min(self._bucket_count - 1, int(math.log(latency_ms / self._min_ms) / self._log_step) + 1)
+
+    def _upper_bound(self, bucket: int) -> float:
+        """Kovanın üst sınırı (ms)."""
+        return self._min_ms * math.exp(bucket * self._log_step)
+
+    def record(self, latency_ms: float) -> None:
+        """Gecikme örneği ekler."""
+        self._counts[self._bucket(latency_ms)] += 1
+        self._count += 1
+        self._total_ms += latency_ms
+        if latency_ms > self._max_ms:
+            self._max_ms = latency_ms
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Aynı yapılandırmalı başka bir histogramı bu histograma ekler."""
+        if other._bucket_count != self._bucket_count or other._min_ms != self._min_ms:
+            raise ValueError("Histogram yapılandırmaları uyuşmuyor")
+        self._counts += other._counts
+        self._count += other._count
+        self._total_ms += other._total_ms
+        self._max_ms = max(self._max_ms, other._max_ms)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def copy(self) -> "LatencyHistogram":
+        """
+        Histogramın kopyasını döndürür.
+        Yazan thread'le yarışta sayı kova dizisinden alınır; toplam süre bir örnek kadar sapabilir.
+        """
+        histogram = copy.copy(self)
+        histogram._counts = self._counts.copy()
+        histogram._count = int(histogram._counts.sum())
+        return histogram
+
+    def since(self, previous: Optional["LatencyHistogram"]) -> "LatencyHistogram":
+        """
+        Önceki bir kopyadan bu yana eklenen örnekleri döndürür (kümülatif histogramların farkı).
+
+        Args:
+            previous: Aynı histogramın daha önce alınmış kopyası (None ise tamamı)
+
+        Returns:
+            Fark histogramı; maksimum, aralığın maksimumu yerine kümülatif maksimumdur
+        """
+        delta = self.copy()
+        if previous is not None:
+            delta._counts -= previous._counts
+            delta._count -= previous._count
+            delta._total_ms -= previous._total_ms
+        return delta
+
+    def to_sparse(self) -> Dict[str, Any]:
+        """Dolu kovaları ve toplamları JSON'a yazılabilir sözlük olarak döndürür."""
+        return {
+            'buckets': {str(int(index)): int(self._counts[index]) for index in np.flatnonzero(self._counts)},
+            'count': self._count,
+            'total_ms': self._total_ms,
+            'max_ms': self._max_ms
+        }
+
+    @classmethod
+    def from_sparse(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        """to_sparse çıktısından varsayılan yapılandırmalı histogram kurar."""
+        histogram = cls()
+        for index, count in data['buckets'].items():
+            histogram._counts[int(index)] = count
+        histogram._count = int(data['count'])
+        histogram._total_ms = float(data['total_ms'])
+        histogram._max_ms = float(data['max_ms'])
+        return histogram
+
+    def percentile(self, q: float) -> float:
+        """
+        Yüzdelik değeri (ms) döndürür.
+
+        Args:
+            q: Yüzdelik (0-100)
+
+        Returns:
+            Yüzdeliğin düştüğü kovanın üst sınırı (gözlenen maksimumla sınırlı)
+        """
+        if self._count == 0:
+            return 0.0
+        rank = max(1, int(math.ceil(q / 100.0 * self._count)))
+        bucket = int(np.searchsorted(np.cumsum(self._counts), rank))
+        return min(self._upper_bound(bucket), self._max_ms)
+
+    def summary(self) -> Dict[str, float]:
+        """Sayı, ortalama, p50/p95/p99 ve maksimum."""
+        return {
+            'count': self._count,
+            'mean_ms': self._total_ms / self._count if self._count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self._max_ms
+        }
+
+    def reset(self) -> None:
+        """Tüm örnekleri siler."""
+        self._counts[:] = 0
+        self._count = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+
+
+class StageMetrics:
+    """
+    Aşama başına gecikme takibi: oturum boyu histogram ve son N örneklik ring buffer.
+    Ring buffer canlı overlay için güncel yüzdelikleri, histogram oturum raporunu verir.
+    """
+
+    def __init__(self, stages: Sequence[str] = RECOGNITION_STAGES, window: int = 256) -> None:
+        """
+        StageMetrics başlatır.
+
+        Args:
+            stages: Aşama isimleri (sonradan kaydedilen yeni aşamalar sona eklenir)
+            window: Canlı yüzdelikler için aşama başına örnek sayısı
+        """
+        if window <= 0:
+            raise ValueError("Pencere boyutu pozitif olmalıdır")
+
+        self._window = window
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._rings: Dict[str, np.ndarray] = {}
+        self._positions: Dict[str, int] = {}
+        for stage in stages:
+            self._add_stage(stage)
+
+    def _add_stage(self, stage: str) -> None:
+        self._histograms[stage] = LatencyHistogram()
+        self._rings[stage] = np.zeros(self._window, dtype=np.float64)
+        self._positions[stage] = 0
+
+    @property
+    def stages(self) -> Tuple[str, ...]:
+        return tuple(self._histograms)
+
+    def record(self, stage: str, latency_ms: float) -> None:
+        """
+        Aşama süresini kaydeder.
+
+        Args:
+            stage: Aşama ismi
+            latency_ms: Süre (milisaniye)
+        """
+        if stage not in self._histograms:
+            self._add_stage(stage)
+        self._histograms[stage].record(latency_ms)
+        position = self._positions[stage]
+        self._rings[stage][position % self._window] = latency_ms
+        self._positions[stage] = position + 1
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """with bloğunun süresini aşamaya kaydeder."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000)
+
+    def recent(self, stage: str) -> Optional[Tuple[float, float, float]]:
+        """
+        Son N örneğin (p50, p95, p99) değerleri.
+
+        Returns:
+            Yüzdelikler veya aşamada henüz örnek yoksa None
+        """
+        filled = min(self._positions.get(stage, 0), self._window)
+        if filled == 0:
+            return None
+        p50, p95, p99 = np.percentile(self._rings[stage][:filled], (50, 95, 99))
+        return float(p50), float(p95), float(p99)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Oturum boyu aşama özetleri (örneği olmayan aşamalar atlanır)."""
+        return {stage: histogram.summary() for stage, histogram in self._histograms.items() if histogram.count}
+
+    def reset(self) -> None:
+        """Tüm aşamaları sıfırlar."""
+        for stage in self._histograms:
+            self._histograms[stage].reset()
+            self._positions[stage] = 0
+
+
+# Prometheus histogram kova sınırları (saniye)
+DEFAULT_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _MetricsShard:
+    """Tek thread'in yazdığı sayaçlar ve histogramlar."""
+
+    def __init__(self) -> None:
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        # (metrik, etiketler) -> [kova sayıları..., +Inf kovası, toplam, sayı]
+        self.histograms: Dict[Tuple[str, LabelKey], List[float]] = {}
+
+
+class MetricsRegistry:
+    """
+    Prometheus metin formatında sayaç, histogram ve gauge kaydı.
+    Performance: Her thread kendi shard'ına kilitsiz yazar; kilit yalnızca yeni bir
+    thread ilk kez yazdığında ve /metrics çıktısı üretilirken shard listesi için alınır.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS_S) -> None:
+        """
+        MetricsRegistry başlatır.
+
+        Args:
+            buckets: Histogram kova üst sınırları (saniye, artan sırada)
+        """
+        self._buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards: List[_MetricsShard] = []
+        self._shards_lock = threading.Lock()
+        self._descriptions: Dict[str, Tuple[str, str]] = {}
+        self._gauges: Dict[str, Callable[[], Union[float, Dict[LabelKey, float]]]] = {}
+
+    def _shard(self) -> _MetricsShard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _MetricsShard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        """
+        Metrik tipini ve açıklamasını tanımlar.
+
+        Args:
+            name: Metrik ismi
+            kind: "counter", "histogram" veya "gauge"
+            help_text: # HELP satırı
+        """
+        self._descriptions[name] = (kind, help_text)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """Sayacı artırır."""
+        counters = self._shard().counters
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        """Histograma süre örneği ekler."""
+        histograms = self._shard().histograms
+        key = (name, tuple(sorted(labels.items())))
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0.0] * (len(self._buckets) + 3)
+        values[bisect_left(self._buckets, seconds)] += 1
+        values[-2] += seconds
+        values[-1] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """with bloğunun süresini histograma ekler."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def register_gauge(self, name: str, help_text: str,
+                       callback: Callable[[], Union[float, Dict[LabelKey, float], None]],
+                       kind: str = "gauge") -> None:
+        """
+        Çıktı üretilirken okunan metrik tanımlar (başka bileşenlerin tuttuğu değerler için).
+
+        Args:
+            name: Metrik ismi
+            help_text: Açıklama
+            callback: Değer veya {etiketler: değer} döndüren fonksiyon; None döndürürse atlanır
+            kind: Prometheus tipi (monoton kaynaklar için "counter")
+        """
+        self.describe(name, kind, help_text)
+        self._gauges[name] = callback
+
+    def _collect(self) -> Tuple[Dict[Tuple[str, LabelKey], float], Dict[Tuple[str, LabelKey], List[float]]]:
+        """Tüm shard'ları birleştirir."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        counters: Dict[Tuple[str, LabelKey], float] = {}
+        histograms: Dict[Tuple[str, LabelKey], List[float]] = {}
+        for shard in shards:
+            # list() kopyası tek C çağrısıdır; yazan thread'le yarışta sözlük değişim hatası vermez
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0.0) + value
+            for key, values in list(shard.histograms.items()):
+                merged = histograms.setdefault(key, [0.0] * len(values))
+                for index, value in enumerate(list(values)):
+                    merged[index] += value
+        return counters, histograms
+
+    def render(self) -> str:
+        """Prometheus text exposition (0.0.4) çıktısı üretir."""
+        counters, histograms = self._collect()
+        lines: List[str] = []
+        written = set()
+
+        def header(name: str, default_kind: str) -> None:
+            if name in written:
+                return
+            written.add(name)
+            kind, help_text = self._descriptions.get(name, (default_kind, ""))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), values in sorted(histograms.items()):
+            header(name, "histogram")
+            cumulative = 0.0
+            for bound, count in zip(self._buckets + (float("inf"),), values[:-2]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {_format_value(cumulative)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {_format_value(values[-1])}")
+
+        for name, callback in self._gauges.items():
+            try:
+                value = callback()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            header(name, "gauge")
+            samples = value.items() if isinstance(value, dict) else [((), value)]
+            for labels, sample in samples:
+                lines.append(f"{name}{_format_labels(tuple(labels))} {_format_value(sample)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+# Global instance
+_metrics_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Global metrik kaydını döndürür."""
+    global _metrics_registry
+    if _metrics_registry is None:
+        _metrics_registry = MetricsRegistry()
+    return _metrics_registry
@@ -0,0 +1,161 @@
+"""
+Profiler servisi - Çalışma anında açılıp kapanan örneklemeli stack profiler
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class SamplingProfiler:
+    """
+    Arka plan thread'inde tüm thread'lerin stack'lerini periyodik örnekler ve
+    collapsed-stack (flamegraph.pl / speedscope) formatında yazar.
+    Performance: Kapalıyken hiçbir thread veya hook çalışmaz; açıkken maliyet
+    örnekleme aralığıyla sınırlıdır (varsayılan 5 ms).
+    """
+
+    def __init__(self, interval_ms: float = 5.0, output_dir: str = "logs", max_depth: int = 128) -> None:
+        """
+        SamplingProfiler başlatır.
+
+        Args:
+            interval_ms: Örnekleme aralığı (milisaniye)
+            output_dir: Profil dosyalarının yazılacağı dizin
+            max_depth: Stack başına maksimum frame sayısı
+        """
+        if interval_ms <= 0:
+            raise ValueError("Örnekleme aralığı pozitif olmalıdır")
+
+        self._interval = interval_ms / 1000.0
+        self._output_dir = Path(output_dir)
+        self._max_depth = max_depth
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._timer: Optional[threading.Timer] = None
+        self._counts: Dict[str, int] = {}
+        self._samples = 0
+        self._started_at = 0.0
+        self._last_output: Optional[Path] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, duration: Optional[float] = None) -> bool:
+        """
+        Örneklemeyi başlatır.
+
+        Args:
+            duration: Verilirse bu kadar saniye sonra otomatik durur ve dosya yazılır
+
+        Returns:
+            Başlatıldıysa True, zaten çalışıyorsa False
+        """
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._counts = {}
+            self._samples = 0
+            self._started_at = time.time()
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            if duration:
+                self._timer = threading.Timer(duration, self.stop)
+                self._timer.daemon = True
+                self._timer.start()
+            return True
+
+    def stop(self) -> Optional[Path]:
+        """
+        Örneklemeyi durdurur ve collapsed-stack dosyasını yazar.
+
+        Returns:
+            Yazılan dosya yolu; çalışmıyorsa veya örnek yoksa None
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return None
+            self._stop_event.set()
+            if self._timer is not None and self._timer is not threading.current_thread():
+                self._timer.cancel()
+            self._timer = None
+            self._thread = None
+        thread.join()
+        return self._write()
+
+    def toggle(self) -> Optional[Path]:
+        """Çalışıyorsa durdurur (dosya yolunu döndürür), değilse başlatır."""
+        if self.is_running:
+            return self.stop()
+        self.start()
+        return None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Profiler durumu."""
+        return {
+            'running': self.is_running,
+            'interval_ms': self._interval * 1000,
+            'samples': self._samples,
+            'elapsed': time.time() - self._started_at if self.is_running else 0.0,
+            'last_output': str(self._last_output) if self._last_output else None
+        }
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        names: Dict[int, str] = {}
+        names_refreshed = 0.0
+        while not self._stop_event.wait(self._interval):
+            now = time.monotonic()
+            if now - names_refreshed > 1.0:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                names_refreshed = now
+            self._sample(own_ident, names)
+
+    def _sample(self, own_ident: int, names: Dict[int, str]) -> None:
+        """Tüm thread'lerin anlık stack'lerini sayar."""
+        counts = self._counts
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self._max_depth:
+                code = frame.f_code
+                # Satır numarası eklenmez; aynı fonksiyon flamegraph'ta tek kutu olur
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            key = ";".join(reversed(stack))
+            counts[key] = counts.get(key, 0) + 1
+        self._samples += 1
+
+    def _write(self) -> Optional[Path]:
+        if not self._counts:
+            return None
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        # Milisaniye eklenir; aynı saniyedeki ardışık profiller birbirini ezmez
+        output = self._output_dir / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]}.collapsed"
+        with open(output, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self._counts.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+        self._last_output = output
+        return output
+
+
+# Global instance
+_profiler: Optional[SamplingProfiler] = None
+
+
+def get_profiler(interval_ms: float = 5.0, output_dir: str = "logs") -> SamplingProfiler:
+    """Global profiler döndürür (parametreler yalnızca ilk çağrıda kullanılır)."""
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler(interval_ms=interval_ms, output_dir=output_dir)
+    return _profiler
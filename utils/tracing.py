@@ -0,0 +1,224 @@
+"""
+Tracing servisi - İç içe span'ler ve Chrome trace-event dışa aktarımı
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class _Trace:
+    """Tek frame/istek izinin span'leri; bitişte tutulup tutulmayacağına karar verilir."""
+    __slots__ = ('trace_id', 'sampled', 'events')
+
+    def __init__(self, trace_id: str, sampled: bool) -> None:
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.events: List[Dict[str, Any]] = []
+
+
+# Aktif iz ve span; thread'ler ve asyncio görevleri arasında ayrı tutulur
+_active_trace: ContextVar[Optional[_Trace]] = ContextVar('face_trace', default=None)
+_active_span: ContextVar[Optional[str]] = ContextVar('face_span', default=None)
+
+TraceHandle = Tuple[_Trace, Dict[str, Any], Tuple[Any, Any]]
+
+
+def _now_us() -> int:
+    return time.perf_counter_ns() // 1000
+
+
+class Tracer:
+    """
+    Hafif span API'si.
+    Performance: Kapalıyken veya aktif iz yokken span çağrısı tek bir ContextVar okumasıdır.
+    İzler örnekleme oranıyla ya da süresi eşiği aşınca (yavaş frame) tutulur; tutulan
+    span'ler sınırlı bir deque'de birikir ve Chrome trace-event JSON olarak yazılır.
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 0.01, slow_ms: float = 100.0,
+                 max_events: int = 200_000, output_dir: str = "logs") -> None:
+        """
+        Tracer başlatır.
+
+        Args:
+            enabled: İzleme açık mı
+            sample_rate: Rastgele tutulacak iz oranı (0-1)
+            slow_ms: Bu süreyi aşan izler örneklemeden bağımsız tutulur (0 = kapalı)
+            max_events: Bellekte tutulacak maksimum span sayısı (eskiler düşer)
+            output_dir: Trace dosyalarının yazılacağı dizin
+        """
+        self._events: deque = deque(maxlen=max_events)
+        self._pid = os.getpid()
+        self.configure(enabled, sample_rate, slow_ms, output_dir)
+
+    def configure(self, enabled: bool, sample_rate: float, slow_ms: float,
+                  output_dir: Optional[str] = None) -> None:
+        """
+        İzleme ayarlarını günceller.
+
+        Args:
+            enabled: İzleme açık mı
+            sample_rate: Rastgele tutulacak iz oranı (0-1)
+            slow_ms: Yavaş iz eşiği (ms, 0 = kapalı)
+            output_dir: Trace dizini (None ise değişmez)
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("Örnekleme oranı 0 ile 1 arasında olmalıdır")
+        self._enabled = enabled
+        self._sample_rate = sample_rate
+        self._slow_us = slow_ms * 1000
+        if output_dir is not None:
+            self._output_dir = Path(output_dir)
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def _open(self, name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        return {'name': name, 'cat': 'face', 'ph': 'X', 'ts': _now_us(), 'pid': self._pid,
+                'tid': threading.get_ident(), 'args': args}
+
+    def begin_trace(self, name: str, trace_id: Optional[str] = None, **args: Any) -> Optional[TraceHandle]:
+        """
+        Kök span ile yeni iz başlatır (with kullanılamayan döngüler için).
+
+        Args:
+            name: Kök span ismi (ör. "frame", "request")
+            trace_id: İz kimliği (ör. istek ID'si); verilmezse üretilir
+            **args: Span'e eklenecek alanlar (ör. frame_id)
+
+        Returns:
+            end_trace'e verilecek tanıtıcı; izleme kapalıysa None
+        """
+        if not self._enabled:
+            return None
+        trace = _Trace(trace_id or uuid.uuid4().hex[:16], random.random() < self._sample_rate)
+        args['trace_id'] = trace.trace_id
+        root = self._open(name, args)
+        tokens = (_active_trace.set(trace), _active_span.set(name))
+        return trace, root, tokens
+
+    def end_trace(self, handle: Optional[TraceHandle]) -> None:
+        """İzi bitirir; örneklenmişse veya yavaşsa span'lerini saklar."""
+        if handle is None:
+            return
+        trace, root, (trace_token, span_token) = handle
+        root['dur'] = _now_us() - root['ts']
+        _active_span.reset(span_token)
+        _active_trace.reset(trace_token)
+        if trace.sampled or (self._slow_us and root['dur'] >= self._slow_us):
+            root['args']['slow'] = not trace.sampled
+            self._events.append(root)
+            self._events.extend(trace.events)
+
+    @contextmanager
+    def trace(self, name: str, trace_id: Optional[str] = None, **args: Any) -> Iterator[Optional[str]]:
+        """
+        with bloğunu kök span olarak izler.
+
+        Yields:
+            İz kimliği (izleme kapalıysa None)
+        """
+        handle = self.begin_trace(name, trace_id, **args)
+        try:
+            yield handle[0].trace_id if handle else None
+        finally:
+            self.end_trace(handle)
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[None]:
+        """Aktif iz içinde alt span açar; aktif iz yoksa hiçbir şey yapmaz."""
+        trace = _active_trace.get()
+        if trace is None:
+            yield
+            return
+
+        args['trace_id'] = trace.trace_id
+        args['parent'] = _active_span.get()
+        event = self._open(name, args)
+        token = _active_span.set(name)
+        try:
+            yield
+        finally:
+            _active_span.reset(token)
+            event['dur'] = _now_us() - event['ts']
+            trace.events.append(event)
+
+    def record_span(self, name: str, start: float, **args: Any) -> None:
+        """
+        with ile sarılamayan, başlangıcı time.perf_counter() ile alınmış bir aralığı
+        aktif ize şimdi biten span olarak ekler.
+        """
+        trace = _active_trace.get()
+        if trace is None:
+            return
+        args['trace_id'] = trace.trace_id
+        args['parent'] = _active_span.get()
+        event = self._open(name, args)
+        event['ts'] = int(start * 1_000_000)
+        event['dur'] = _now_us() - event['ts']
+        trace.events.append(event)
+
+    def current_trace_id(self) -> Optional[str]:
+        """Aktif iz kimliği."""
+        trace = _active_trace.get()
+        return trace.trace_id if trace else None
+
+    def get_event_count(self) -> int:
+        return len(self._events)
+
+    def get_memory_bytes(self) -> int:
+        """Saklanan span'lerin yaklaşık bellek kullanımı (son span boyutu x span sayısı)."""
+        try:
+            sample = self._events[-1]
+        except IndexError:
+            return 0
+        per_event = sys.getsizeof(sample) + sum(sys.getsizeof(value) for value in sample.values())
+        per_event += sum(sys.getsizeof(value) for value in sample['args'].values())
+        return per_event * len(self._events)
+
+    def export(self, path: Optional[str] = None, clear: bool = True) -> Optional[Path]:
+        """
+        Saklanan span'leri Chrome trace-event JSON dosyasına yazar (chrome://tracing, Perfetto).
+
+        Args:
+            path: Dosya yolu (varsayılan: logs/trace_<zaman>.json)
+            clear: Yazdıktan sonra bellekteki span'leri sil
+
+        Returns:
+            Yazılan dosya yolu; saklanan span yoksa None
+        """
+        events = list(self._events)
+        if not events:
+            return None
+        if clear:
+            self._events.clear()
+
+        output = Path(path) if path else self._output_dir / f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=str)
+        return output
+
+
+# Global instance
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Global tracer döndürür (varsayılan olarak kapalı)."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer